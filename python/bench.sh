@@ -0,0 +1,12 @@
+#!/bin/sh
+
+DIRS="graphs data_structures utils benchmarks"
+
+# Add the python files to python's paths.
+for d in $DIRS
+do
+  export PYTHONPATH=$PYTHONPATH:"$d"
+done
+
+# Run the benchmarks.
+python3 benchmarks/benchmark.py "$@"
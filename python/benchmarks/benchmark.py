@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Benchmarks
+    ----------
+
+    Times and memory-profiles the public entry points of the library over synthetic
+    workloads of several sizes, and saves the results as JSON, so that the results of
+    two runs can be compared.
+
+    Every benchmark has a name, a list of sizes and a setup function. The setup function
+    creates the input of a given size and returns the function that is measured, so the
+    creation of the input is not measured. Graph algorithms run over every graph family
+    of the workloads module.
+
+    For every benchmark and size
+    - Time
+        The best of Repeat runs, in seconds.
+    - Peak Memory
+        The peak of the memory allocated during a separate run, in bytes, using tracemalloc.
+        Tracemalloc walks the whole stack on every allocation, so deeply recursive runs
+        are only profiled up to a size limit, and their peak memory is null above it.
+
+    Usage:
+        ./bench.sh [-o Results.json] [--compare Old.json] [--only Name ...] [--quick]
+                   [--reorder Method]
+
+    With --compare, it prints the ratio of every time to the old one and exits with
+    status 1 if any ratio is above the threshold.
+
+    With --reorder, the vertices of every graph are first renumbered at random, as the
+    vertices of a real graph that are numbered in the order they are read, and then, unless
+    Method is random, renumbered by Method (bfs, rcm or degree, see utils/reorder.py).
+    The traversals start from the same vertex. For example, to see the effect of rcm:
+        ./bench.sh --only bfs dijkstra --reorder random -o before.json
+        ./bench.sh --only bfs dijkstra --reorder rcm -o after.json --compare before.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import string
+import sys
+import threading
+import time
+import tracemalloc
+
+import workloads
+from reorder import ORDERS, relabel
+from bellman_ford import bellman_ford, bellman_ford_vectorized
+from bfs import bfs
+from dfs import dfs
+from dijkstra import dijkstra
+from floyd_warshall import floyd_warshall
+from mst_kruskal import kruskal_from_graph
+from mst_prim import prim
+from tarjan_ssc import tarjan_ssc
+from heap import MinHeap
+from union_find import UnionFind
+from trie import Trie
+from segment_tree import SegmentTree
+from binary_indexed_tree import BIT
+
+GRAPH_FAMILIES = ["erdos_renyi", "grid", "power_law"]
+
+def make_graph(family, n, seed, directed):
+    if family == "erdos_renyi":
+        return workloads.erdos_renyi(n, 4 * n, seed, directed)
+    elif family == "grid":
+        side = max(2, int(n ** 0.5))
+        return workloads.grid(side, side, seed, directed)
+    else:
+        return workloads.power_law(n, 4, seed, directed)
+
+def reorder_graph(graph, root, method, seed):
+    """
+    Renumbers the vertices at random and then by method. Returns the graph and the new root.
+    """
+    order = list(graph)
+    random.Random(seed).shuffle(order)
+    (graph, newIds) = relabel(graph, order, 1)
+    root = newIds[root]
+    if method != "random":
+        (graph, newIds) = relabel(graph, ORDERS[method](graph), 1)
+        root = newIds[root]
+    return graph, root
+
+def graph_benchmark(algorithm, directed, rooted=True):
+    """
+    Creates the setup function of a benchmark that calls algorithm on a graph,
+    and on vertex 1 as the root if rooted is True.
+    """
+    def setup(family, n, seed, order=None):
+        graph = make_graph(family, n, seed, directed)
+        root = 1
+        if order != None:
+            (graph, root) = reorder_graph(graph, root, order, seed)
+        if rooted:
+            return lambda: algorithm(graph, root)
+        return lambda: algorithm(graph)
+    return setup
+
+def setup_heap(n, seed):
+    rnd = random.Random(seed)
+    items = [(i, rnd.random()) for i in range(n)]
+    changes = [(rnd.randrange(n), rnd.random()) for _ in range(n // 2)]
+    def run():
+        h = MinHeap(items)
+        for (item, prio) in changes:
+            h.change_priority(item, prio)
+        while len(h) > 0:
+            h.take_min()
+    return run
+
+def setup_union_find(n, seed):
+    rnd = random.Random(seed)
+    unions = [(rnd.randrange(n), rnd.randrange(n)) for _ in range(n)]
+    finds = [rnd.randrange(n) for _ in range(n)]
+    def run():
+        uf = UnionFind(range(n))
+        for (x, y) in unions:
+            uf.union(x, y)
+        for x in finds:
+            uf.find(x)
+    return run
+
+def setup_trie(n, seed):
+    ws = workloads.words(n, seed)
+    def run():
+        t = Trie(string.ascii_lowercase)
+        for w in ws:
+            t.add(w)
+        for w in ws:
+            t.check(w)
+            t.prefixCount(w[:3])
+    return run
+
+def setup_segment_tree(n, seed):
+    positions, values, xs, ys = workloads.range_workload(n, n, seed)
+    def run():
+        sg = SegmentTree(n, max)
+        for (pos, val) in zip(positions, values):
+            sg.update(pos, val)
+        for (x, y) in zip(xs, ys):
+            sg.query(x, y)
+    return run
+
+def setup_bit(n, seed):
+    positions, values, xs, ys = workloads.range_workload(n, n, seed)
+    def run():
+        bit = BIT(n)
+        for (pos, val) in zip(positions, values):
+            bit.add(pos, val)
+        for (x, y) in zip(xs, ys):
+            bit.sum(x, y)
+    return run
+
+# The benchmarks as (Name, Sizes, Setup, Graph, TraceLimit).
+# If Graph is True, the setup function also takes the graph family.
+# The memory is profiled only for sizes up to TraceLimit, if it is not None.
+BENCHMARKS = [
+    ("dijkstra", [1000, 10000, 100000], graph_benchmark(dijkstra, False), True, None),
+    ("bellman_ford", [100, 300, 1000], graph_benchmark(bellman_ford, True), True, None),
+    ("bellman_ford_vectorized", [1000, 10000, 100000], graph_benchmark(bellman_ford_vectorized, True), True, None),
+    ("floyd_warshall", [25, 50, 100], graph_benchmark(floyd_warshall, True, False), True, None),
+    ("prim", [1000, 10000, 100000], graph_benchmark(prim, False), True, None),
+    ("kruskal", [1000, 10000, 100000], graph_benchmark(kruskal_from_graph, False, False), True, None),
+    ("tarjan_ssc", [1000, 10000, 100000], graph_benchmark(tarjan_ssc, True, False), True, 10000),
+    ("bfs", [1000, 10000, 100000], graph_benchmark(bfs, True), True, None),
+    ("dfs", [1000, 10000, 100000], graph_benchmark(dfs, True), True, None),
+    ("heap", [1000, 10000, 100000], setup_heap, False, None),
+    ("union_find", [1000, 10000, 100000], setup_union_find, False, None),
+    ("trie", [1000, 10000, 100000], setup_trie, False, None),
+    ("segment_tree", [1000, 10000, 100000], setup_segment_tree, False, None),
+    ("bit", [1000, 10000, 100000], setup_bit, False, None),
+]
+
+def measure(run, repeat, trace=True):
+    """
+    Returns the list of times of repeat runs and the peak memory of one more run.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    if not trace:
+        return times, None
+    tracemalloc.start()
+    run()
+    (_, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return times, peak
+
+def run_benchmarks(names=None, quick=False, repeat=3, seed=0, out=sys.stdout, order=None):
+    results = []
+    for (name, sizes, setup, isGraph, traceLimit) in BENCHMARKS:
+        if names and name not in names:
+            continue
+        for n in (sizes[:1] if quick else sizes):
+            for family in (GRAPH_FAMILIES if isGraph else [None]):
+                run = setup(family, n, seed, order) if isGraph else setup(n, seed)
+                (times, peak) = measure(run, repeat, traceLimit == None or n <= traceLimit)
+                res = {"name": name, "family": family, "size": n, "order": order if isGraph else None,
+                       "time": min(times), "times": times, "peak_memory": peak}
+                results.append(res)
+                out.write("%-24s %-12s %8d %12.6fs %12s B\n" % (name, family or "-", n, min(times), peak))
+                out.flush()
+    return results
+
+def key(res):
+    return (res["name"], res["family"], res["size"])
+
+def compare(results, old, threshold, out=sys.stdout):
+    """
+    Prints the ratio of every new time to the old one and returns the regressed results.
+    """
+    oldTimes = dict((key(res), res["time"]) for res in old["results"])
+    regressions = []
+    for res in results:
+        if key(res) not in oldTimes:
+            continue
+        ratio = res["time"] / max(oldTimes[key(res)], 1e-9)
+        flag = ""
+        if ratio > threshold:
+            flag = "  REGRESSION"
+            regressions.append(res)
+        out.write("%-24s %-12s %8d %8.2fx%s\n" % (res["name"], res["family"] or "-", res["size"], ratio, flag))
+    return regressions
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Benchmark the algorithmic library.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="The JSON file of the results.")
+    parser.add_argument("--compare", help="A JSON file of older results to compare with.")
+    parser.add_argument("--threshold", type=float, default=1.2, help="The time ratio that counts as a regression.")
+    parser.add_argument("--only", nargs="*", help="Run only the benchmarks with these names.")
+    parser.add_argument("--quick", action="store_true", help="Run only the smallest size of every benchmark.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reorder", choices=["random"] + sorted(ORDERS),
+                        help="Renumber the vertices of the graphs at random and then by this method.")
+    opts = parser.parse_args(args)
+
+    results = run_benchmarks(opts.only, opts.quick, opts.repeat, opts.seed, order=opts.reorder)
+    with open(opts.output, "w") as f:
+        json.dump({"python": platform.python_version(), "platform": platform.platform(),
+                   "seed": opts.seed, "repeat": opts.repeat, "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "results": results}, f, indent=2)
+    if opts.compare:
+        with open(opts.compare) as f:
+            old = json.load(f)
+        if compare(results, old, opts.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    # The recursive algorithms need a deep stack, so run in a thread with a big one.
+    sys.setrecursionlimit(10**7)
+    threading.stack_size(512 * 1024 * 1024)
+    status = []
+    worker = threading.Thread(target=lambda: status.append(main(sys.argv[1:])))
+    worker.start()
+    worker.join()
+    sys.exit(status[0] if status else 1)
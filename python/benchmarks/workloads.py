@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Synthetic Workloads
+    -------------------
+
+    Seeded generators of random inputs for the benchmarks.
+    The same parameters and seed always give the same workload.
+
+    Graphs are adjacency lists (a dict of dicts, as in the graph algorithms) with the
+    vertices 1..n and integer weights from 1 to MaxWeight.
+
+    erdos_renyi N M
+        A graph with m edges, chosen uniformly at random.
+    grid ROWS COLS
+        A grid graph, where each cell is connected to its right and lower neighbours.
+    power_law N K
+        A Barabási - Albert graph, where each new vertex is connected to k existing
+        vertices, chosen with probability proportional to their degree.
+    words COUNT
+        A list of random words, where shorter prefixes are shared by many words.
+    range_workload N COUNT
+        Random point updates and range queries over the positions 1..n.
+"""
+
+import random
+import string
+
+def empty_graph(n):
+    return dict((v, dict()) for v in range(1, n + 1))
+
+def add_edge(graph, u, v, w, directed):
+    graph[u][v] = w
+    if not directed:
+        graph[v][u] = w
+
+def erdos_renyi(n, m, seed=0, directed=False, max_weight=100):
+    rnd = random.Random(seed)
+    graph = empty_graph(n)
+    m = min(m, n * (n - 1) // (1 if directed else 2))
+    edges = 0
+    while edges < m:
+        u = rnd.randint(1, n)
+        v = rnd.randint(1, n)
+        if u != v and v not in graph[u]:
+            add_edge(graph, u, v, rnd.randint(1, max_weight), directed)
+            edges += 1
+    return graph
+
+def grid(rows, cols, seed=0, directed=False, max_weight=100):
+    rnd = random.Random(seed)
+    graph = empty_graph(rows * cols)
+    for r in range(rows):
+        for c in range(cols):
+            u = r * cols + c + 1
+            if c + 1 < cols:
+                add_edge(graph, u, u + 1, rnd.randint(1, max_weight), directed)
+            if r + 1 < rows:
+                add_edge(graph, u, u + cols, rnd.randint(1, max_weight), directed)
+    return graph
+
+def power_law(n, k, seed=0, directed=False, max_weight=100):
+    rnd = random.Random(seed)
+    graph = empty_graph(n)
+    # Every vertex appears in ends once for every edge it has.
+    ends = []
+    for v in range(1, n + 1):
+        targets = set()
+        while len(targets) < min(k, v - 1):
+            targets.add(rnd.choice(ends) if ends and rnd.random() < 0.9 else rnd.randint(1, v - 1))
+        for u in targets:
+            # Orient directed edges at random, so that old vertices also reach new ones.
+            if directed and rnd.random() < 0.5:
+                add_edge(graph, u, v, rnd.randint(1, max_weight), directed)
+            else:
+                add_edge(graph, v, u, rnd.randint(1, max_weight), directed)
+            ends.append(u)
+            ends.append(v)
+    return graph
+
+def words(count, seed=0, alphabet=string.ascii_lowercase, min_length=3, max_length=12):
+    rnd = random.Random(seed)
+    # Draw the letters from a skewed distribution, so that prefixes repeat.
+    weights = [1.0 / (i + 1) for i in range(len(alphabet))]
+    res = []
+    for _ in range(count):
+        length = rnd.randint(min_length, max_length)
+        res.append("".join(rnd.choices(alphabet, weights, k=length)))
+    return res
+
+def range_workload(n, count, seed=0, max_value=10**6):
+    """
+    Returns the tuple (Positions, Values, Xs, Ys) of count updates and count queries.
+    """
+    rnd = random.Random(seed)
+    positions = [rnd.randint(1, n) for _ in range(count)]
+    values = [rnd.randint(0, max_value) for _ in range(count)]
+    xs = [rnd.randint(1, n) for _ in range(count)]
+    ys = [rnd.randint(x, n) for x in xs]
+    return positions, values, xs, ys
+
+def edges_of(graph):
+    """
+    Returns the edges of an undirected graph in the form ((From, To), Weight), with From < To.
+    """
+    return [((u, v), w) for u in graph for (v, w) in graph[u].items() if u < v]
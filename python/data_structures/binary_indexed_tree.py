@@ -12,11 +12,35 @@
         Add X to the sum at position S
     - SUM X Y
         Finds the sum from position X to position Y
+    - ADD_MANY SS XS
+        Adds XS[i] to the sum at position SS[i], for every i
+    - SUM_MANY XS YS
+        Finds the sums from position XS[i] to position YS[i] and returns a NumPy array
+    - LOWER_BOUND S
+        Finds the first position where the sum from position 1 is at least S.
+        All the values must be non-negative.
+    - FIND_KTH K
+        If the value at each position is the number of times the position occurs,
+        finds the position of the K-th smallest occurrence.
 
     The binary indexed tree is 1-indexed.
+    BIT.from_list creates a tree with the given values at positions 1..n in O( n ).
+
+    Also define
+    - RangeBIT
+        Supports adding X to all the positions from S to T and range sums,
+        using two binary indexed trees.
+    - BIT2D
+        A binary indexed tree over a grid, with positions (row, column).
+        Supports adding to a cell and sums over rectangles.
+
+    The batch operations require NumPy. All the positions of a batch move up (or down)
+    the tree together, with one vectorized step per bit of the position.
 
     Time Complexity
         All the operations cost O( logn ), where n is the number of bits of the position.
+        The batch operations also copy the tree to or from an array, in O( n ).
+        The operations of BIT2D cost O( logn logm ) for an n x m grid.
 """
 
 class BIT:
@@ -24,6 +48,20 @@ class BIT:
         self.bit = (n + 1) * [0]  # Position 0 is not used.
         self.n = n
 
+    @classmethod
+    def from_list(cls, xs):
+        """
+        Creates a tree where position i has the value xs[i-1].
+        Each position passes its sum only to its direct parent.
+        """
+        bit = cls(len(xs))
+        for i in range(1, bit.n + 1):
+            bit.bit[i] += xs[i-1]
+            parent = i + (i & -i)
+            if parent <= bit.n:
+                bit.bit[parent] += bit.bit[i]
+        return bit
+
     def add(self, pos, x):
         while pos <= self.n:
             self.bit[pos] += x
@@ -31,7 +69,7 @@ class BIT:
 
     def sum(self, x, y):
         sy = self.sumFromOne(y)
-        return sy if x == 1 else sy - self.sumFromOne(x)
+        return sy if x == 1 else sy - self.sumFromOne(x - 1)
 
     def sumFromOne(self, pos):
         sum = 0
@@ -40,6 +78,117 @@ class BIT:
             pos -= (pos & -pos)
         return sum
 
+    def add_many(self, positions, xs):
+        import numpy as np
+        bit = np.asarray(self.bit)
+        pos = np.asarray(positions, dtype=np.int64)
+        xs = np.asarray(xs)
+        bit = bit.astype(np.result_type(bit, xs))
+        while len(pos):
+            np.add.at(bit, pos, xs)
+            pos = pos + (pos & -pos)
+            inside = pos <= self.n
+            pos, xs = pos[inside], xs[inside]
+        self.bit = bit.tolist()
+
+    def sum_many(self, xs, ys):
+        import numpy as np
+        bit = np.asarray(self.bit)
+        return self.sumFromOne_many(bit, np.asarray(ys, dtype=np.int64)) - \
+               self.sumFromOne_many(bit, np.asarray(xs, dtype=np.int64) - 1)
+
+    def sumFromOne_many(self, bit, positions):
+        import numpy as np
+        sums = np.zeros(len(positions), dtype=bit.dtype)
+        idx = np.arange(len(positions))
+        pos = positions
+        while True:
+            inside = pos > 0
+            idx, pos = idx[inside], pos[inside]
+            if not len(pos):
+                return sums
+            sums[idx] += bit[pos]
+            pos = pos - (pos & -pos)
+
+    def lower_bound(self, s):
+        """
+        Returns the first position where sumFromOne is at least s, or n+1 if there is none.
+        Requires non-negative values.
+        """
+        pos = 0
+        step = 1 << self.n.bit_length()
+        while step > 0:
+            nxt = pos + step
+            if nxt <= self.n and self.bit[nxt] < s:
+                pos = nxt
+                s -= self.bit[nxt]
+            step >>= 1
+        return pos + 1
+
+    def find_kth(self, k):
+        return self.lower_bound(k)
+
+
+class RangeBIT:
+    """
+    The sum from position 1 to p is B1(p) * p - B2(p), where B1 and B2 are
+    the sums from position 1 to p of the two inner trees.
+    """
+    def __init__(self, n):
+        self.b1 = BIT(n)
+        self.b2 = BIT(n)
+        self.n = n
+
+    def add(self, s, t, x):
+        """
+        Adds x to every position from s to t.
+        """
+        self.b1.add(s, x)
+        self.b1.add(t + 1, -x)
+        self.b2.add(s, x * (s - 1))
+        self.b2.add(t + 1, -x * t)
+
+    def sum(self, x, y):
+        sy = self.sumFromOne(y)
+        return sy if x == 1 else sy - self.sumFromOne(x - 1)
+
+    def sumFromOne(self, pos):
+        return self.b1.sumFromOne(pos) * pos - self.b2.sumFromOne(pos)
+
+
+class BIT2D:
+    def __init__(self, n, m):
+        self.bit = [(m + 1) * [0] for _ in range(n + 1)]  # Row 0 and column 0 are not used.
+        self.n = n
+        self.m = m
+
+    def add(self, row, col, x):
+        while row <= self.n:
+            line = self.bit[row]
+            c = col
+            while c <= self.m:
+                line[c] += x
+                c += (c & -c)
+            row += (row & -row)
+
+    def sum(self, row1, col1, row2, col2):
+        """
+        Finds the sum of the rectangle with corners (row1, col1) and (row2, col2).
+        """
+        return self.sumFromOne(row2, col2) - self.sumFromOne(row1 - 1, col2) \
+             - self.sumFromOne(row2, col1 - 1) + self.sumFromOne(row1 - 1, col1 - 1)
+
+    def sumFromOne(self, row, col):
+        sum = 0
+        while row > 0:
+            line = self.bit[row]
+            c = col
+            while c > 0:
+                sum += line[c]
+                c -= (c & -c)
+            row -= (row & -row)
+        return sum
+
 if __name__ == "__main__":
     xs = [7,0,3,2,3,0,0,4,6,3,2,8]
     n = len(xs)
@@ -48,4 +197,54 @@ if __name__ == "__main__":
         bit.add(i, xs[i-1])
     assert ([bit.sum(1, x) for x in range(1, n+1)]) == [sum(xs[0:n]) for n in range(1, n+1)]
     bit.add(5, 3)
-    assert bit.sum(2, n) == sum(xs[2:]) + 3
+    assert bit.sum(2, n) == sum(xs[1:]) + 3
+    assert all(bit.sum(x, y) == sum(xs[x-1:y]) + (3 if x <= 5 <= y else 0) for x in range(1, n+1) for y in range(x, n+1))
+    # Linear time construction.
+    xs[4] += 3
+    assert BIT.from_list(xs).bit == bit.bit
+    # Rank queries.
+    assert [bit.lower_bound(s) for s in [0, 1, 7, 8, 10, 11, 41, 42]] == [1, 1, 1, 3, 3, 4, 12, 13]
+    counts = BIT(10)
+    for v in [3, 7, 7, 1, 9, 3, 3]:
+        counts.add(v, 1)
+    assert [counts.find_kth(k) for k in range(1, 8)] == [1, 3, 3, 3, 7, 7, 9]
+    # Batch additions and sums.
+    import random
+    import numpy as np
+    random.seed(42)
+    xs = 100 * [0]
+    bit = BIT(100)
+    for _ in range(3):
+        positions = [random.randint(1, 100) for _ in range(50)]
+        vals = [random.randint(-100, 100) for _ in range(50)]
+        for (pos, val) in zip(positions, vals):
+            xs[pos-1] += val
+        bit.add_many(np.array(positions), np.array(vals))
+        ls = [random.randint(1, 100) for _ in range(200)]
+        rs = [random.randint(l, 100) for l in ls]
+        assert bit.sum_many(ls, rs).tolist() == [sum(xs[l-1:r]) for (l, r) in zip(ls, rs)]
+    # Range additions with range sums.
+    xs = 30 * [0]
+    rbit = RangeBIT(30)
+    for _ in range(50):
+        s = random.randint(1, 30)
+        t = random.randint(s, 30)
+        v = random.randint(-10, 10)
+        rbit.add(s, t, v)
+        for i in range(s-1, t):
+            xs[i] += v
+        x = random.randint(1, 30)
+        y = random.randint(x, 30)
+        assert rbit.sum(x, y) == sum(xs[x-1:y])
+    # Sums over rectangles.
+    grid = [[0] * 8 for _ in range(6)]
+    bit2 = BIT2D(6, 8)
+    for _ in range(40):
+        r, c, v = random.randint(1, 6), random.randint(1, 8), random.randint(-5, 5)
+        grid[r-1][c-1] += v
+        bit2.add(r, c, v)
+    for r1 in range(1, 7):
+        for r2 in range(r1, 7):
+            for c1 in range(1, 9):
+                for c2 in range(c1, 9):
+                    assert bit2.sum(r1, c1, r2, c2) == sum(sum(line[c1-1:c2]) for line in grid[r1-1:r2])
@@ -15,19 +15,26 @@
         - Find First Item          : O( 1 )
         - Find & Remove First Item : O( logn )
         - Update Priority          : O( logn )
+        - Size & Membership        : O( 1 )
 """
 
 class Heap:
-    def __init__(self, cmpFn, elems=None):
+    def __init__(self, cmpFn, elems=None, stats=None):
         """
         cmpFn: A user-supplied compare function for the binary heap.
         elems: A list of initial elements with their priorities.
                Each element must be in the form (Item, Priority).
+        stats: An optional Stats object that counts the sift steps.
         """
         self.cmpFn = cmpFn
         self.A = [42]  # The element at position 0 is trash.
         self.n = 0
         self.pos = {}
+        if stats != None:
+            # Replace the sift methods, so that a heap without stats does no counting.
+            self.stats = stats
+            self.combine = self.counted_combine
+            self.insert_loop = self.counted_insert_loop
         if elems != None:
             self.construct_heap(elems)
 
@@ -56,6 +63,7 @@ class Heap:
         if self.n == 0:
             return None
         first = self.A[1]
+        del self.pos[first[0]]
         self.n -= 1
         last = self.A.pop()
         if self.n > 0:
@@ -64,6 +72,18 @@ class Heap:
             self.combine(1)
         return first[0]
 
+    def __len__(self):
+        """
+        Gets the number of elements in the heap.
+        """
+        return self.n
+
+    def __contains__(self, elem):
+        """
+        Checks whether the element elem is in the heap.
+        """
+        return elem in self.pos
+
     def combine(self, i):
         l = 2*i
         r = l+1
@@ -78,24 +98,38 @@ class Heap:
             self.A[i], self.A[mp] = Amp, Ai
             self.combine(mp)
 
+    def counted_combine(self, i):
+        self.stats.count("heap_sift_down")
+        Heap.combine(self, i)
+
     def insert(self, elem, prio):
         """
         Inserts the element elem with priority prio.
         """
         self.n += 1
-        self.A.append( (e,w) )
-        self.pos[e] = self.n
+        self.A.append( (elem, prio) )
+        self.pos[elem] = self.n
         i = self.n
         p = i // 2
         self.insert_loop(i, p)
 
     def insert_loop(self, i, p):
+        """
+        Moves the element at position i up and returns its final position.
+        """
         while i > 1 and not self.cmpFn(self.A[p][1], self.A[i][1]):
             Ap, Ai = self.A[p], self.A[i]
             self.pos[Ai[0]], self.pos[Ap[0]] = self.pos[Ap[0]], self.pos[Ai[0]] 
             self.A[p], self.A[i] = Ai, Ap
             i = p
             p = i // 2
+        return i
+
+    def counted_insert_loop(self, i, p):
+        # Every swap moves the element one level up.
+        j = Heap.insert_loop(self, i, p)
+        self.stats.count("heap_sift_up", i.bit_length() - j.bit_length())
+        return j
 
     def change_priority(self, elem, prio):
         """
@@ -121,8 +155,8 @@ class MinHeap(Heap):
     """
     A min heap.
     """
-    def __init__(self, elems=None):
-        Heap.__init__(self, lambda x,y: x < y, elems)
+    def __init__(self, elems=None, stats=None):
+        Heap.__init__(self, lambda x,y: x < y, elems, stats)
 
     def min(self):
         """
@@ -144,8 +178,8 @@ class MaxHeap(Heap):
     """
     A max heap.
     """
-    def __init__(self, elems=None):
-        Heap.__init__(self, lambda x,y: x > y, elems)
+    def __init__(self, elems=None, stats=None):
+        Heap.__init__(self, lambda x,y: x > y, elems, stats)
 
     def max(self):
         """
@@ -200,4 +234,20 @@ if __name__ == "__main__":
     while h.max():
         xs.append(h.take_max())
     assert xs == list(map(lambda x: x[0], sorted(items, key=lambda x: x[1], reverse=True)))
+    # Size and membership.
+    h = MinHeap([('a', 2), ('b', 1)])
+    assert len(h) == 2 and 'a' in h and 'b' in h and 'c' not in h
+    h.take_min()
+    assert len(h) == 1 and 'b' not in h
+    h.take_min()
+    assert len(h) == 0 and not h and 'a' not in h
+    # Count the sift steps.
+    from stats import Stats
+    stats = Stats()
+    h = MinHeap([('a', 1), ('b', 2), ('c', 3)], stats)
+    assert stats.counters["heap_sift_down"] == 1
+    h.insert('d', 0)
+    assert stats.counters["heap_sift_up"] == 2
+    assert h.take_min() == 'd'
+    assert stats.counters["heap_sift_down"] == 3
 
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Link-Cut Tree
+    -------------
+
+    Description from
+        - https://en.wikipedia.org/wiki/Link/cut_tree
+
+    Maintains a forest of rooted trees, whose nodes have values, under the operations:
+    LINK X Y
+        Adds an edge between X and Y, which belong to different trees, joining the two trees.
+    CUT X Y
+        Removes the edge between the adjacent nodes X and Y, splitting their tree.
+    CONNECTED X Y
+        Finds whether X and Y belong to the same tree.
+    PATH_MAX X Y
+        Finds the node with the maximum value on the path from X to Y.
+
+    Each tree is split into preferred paths and each path is kept in a splay tree,
+    keyed by depth. Reversing a splay tree (lazily) re-roots the represented tree.
+
+    The nodes are kept in lists, where node i has the children Left[i] and Right[i],
+    the parent Parent[i], the value Val[i] and the node with the maximum value in its
+    splay subtree Agg[i]. Node 0 is not used, it marks missing nodes.
+
+    Time Complexity
+        All the operations cost O( logn ) amortized, where n is the number of nodes.
+"""
+
+class LinkCutTree:
+    def __init__(self):
+        self.left = [0]
+        self.right = [0]
+        self.parent = [0]
+        self.rev = [False]
+        self.val = [float("-inf")]
+        self.agg = [0]
+
+    def add_node(self, val):
+        """
+        Adds a new tree with a single node and returns the node.
+        """
+        self.left.append(0)
+        self.right.append(0)
+        self.parent.append(0)
+        self.rev.append(False)
+        self.val.append(val)
+        self.agg.append(len(self.val) - 1)
+        return len(self.val) - 1
+
+    def link(self, x, y):
+        """
+        Joins the trees of x and y with an edge between x and y.
+        They must belong to different trees.
+        """
+        self.make_root(x)
+        self.parent[x] = y
+
+    def cut(self, x, y):
+        """
+        Removes the edge between x and y.
+        """
+        self.make_root(x)
+        self.access(y)
+        # Now x is the only node above y on the preferred path, so it is the left child of y.
+        self.left[y] = 0
+        self.parent[x] = 0
+        self.update(y)
+
+    def connected(self, x, y):
+        return x == y or self.find_root(x) == self.find_root(y)
+
+    def path_max(self, x, y):
+        """
+        Returns the node with the maximum value on the path from x to y.
+        """
+        self.make_root(x)
+        self.access(y)
+        return self.agg[y]
+
+    def find_root(self, x):
+        self.access(x)
+        while True:
+            self.push(x)
+            if self.left[x] == 0:
+                break
+            x = self.left[x]
+        self.splay(x)
+        return x
+
+    def make_root(self, x):
+        self.access(x)
+        self.rev[x] = not self.rev[x]
+
+    def access(self, x):
+        """
+        Makes the path from the root to x preferred and splays x to the top of its splay tree.
+        """
+        last = 0
+        y = x
+        while y != 0:
+            self.splay(y)
+            self.right[y] = last
+            self.update(y)
+            last = y
+            y = self.parent[y]
+        self.splay(x)
+
+    def is_root(self, x):
+        """
+        Checks whether x is the root of its splay tree.
+        """
+        p = self.parent[x]
+        return p == 0 or (self.left[p] != x and self.right[p] != x)
+
+    def push(self, x):
+        if self.rev[x]:
+            self.rev[x] = False
+            l, r = self.left[x], self.right[x]
+            self.left[x], self.right[x] = r, l
+            if l != 0:
+                self.rev[l] = not self.rev[l]
+            if r != 0:
+                self.rev[r] = not self.rev[r]
+
+    def update(self, x):
+        best = x
+        aggL = self.agg[self.left[x]]
+        aggR = self.agg[self.right[x]]
+        if self.val[aggL] > self.val[best]:
+            best = aggL
+        if self.val[aggR] > self.val[best]:
+            best = aggR
+        self.agg[x] = best
+
+    def rotate(self, x):
+        p = self.parent[x]
+        g = self.parent[p]
+        if not self.is_root(p):
+            if self.left[g] == p:
+                self.left[g] = x
+            else:
+                self.right[g] = x
+        self.parent[x] = g
+        if self.left[p] == x:
+            c = self.right[x]
+            self.left[p] = c
+            self.right[x] = p
+        else:
+            c = self.left[x]
+            self.right[p] = c
+            self.left[x] = p
+        if c != 0:
+            self.parent[c] = p
+        self.parent[p] = x
+        self.update(p)
+        self.update(x)
+
+    def splay(self, x):
+        # Push the pending reversals from the top of the splay tree down to x.
+        path = [x]
+        y = x
+        while not self.is_root(y):
+            y = self.parent[y]
+            path.append(y)
+        for y in reversed(path):
+            self.push(y)
+        while not self.is_root(x):
+            p = self.parent[x]
+            if not self.is_root(p):
+                g = self.parent[p]
+                if (self.left[g] == p) == (self.left[p] == x):
+                    self.rotate(p)
+                else:
+                    self.rotate(x)
+            self.rotate(x)
+
+
+if __name__ == "__main__":
+    import random
+    random.seed(42)
+    # Compare with a naive forest, where the paths are found with a DFS.
+    n = 40
+    lct = LinkCutTree()
+    nodes = [lct.add_node(random.randint(0, 1000)) for _ in range(n)]
+    adj = dict((x, set()) for x in nodes)
+    def path(x, y):
+        stack, prev = [x], {x: None}
+        while stack:
+            u = stack.pop()
+            for v in adj[u]:
+                if v not in prev:
+                    prev[v] = u
+                    stack.append(v)
+        if y not in prev:
+            return None
+        p = [y]
+        while p[-1] != x:
+            p.append(prev[p[-1]])
+        return p
+    edges = []
+    for _ in range(2000):
+        x, y = random.choice(nodes), random.choice(nodes)
+        p = path(x, y)
+        assert lct.connected(x, y) == (p != None)
+        if p == None:
+            lct.link(x, y)
+            adj[x].add(y)
+            adj[y].add(x)
+            edges.append((x, y))
+        else:
+            assert lct.val[lct.path_max(x, y)] == max(lct.val[z] for z in p)
+            if edges and random.random() < 0.3:
+                (u, v) = edges.pop(random.randrange(len(edges)))
+                lct.cut(u, v)
+                adj[u].remove(v)
+                adj[v].remove(u)
@@ -8,7 +8,7 @@
     Yannis Chatzimichos @ https://git.softlab.ntua.gr/public/pdp-camp/blob/master/2013/advanced_data_structures.pdf
 
     This implementation assumes ranges from 1 to n, where points are integers.
-    If a range from x to y is required, it must be first be mapped to the range from 1 to (y-x).
+    For other or huge ranges, see CompressedSegmentTree and DynamicSegmentTree below.
 
     The constructor requires:
     N
@@ -21,15 +21,153 @@
         Updates the value at position X to V.
     QUERY X Y
         Queries the range from position X to Y.
+    UPDATE_MANY XS VS
+        Updates the values at positions XS[i] to VS[i], in order.
+    QUERY_MANY XS YS
+        Queries the ranges from XS[i] to YS[i] and returns a NumPy array.
+
+    The batch operations require NumPy. When Comp is min, max, operator.add or a
+    commutative NumPy ufunc (see COMMUTATIVE_UFUNCS), the whole batch walks down (or up)
+    the tree one level at a time, with one vectorized step per level. Otherwise, e.g. for
+    numpy.subtract, each operation of the batch is done separately.
 
     Time Complexity
         All the operations cost O( logn ), where n is the length of the whole range.
+        The batch operations also copy the tree to or from an array, in O( n ).
+
+    Lazy Segment Tree
+    -----------------
+
+    LazySegmentTree supports updates over whole ranges, using lazy propagation.
+    A pending update is stored at the highest node that covers it and is pushed
+    to the children only when a later operation needs to visit them.
+
+    The constructor requires:
+    N
+        The 1..N range.
+    Comp
+        The associative function that combines the values of two adjacent ranges.
+    Apply
+        apply(upd, val, length) returns the new value of a range of the given length,
+        whose old value was val, after the update upd is applied to all its points.
+    Compose
+        compose(new, old) returns the single update that has the same effect as
+        applying the update old and then the update new.
+
+    Supports the operations:
+    UPDATE X Y U
+        Applies the update U to every position from X to Y.
+    QUERY X Y
+        Queries the range from position X to Y.
+
+    For example, adding to ranges and querying range sums is done with
+        LazySegmentTree(n, lambda x,y: x + y,
+                        lambda u,v,l: v + u * l,
+                        lambda u,v: u + v)
+    and assigning to ranges and querying range minimums is done with
+        LazySegmentTree(n, lambda x,y: min(x,y),
+                        lambda u,v,l: u,
+                        lambda u,v: u)
+
+    Time Complexity
+        All the operations cost O( logn ), where n is the length of the whole range.
+
+    Persistent Segment Tree
+    -----------------------
+
+    PersistentSegmentTree keeps every version of the tree. An update copies only the
+    nodes on the path from the root to the updated leaf, so the new version shares
+    all the other nodes with the old one.
+
+    The nodes are kept in three lists (the pool), where Left[i], Right[i] and Segs[i]
+    are the children and the value of node i. Each version is the index of its root.
+
+    The constructor requires:
+    N
+        The 1..N range.
+    Comp
+        The comparator function.
+
+    Supports the operations:
+    UPDATE K X V
+        Creates a new version from version K, where the value at position X is V,
+        and returns its number. Version 0 has all values equal to 0.
+    QUERY K X Y
+        Queries the range from position X to Y, as it was in version K.
+    DISCARD K
+        Marks version K as no longer needed.
+    COLLECT
+        Removes the nodes that only belong to discarded versions from the pool.
+
+    Time & Space Complexity
+        Update and Query cost O( logn ) and each update adds O( logn ) nodes to the pool.
+        Collect costs O( m ), where m is the number of nodes in the pool.
+
+    Compressed Segment Tree
+    -----------------------
+
+    CompressedSegmentTree is a SegmentTree over any set of positions that is known in
+    advance (offline), e.g. 64-bit timestamps. The positions are sorted and mapped to
+    1..k with an IntMapper (see utils/mapper.py), so the tree only needs k leaves.
+    Updates must use one of the positions. Queries may use any X <= Y; as in SegmentTree,
+    the points that were never updated have the value 0.
+
+    The constructor requires:
+    Positions
+        The positions that will be updated (repeated ones are allowed).
+    Comp
+        The comparator function.
+
+    Supports the operations UPDATE X V and QUERY X Y, as SegmentTree.
+
+    Time Complexity
+        O( k logk ) to build, O( logk ) per update and O( logk ) per query.
+
+    Dynamic Segment Tree
+    --------------------
+
+    DynamicSegmentTree covers the range Lo..Hi, which may be huge, and only allocates the
+    nodes on the paths of the updated positions, from a pool of arrays as in
+    PersistentSegmentTree. A missing child is node 0, whose value is 0, like the value of
+    every position that was never updated.
+
+    The constructor requires:
+    Lo, Hi
+        The Lo..Hi range.
+    Comp
+        The comparator function.
+
+    Supports the operations UPDATE X V and QUERY X Y, as SegmentTree.
+
+    Time & Space Complexity
+        O( log(Hi - Lo) ) per operation. Each update adds at most log(Hi - Lo) + 1 nodes,
+        so the pool has O( u log(Hi - Lo) ) nodes after u updates.
 """
 
+import bisect
+import operator
+from array import array
+
+# The names of the NumPy ufuncs that are associative and commutative. The vectorized
+# operations combine the parts of a range in any order, so they only accept these.
+COMMUTATIVE_UFUNCS = set(["add", "multiply", "minimum", "maximum", "fmin", "fmax",
+                          "logical_and", "logical_or", "logical_xor",
+                          "bitwise_and", "bitwise_or", "bitwise_xor", "gcd", "lcm"])
+
+def as_ufunc(comp):
+    """
+    Returns the commutative NumPy ufunc that is equivalent to comp, or None if there is no
+    such ufunc. Other ufuncs, e.g. numpy.subtract, give None, so they are applied in order.
+    """
+    import numpy as np
+    if isinstance(comp, np.ufunc):
+        return comp if comp.__name__ in COMMUTATIVE_UFUNCS else None
+    return {min: np.minimum, max: np.maximum, operator.add: np.add}.get(comp)
+
 class SegmentTree:
     def __init__(self, n, comp):
         self.comp = comp
-        self.segs = (3 * n + 1) * [0]  # Position 0 is not used.
+        self.segs = 4 * n * [0]  # Position 0 is not used.
         self.n = n
     
     def update(self, pos, val):
@@ -66,6 +204,340 @@ class SegmentTree:
             return self.comp(self.query0(qx, mid, x, mid, left),
                              self.query0(mid1, qy, mid1, y, right))
 
+    def update_many(self, positions, vals):
+        """
+        Updates the value at each position of positions to the matching value of vals.
+        If a position appears more than once, its last value is kept.
+        """
+        import numpy as np
+        ufunc = as_ufunc(self.comp)
+        if ufunc == None:
+            for (pos, val) in zip(positions, vals):
+                self.update(pos, val)
+            return
+        positions = np.asarray(positions)
+        vals = np.asarray(vals)
+        # Keep only the last value of every position.
+        _, last = np.unique(positions[::-1], return_index=True)
+        last = len(positions) - 1 - last
+        positions, vals = positions[last], vals[last]
+        # Walk down to the leaves of all the positions together.
+        ids = np.ones(len(positions), dtype=np.int64)
+        x = np.ones(len(positions), dtype=np.int64)
+        y = np.full(len(positions), self.n, dtype=np.int64)
+        while True:
+            inner = x < y
+            if not inner.any():
+                break
+            mid = (x + y) // 2
+            goLeft = positions <= mid
+            ids = np.where(inner, np.where(goLeft, 2 * ids, 2 * ids + 1), ids)
+            y = np.where(inner & goLeft, mid, y)
+            x = np.where(inner & ~goLeft, mid + 1, x)
+        segs = np.asarray(self.segs)
+        segs = segs.astype(np.result_type(segs, vals))
+        segs[ids] = vals
+        # Recompute the parents, then the grandparents etc. of the leaves.
+        # A node may be recomputed more than once, because the leaves have different depths,
+        # but its last recomputation comes after the last recomputation of its children.
+        ids = np.unique(ids // 2)
+        ids = ids[ids > 0]
+        while len(ids):
+            segs[ids] = ufunc(segs[2 * ids], segs[2 * ids + 1])
+            ids = np.unique(ids // 2)
+            ids = ids[ids > 0]
+        self.segs = segs.tolist()
+
+    def query_many(self, xs, ys):
+        """
+        Queries the ranges xs[i]..ys[i] and returns the results as a NumPy array.
+        """
+        import numpy as np
+        ufunc = as_ufunc(self.comp)
+        if ufunc == None:
+            return np.array([self.query(x, y) for (x, y) in zip(xs, ys)])
+        segs = np.asarray(self.segs)
+        qx = np.asarray(xs, dtype=np.int64)
+        qy = np.asarray(ys, dtype=np.int64)
+        m = len(qx)
+        res = np.zeros(m, dtype=segs.dtype)
+        filled = np.zeros(m, dtype=bool)
+        # Each pending part of a query is (Query, QX, QY, X, Y, Id).
+        q = np.arange(m)
+        x = np.ones(m, dtype=np.int64)
+        y = np.full(m, self.n, dtype=np.int64)
+        ids = np.ones(m, dtype=np.int64)
+        while len(q):
+            done = (x == qx) & (y == qy)
+            if done.any():
+                combine_many(ufunc, res, filled, q[done], segs[ids[done]])
+                keep = ~done
+                q, qx, qy, x, y, ids = q[keep], qx[keep], qy[keep], x[keep], y[keep], ids[keep]
+            mid = (x + y) // 2
+            l = qx <= mid
+            r = qy > mid
+            q = np.concatenate((q[l], q[r]))
+            qx, qy = np.concatenate((qx[l], np.maximum(qx[r], mid[r] + 1))), \
+                     np.concatenate((np.minimum(qy[l], mid[l]), qy[r]))
+            x, y = np.concatenate((x[l], mid[r] + 1)), np.concatenate((mid[l], y[r]))
+            ids = np.concatenate((2 * ids[l], 2 * ids[r] + 1))
+        return res
+
+
+def combine_many(ufunc, res, filled, q, vals):
+    """
+    Combines each value vals[i] into the result res[q[i]] of its query.
+    The results that are not filled yet are set to their first value.
+    """
+    import numpy as np
+    fresh = ~filled[q]
+    if fresh.any():
+        first, pos = np.unique(q[fresh], return_index=True)
+        pos = np.flatnonzero(fresh)[pos]
+        res[first] = vals[pos]
+        filled[first] = True
+        rest = np.ones(len(q), dtype=bool)
+        rest[pos] = False
+        q, vals = q[rest], vals[rest]
+    ufunc.at(res, q, vals)
+
+
+class LazySegmentTree:
+    def __init__(self, n, comp, apply, compose):
+        self.comp = comp
+        self.apply = apply
+        self.compose = compose
+        self.segs = 4 * n * [0]  # Position 0 is not used.
+        self.lazy = 4 * n * [None]  # None means that there is no pending update.
+        self.n = n
+
+    def update(self, x, y, upd):
+        self.update0(x, y, upd, 1, self.n, 1)
+
+    def update0(self, qx, qy, upd, x, y, id):
+        if x == qx and y == qy:
+            self.mark(id, upd, y - x + 1)
+            return
+        self.push(id, x, y)
+        mid = (x + y) // 2
+        mid1 = mid + 1
+        left = 2 * id
+        right = left + 1
+        if qy <= mid:
+            self.update0(qx, qy, upd, x, mid, left)
+        elif qx > mid:
+            self.update0(qx, qy, upd, mid1, y, right)
+        else:
+            self.update0(qx, mid, upd, x, mid, left)
+            self.update0(mid1, qy, upd, mid1, y, right)
+        self.segs[id] = self.comp(self.segs[left], self.segs[right])
+
+    def query(self, x, y):
+        return self.query0(x, y, 1, self.n, 1)
+
+    def query0(self, qx, qy, x, y, id):
+        if x == qx and y == qy:
+            return self.segs[id]
+        self.push(id, x, y)
+        mid = (x + y) // 2
+        mid1 = mid + 1
+        left = 2 * id
+        right = left + 1
+        if qy <= mid:
+            return self.query0(qx, qy, x, mid, left)
+        elif qx > mid:
+            return self.query0(qx, qy, mid1, y, right)
+        else:
+            return self.comp(self.query0(qx, mid, x, mid, left),
+                             self.query0(mid1, qy, mid1, y, right))
+
+    def mark(self, id, upd, length):
+        """
+        Applies the update upd to the node id and keeps it pending for its children.
+        """
+        self.segs[id] = self.apply(upd, self.segs[id], length)
+        pending = self.lazy[id]
+        self.lazy[id] = upd if pending == None else self.compose(upd, pending)
+
+    def push(self, id, x, y):
+        """
+        Pushes the pending update of the node id, that covers x..y, to its children.
+        """
+        upd = self.lazy[id]
+        if upd != None:
+            mid = (x + y) // 2
+            left = 2 * id
+            self.mark(left, upd, mid - x + 1)
+            self.mark(left + 1, upd, y - mid)
+            self.lazy[id] = None
+
+
+class PersistentSegmentTree:
+    def __init__(self, n, comp):
+        self.comp = comp
+        self.n = n
+        self.left = [0]  # Node 0 is not used, it marks the missing children of leaves.
+        self.right = [0]
+        self.segs = [0]
+        self.roots = [self.build0(1, n)]  # Maps versions to roots, or None if discarded.
+
+    def new_node(self, left, right, val):
+        self.left.append(left)
+        self.right.append(right)
+        self.segs.append(val)
+        return len(self.segs) - 1
+
+    def build0(self, x, y):
+        if x == y:
+            return self.new_node(0, 0, 0)
+        mid = (x + y) // 2
+        left = self.build0(x, mid)
+        right = self.build0(mid + 1, y)
+        return self.new_node(left, right, self.comp(self.segs[left], self.segs[right]))
+
+    def update(self, version, pos, val):
+        self.roots.append(self.update0(self.roots[version], pos, val, 1, self.n))
+        return len(self.roots) - 1
+
+    def update0(self, id, pos, val, x, y):
+        if x == y:
+            return self.new_node(0, 0, val)
+        mid = (x + y) // 2
+        left = self.left[id]
+        right = self.right[id]
+        if pos <= mid:
+            left = self.update0(left, pos, val, x, mid)
+        else:
+            right = self.update0(right, pos, val, mid + 1, y)
+        return self.new_node(left, right, self.comp(self.segs[left], self.segs[right]))
+
+    def query(self, version, x, y):
+        return self.query0(self.roots[version], x, y, 1, self.n)
+
+    def query0(self, id, qx, qy, x, y):
+        if x == qx and y == qy:
+            return self.segs[id]
+        mid = (x + y) // 2
+        mid1 = mid + 1
+        if qy <= mid:
+            return self.query0(self.left[id], qx, qy, x, mid)
+        elif qx > mid:
+            return self.query0(self.right[id], qx, qy, mid1, y)
+        else:
+            return self.comp(self.query0(self.left[id], qx, mid, x, mid),
+                             self.query0(self.right[id], mid1, qy, mid1, y))
+
+    def discard(self, version):
+        """
+        Marks a version as no longer needed. Its nodes are freed by the next collect.
+        """
+        self.roots[version] = None
+
+    def collect(self):
+        """
+        Rebuilds the pool with only the nodes of the versions that are not discarded.
+        The version numbers do not change.
+        """
+        remap = len(self.segs) * [0]
+        left, right, segs = [0], [0], [0]
+        for (version, root) in enumerate(self.roots):
+            if root == None or remap[root] != 0:
+                continue
+            # Copy the nodes in post-order, so that children are renumbered before their parent.
+            stack = [(root, False)]
+            while stack:
+                (id, expanded) = stack.pop()
+                if remap[id] != 0:
+                    continue
+                l, r = self.left[id], self.right[id]
+                if not expanded and l != 0:
+                    stack.append((id, True))
+                    stack.append((r, False))
+                    stack.append((l, False))
+                    continue
+                left.append(remap[l])
+                right.append(remap[r])
+                segs.append(self.segs[id])
+                remap[id] = len(segs) - 1
+        self.roots = [None if root == None else remap[root] for root in self.roots]
+        self.left, self.right, self.segs = left, right, segs
+
+
+class CompressedSegmentTree:
+    def __init__(self, positions, comp):
+        from mapper import IntMapper
+        self.keys = sorted(set(positions))
+        self.mapper = IntMapper(False, 1)
+        self.mapper.intern(self.keys)
+        self.tree = SegmentTree(max(len(self.keys), 1), comp)
+
+    def update(self, pos, val):
+        self.tree.update(self.mapper.lookup_item(pos), val)
+
+    def query(self, x, y):
+        # The positions that fall in x..y are the ones from lo to hi.
+        lo = bisect.bisect_left(self.keys, x) + 1
+        hi = bisect.bisect_right(self.keys, y)
+        if lo > hi:
+            return 0
+        res = self.tree.query(lo, hi)
+        if hi - lo < y - x:
+            # Some points of x..y were never updated, so they also count, with the value 0.
+            res = self.tree.comp(res, 0)
+        return res
+
+
+class DynamicSegmentTree:
+    def __init__(self, lo, hi, comp):
+        self.comp = comp
+        self.lo = lo
+        self.hi = hi
+        self.left = array('q', [0, 0])  # Node 0 is the missing child and node 1 is the root.
+        self.right = array('q', [0, 0])
+        self.segs = [0, 0]
+
+    def new_node(self):
+        self.left.append(0)
+        self.right.append(0)
+        self.segs.append(0)
+        return len(self.segs) - 1
+
+    def update(self, pos, val):
+        # Walk down, creating the missing nodes, and then combine the values on the way up.
+        path = []
+        id, x, y = 1, self.lo, self.hi
+        while x != y:
+            path.append(id)
+            mid = (x + y) // 2
+            if pos <= mid:
+                if self.left[id] == 0:
+                    self.left[id] = self.new_node()
+                id, y = self.left[id], mid
+            else:
+                if self.right[id] == 0:
+                    self.right[id] = self.new_node()
+                id, x = self.right[id], mid + 1
+        self.segs[id] = val
+        segs = self.segs
+        for id in reversed(path):
+            segs[id] = self.comp(segs[self.left[id]], segs[self.right[id]])
+
+    def query(self, x, y):
+        return self.query0(1, x, y, self.lo, self.hi)
+
+    def query0(self, id, qx, qy, x, y):
+        if id == 0 or (x == qx and y == qy):
+            return self.segs[id]
+        mid = (x + y) // 2
+        mid1 = mid + 1
+        if qy <= mid:
+            return self.query0(self.left[id], qx, qy, x, mid)
+        elif qx > mid:
+            return self.query0(self.right[id], qx, qy, mid1, y)
+        else:
+            return self.comp(self.query0(self.left[id], qx, mid, x, mid),
+                             self.query0(self.right[id], mid1, qy, mid1, y))
+
 
 if __name__ == "__main__":
     import sys
@@ -78,3 +550,110 @@ if __name__ == "__main__":
     assert sg.query(7, 9) == 5
     assert sg.query(3, 9) == 5
     assert sg.query(2, 7) == 3
+    # The range must be big enough for every node of the tree.
+    sg = SegmentTree(36, lambda x,y: x + y)
+    for i in range(1, 37):
+        sg.update(i, i)
+    assert sg.query(1, 36) == 666
+    # Range additions with range sums.
+    xs = 12 * [0]
+    lsg = LazySegmentTree(12, lambda x,y: x + y, lambda u,v,l: v + u * l, lambda u,v: u + v)
+    for (x, y, u) in [(1, 12, 2), (3, 7, 5), (6, 10, -1), (12, 12, 4)]:
+        lsg.update(x, y, u)
+        for i in range(x-1, y):
+            xs[i] += u
+    assert all(lsg.query(x, y) == sum(xs[x-1:y]) for x in range(1, 13) for y in range(x, 13))
+    # Range assignments with range minimums.
+    xs = 12 * [0]
+    lsg = LazySegmentTree(12, lambda x,y: min(x,y), lambda u,v,l: u, lambda u,v: u)
+    for (x, y, u) in [(1, 12, 9), (2, 8, 4), (5, 6, 7), (8, 11, 1), (1, 3, 6)]:
+        lsg.update(x, y, u)
+        for i in range(x-1, y):
+            xs[i] = u
+    assert all(lsg.query(x, y) == min(xs[x-1:y]) for x in range(1, 13) for y in range(x, 13))
+    # Range additions and assignments with range maximums.
+    # An update is the pair (Assign, Add), where Assign is None when nothing is assigned.
+    def apply(u, v, l):
+        (a, d) = u
+        return (v if a == None else a) + d
+    def compose(u, v):
+        (a, d) = u
+        return (v[0], v[1] + d) if a == None else u
+    xs = 12 * [0]
+    lsg = LazySegmentTree(12, lambda x,y: max(x,y), apply, compose)
+    for (x, y, a, d) in [(1, 12, None, 3), (4, 9, 1, 0), (2, 5, None, 6), (7, 12, 8, 0), (1, 8, None, -2)]:
+        lsg.update(x, y, (a, d))
+        for i in range(x-1, y):
+            xs[i] = (xs[i] if a == None else a) + d
+    assert all(lsg.query(x, y) == max(xs[x-1:y]) for x in range(1, 13) for y in range(x, 13))
+    # Batch updates and queries.
+    import random
+    import numpy as np
+    random.seed(42)
+    for (n, comp) in [(1, max), (37, min), (100, operator.add), (100, lambda x,y: max(x,y))]:
+        sg1, sg2 = SegmentTree(n, comp), SegmentTree(n, comp)
+        for _ in range(3):
+            positions = [random.randint(1, n) for _ in range(50)]
+            vals = [random.randint(-100, 100) for _ in range(50)]
+            for (pos, val) in zip(positions, vals):
+                sg1.update(pos, val)
+            sg2.update_many(np.array(positions), np.array(vals))
+            assert sg1.segs == sg2.segs
+            xs = [random.randint(1, n) for _ in range(200)]
+            ys = [random.randint(x, n) for x in xs]
+            assert sg2.query_many(xs, ys).tolist() == [sg1.query(x, y) for (x, y) in zip(xs, ys)]
+    # A ufunc that is not commutative is applied in order, one query at a time.
+    assert as_ufunc(np.subtract) == None and as_ufunc(np.multiply) is np.multiply
+    sg = SegmentTree(8, np.subtract)
+    for i in range(1, 9):
+        sg.update(i, i * i)
+    assert sg.query_many([1, 2, 3], [8, 5, 3]).tolist() == [sg.query(1, 8), sg.query(2, 5), 9]
+    # Persistent segment tree.
+    n = 37
+    pst = PersistentSegmentTree(n, max)
+    history = [n * [0]]
+    versions = [0]
+    for _ in range(100):
+        base = random.randrange(len(versions))
+        pos, val = random.randint(1, n), random.randint(-100, 100)
+        xs = list(history[base])
+        xs[pos-1] = val
+        history.append(xs)
+        versions.append(pst.update(versions[base], pos, val))
+    # Every update adds at most one node per level.
+    nodes = len(pst.segs)
+    assert nodes <= 2 * n + 100 * (n.bit_length() + 1)
+    for (version, xs) in zip(versions, history):
+        assert all(pst.query(version, x, y) == max(xs[x-1:y]) for x in range(1, n+1, 3) for y in range(x, n+1, 2))
+    # Discard half of the versions and free their nodes.
+    for version in versions[::2]:
+        pst.discard(version)
+    pst.collect()
+    assert len(pst.segs) < nodes
+    for (version, xs) in list(zip(versions, history))[1::2]:
+        assert all(pst.query(version, x, y) == max(xs[x-1:y]) for x in range(1, n+1, 3) for y in range(x, n+1, 2))
+    v = pst.update(versions[1], 5, 1000)
+    assert pst.query(v, 1, n) == 1000 and pst.query(versions[1], 1, n) == max(history[1])
+    # Huge ranges of 64-bit positions.
+    lo, hi = 0, 2**64 - 1
+    updates = [(random.randint(lo, hi), random.randint(-100, 100)) for _ in range(300)]
+    updates += [(lo, 7), (hi, -3), (updates[0][0], 42)]
+    values = {}
+    for (comp, merge) in [(max, max), (operator.add, sum)]:
+        dsg = DynamicSegmentTree(lo, hi, comp)
+        csg = CompressedSegmentTree([pos for (pos, _) in updates], comp)
+        for (pos, val) in updates:
+            dsg.update(pos, val)
+            csg.update(pos, val)
+            values[pos] = val
+        keys = sorted(values)
+        for _ in range(200):
+            x = random.randint(lo, hi)
+            y = random.randint(x, hi)
+            inside = [values[k] for k in keys if x <= k <= y]
+            expected = merge(inside + ([0] if len(inside) < y - x + 1 else []))
+            assert dsg.query(x, y) == csg.query(x, y) == expected
+        assert dsg.query(lo, hi) == csg.query(lo, hi) == merge(list(values.values()) + [0])
+        assert dsg.query(hi, hi) == csg.query(hi, hi) == -3
+        assert csg.query(keys[1] + 1, keys[2] - 1) == dsg.query(keys[1] + 1, keys[2] - 1) == 0
+        assert len(dsg.segs) <= 2 + len(updates) * 64
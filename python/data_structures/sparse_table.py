@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Sparse Table
+    ------------
+
+    Static structures for range queries over the positions 1 to n, with the same
+    comparator function as the Segment Tree. They precompute the answers of enough
+    ranges, so that every query combines just two of them.
+
+    SparseTable
+        Keeps the answer of every range of length 2^k. A query of x..y combines the
+        two (possibly overlapping) ranges of length 2^k that start at x and end at y,
+        so the comparator must be idempotent, e.g. min or max.
+
+    DisjointSparseTable
+        For every level k, splits the positions into blocks of length 2^(k+1) and keeps
+        the answers from every position to the middle of its block. A query of x..y
+        combines the two disjoint ranges around the middle of the smallest block that
+        contains both x and y, so the comparator only needs to be associative, e.g. +.
+
+    The constructors require:
+    XS
+        The initial values of the positions 1 to n.
+    Comp
+        The comparator function.
+
+    Supports the operations:
+    UPDATE X V
+        Updates the value at position X to V and rebuilds the table.
+    QUERY X Y
+        Queries the range from position X to Y.
+    QUERY_MANY XS YS
+        Queries the ranges from XS[i] to YS[i] and returns a NumPy array.
+
+    When Comp is min, max, operator.add or a commutative NumPy ufunc, the table is
+    built with NumPy, one vectorized step per level. Otherwise it is built with lists.
+
+    The function range_query_structure chooses between a static table and a dynamic
+    Segment Tree, given the expected number of reads and writes.
+
+    Time Complexity
+        Build & Update : O( nlogn )
+        Query          : O( 1 )
+"""
+
+import operator
+from segment_tree import SegmentTree, as_ufunc
+
+def is_idempotent(comp):
+    """
+    Returns whether comp(x, x) == x is known to hold for every x.
+    """
+    ufunc = as_ufunc(comp)
+    if ufunc == None:
+        return False
+    import numpy as np
+    return ufunc in (np.minimum, np.maximum, np.fmin, np.fmax,
+                     np.bitwise_and, np.bitwise_or, np.gcd)
+
+def range_query_structure(xs, comp, reads, writes, idempotent=None):
+    """
+    Creates a structure for range queries over the values xs.
+    It is static if the cost of rebuilding it for every write is paid off by
+    the O(1) reads, otherwise it is a Segment Tree.
+    reads: The expected number of queries.
+    writes: The expected number of updates.
+    idempotent: Whether comp(x, x) == x. If None, it is only True for known functions.
+    """
+    n = len(xs)
+    logn = max(1, n.bit_length())
+    staticCost = (writes + 1) * n * logn + reads
+    dynamicCost = n * logn + (reads + writes) * logn
+    if staticCost <= dynamicCost:
+        if idempotent == None:
+            idempotent = is_idempotent(comp)
+        return SparseTable(xs, comp) if idempotent else DisjointSparseTable(xs, comp)
+    sg = SegmentTree(n, comp)
+    sg.update_many(range(1, n + 1), xs)
+    return sg
+
+
+class SparseTable:
+    def __init__(self, xs, comp):
+        self.comp = comp
+        self.ufunc = as_ufunc(comp)
+        self.xs = list(xs)
+        self.n = len(self.xs)
+        self.build()
+
+    def build(self):
+        """
+        Computes the answers of all the ranges of length 2^k.
+        The row k of the table keeps the ranges that start at positions 1..n-2^k+1.
+        """
+        if self.ufunc != None:
+            import numpy as np
+            xs = np.asarray(self.xs)
+            self.table = np.empty((self.n.bit_length(), self.n), dtype=xs.dtype)
+            self.table[0] = xs
+            for k in range(1, self.n.bit_length()):
+                half = 1 << (k - 1)
+                m = self.n - (1 << k) + 1
+                self.ufunc(self.table[k-1, :m], self.table[k-1, half:half+m], out=self.table[k, :m])
+        else:
+            self.table = [self.xs]
+            for k in range(1, self.n.bit_length()):
+                prev = self.table[k-1]
+                half = 1 << (k - 1)
+                self.table.append([self.comp(prev[i], prev[i + half])
+                                   for i in range(self.n - (1 << k) + 1)])
+
+    def update(self, pos, val):
+        self.xs[pos-1] = val
+        self.build()
+
+    def query(self, x, y):
+        k = (y - x + 1).bit_length() - 1
+        row = self.table[k]
+        return self.comp(row[x-1], row[y - (1 << k)])
+
+    def query_many(self, xs, ys):
+        import numpy as np
+        if self.ufunc == None:
+            return np.array([self.query(x, y) for (x, y) in zip(xs, ys)])
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        ks = np.frexp(ys - xs + 1)[1] - 1  # The exponent of frexp is the bit length.
+        return self.ufunc(self.table[ks, xs - 1], self.table[ks, ys - (1 << ks)])
+
+
+class DisjointSparseTable:
+    def __init__(self, xs, comp):
+        self.comp = comp
+        self.ufunc = as_ufunc(comp)
+        self.xs = list(xs)
+        self.n = len(self.xs)
+        self.build()
+
+    def build(self):
+        """
+        Computes the answers from every position to the middle of its block, for every level.
+        The positions are padded up to a power of two with copies of the last value,
+        which are never part of a query.
+        """
+        levels = max(1, (self.n - 1).bit_length())
+        size = 1 << levels
+        xs = self.xs + (size - self.n) * self.xs[-1:]
+        if self.ufunc != None:
+            import numpy as np
+            xs = np.asarray(xs)
+            self.table = np.empty((levels, size), dtype=xs.dtype)
+            for k in range(levels):
+                half = 1 << k
+                blocks = xs.reshape(-1, 2, half)
+                row = self.table[k].reshape(-1, 2, half)
+                row[:, 0, ::-1] = self.ufunc.accumulate(blocks[:, 0, ::-1], axis=1)
+                row[:, 1] = self.ufunc.accumulate(blocks[:, 1], axis=1)
+        else:
+            self.table = []
+            for k in range(levels):
+                half = 1 << k
+                row = size * [None]
+                for mid in range(half, size, 2 * half):
+                    row[mid-1] = xs[mid-1]
+                    for i in range(mid - 2, mid - half - 1, -1):
+                        row[i] = self.comp(xs[i], row[i+1])
+                    row[mid] = xs[mid]
+                    for i in range(mid + 1, mid + half):
+                        row[i] = self.comp(row[i-1], xs[i])
+                self.table.append(row)
+
+    def update(self, pos, val):
+        self.xs[pos-1] = val
+        self.build()
+
+    def query(self, x, y):
+        if x == y:
+            return self.xs[x-1]
+        x, y = x - 1, y - 1
+        row = self.table[(x ^ y).bit_length() - 1]
+        return self.comp(row[x], row[y])
+
+    def query_many(self, xs, ys):
+        import numpy as np
+        if self.ufunc == None:
+            return np.array([self.query(x, y) for (x, y) in zip(xs, ys)])
+        xs = np.asarray(xs, dtype=np.int64) - 1
+        ys = np.asarray(ys, dtype=np.int64) - 1
+        ks = np.maximum(np.frexp(xs ^ ys)[1] - 1, 0)
+        res = self.ufunc(self.table[ks, xs], self.table[ks, ys])
+        same = xs == ys
+        res[same] = np.asarray(self.xs)[xs[same]]
+        return res
+
+
+if __name__ == "__main__":
+    import random
+    random.seed(42)
+    for n in [1, 2, 5, 16, 37]:
+        xs = [random.randint(-100, 100) for _ in range(n)]
+        ls = [random.randint(1, n) for _ in range(200)]
+        rs = [random.randint(l, n) for l in ls]
+        for (table, fn) in [(SparseTable(xs, min), min),
+                            (SparseTable(xs, lambda x,y: max(x,y)), max),
+                            (DisjointSparseTable(xs, operator.add), sum),
+                            (DisjointSparseTable(xs, lambda x,y: x + y), sum)]:
+            sol = [fn(xs[l-1:r]) for (l, r) in zip(ls, rs)]
+            assert [table.query(l, r) for (l, r) in zip(ls, rs)] == sol
+            assert table.query_many(ls, rs).tolist() == sol
+    # The comparator does not have to be commutative.
+    words = list("segmenttree")
+    table = DisjointSparseTable(words, lambda x,y: x + y)
+    assert all(table.query(l, r) == "".join(words[l-1:r]) for l in range(1, 12) for r in range(l, 12))
+    table.update(4, "M")
+    assert table.query(2, 6) == "egMen"
+    # Updates rebuild the table.
+    table = SparseTable([5, 3, 8, 1, 9], max)
+    table.update(5, 0)
+    assert table.query(2, 5) == 8
+    # Choose between a static and a dynamic structure.
+    xs = list(range(1000))
+    assert isinstance(range_query_structure(xs, min, 10**6, 0), SparseTable)
+    assert isinstance(range_query_structure(xs, operator.add, 10**6, 0), DisjointSparseTable)
+    sg = range_query_structure(xs, operator.add, 10**4, 10**4)
+    assert isinstance(sg, SegmentTree)
+    assert sg.query(10, 20) == sum(xs[9:20])
@@ -10,9 +10,23 @@
     Supports
     - multiple insertions of the same word
     - count the words that have a specific prefix
+    - find the words within an edit distance of a word
     
     Time Complexity
-        All the operations cost O( n ), where n is the length of the word
+        All the operations cost O( n ), where n is the length of the word,
+        except for the fuzzy search.
+
+    Fuzzy Search
+        fuzzy_search(word, maxDistance) returns the words of the trie whose Levenshtein
+        distance from word is at most maxDistance, as a list of (Word, Distance, WordCount),
+        sorted by distance and then by word.
+        It walks the trie and keeps, for every node, the row of the edit distance table
+        between the prefix of the node and word. The values of a row are capped at
+        maxDistance + 1, and a branch is pruned as soon as its whole row is above
+        maxDistance, so only the nodes near the word are visited.
+        For maxDistance <= 2, the rows are the states of a LevenshteinAutomaton, which
+        caches its transitions, so the rows of equal prefixes are computed once.
+        Cost: O( V m ), where V is the number of visited nodes and m the length of word.
 """
 
 class TrieNode:
@@ -40,8 +54,48 @@ class TrieNode:
     def decreasePrefixes(self):
         self.prefixes -= 1
 
+class LevenshteinAutomaton:
+    """
+    A deterministic automaton that accepts the strings within maxDistance edits of word.
+    Its states are the rows of the edit distance table, with values capped at
+    maxDistance + 1, and are built lazily. A transition only depends on the positions
+    of the letter in word, so all the letters that are not in word share it.
+    """
+    def __init__(self, word, maxDistance):
+        self.word = word
+        self.maxDistance = maxDistance
+        self.start = tuple(min(j, maxDistance + 1) for j in range(len(word) + 1))
+        self.transitions = {}
+
+    def step(self, state, letter):
+        key = (state, letter if letter in self.word else None)
+        nextState = self.transitions.get(key)
+        if nextState == None:
+            nextState = self.transitions[key] = next_row(self.word, state, letter, self.maxDistance)
+        return nextState
+
+    def distance(self, state):
+        """
+        Returns the distance of a string that ends in state, or None if it is too far.
+        """
+        return state[-1] if state[-1] <= self.maxDistance else None
+
+    def can_match(self, state):
+        return min(state) <= self.maxDistance
+
+def next_row(word, row, letter, maxDistance):
+    """
+    Returns the row of the edit distance table after letter, given the row before it.
+    """
+    cap = maxDistance + 1
+    new = [min(row[0] + 1, cap)]
+    for j in range(1, len(word) + 1):
+        new.append(min(new[j-1] + 1, row[j] + 1, row[j-1] + (word[j-1] != letter), cap))
+    return tuple(new)
+
 class Trie:
-    def __init__(self, alphabet = "abcefghijklmnopqrstuvwxyz"):
+    def __init__(self, alphabet = "abcdefghijklmnopqrstuvwxyz", stats=None):
+        self.alphabet = alphabet
         # Map the letters to list indices.
         self.letters = {}
         i = 0
@@ -52,6 +106,10 @@ class Trie:
         # Initialize the trie.
         self.nodes = [42, TrieNode(self.letters, self.n)]  # Node 0 is trash, Node 1 is the root
         self.trieNodeCount = 1
+        if stats != None:
+            # Replace add, so that a trie without stats does no counting.
+            self.stats = stats
+            self.add = self.counted_add
 
     def add(self, word):
         nextNode = currNode = 1
@@ -67,6 +125,12 @@ class Trie:
             self.nodes[currNode].increasePrefixes()
         self.nodes[currNode].increaseWordCount()
 
+    def counted_add(self, word):
+        nodes = self.trieNodeCount
+        Trie.add(self, word)
+        self.stats.count("trie_nodes", self.trieNodeCount - nodes)
+        self.stats.count("trie_letters", len(word))
+
     def remove(self, word):
         currNode = 1
         for w in word:
@@ -90,7 +154,37 @@ class Trie:
             if currNode == None:
                 return 0
         return self.nodes[currNode].prefixes
-        
+
+    def fuzzy_search(self, word, maxDistance, useAutomaton=None):
+        """
+        useAutomaton: Whether to use a LevenshteinAutomaton, by default when maxDistance <= 2.
+        """
+        if useAutomaton == None:
+            useAutomaton = maxDistance <= 2
+        automaton = LevenshteinAutomaton(word, maxDistance)
+        step = automaton.step
+        if not useAutomaton:
+            # Compute every row, without caching the transitions.
+            step = lambda row, letter: next_row(word, row, letter, maxDistance)
+        matches = []
+        stack = [(1, "", automaton.start)]
+        while stack:
+            (currNode, prefix, row) = stack.pop()
+            node = self.nodes[currNode]
+            d = automaton.distance(row)
+            if d != None and node.wordCount > 0:
+                matches.append((prefix, d, node.wordCount))
+            for (i, child) in enumerate(node.children):
+                # Skip the branches whose words were all removed.
+                if child == None or self.nodes[child].prefixes == 0:
+                    continue
+                letter = self.alphabet[i]
+                nextRow = step(row, letter)
+                if automaton.can_match(nextRow):
+                    stack.append((child, prefix + letter, nextRow))
+        matches.sort(key=lambda m: (m[1], m[0]))
+        return matches
+
 
 if __name__ == "__main__":
     t = Trie()
@@ -103,3 +197,33 @@ if __name__ == "__main__":
     assert t.check("by") == 0
     assert t.check("ten") == 0
     assert t.prefixCount("tr") == 2
+    # Count the allocated nodes.
+    from stats import Stats
+    stats = Stats()
+    t = Trie(stats=stats)
+    t.add("tree")
+    t.add("trie")
+    assert stats.counters["trie_nodes"] == 6
+    assert stats.counters["trie_letters"] == 8
+    # Fuzzy search, compared with the edit distance of every word.
+    def distance(a, b):
+        row = list(range(len(b) + 1))
+        for (i, x) in enumerate(a):
+            prev, row[0] = row[0], i + 1
+            for j in range(1, len(b) + 1):
+                prev, row[j] = row[j], min(row[j] + 1, row[j-1] + 1, prev + (x != b[j-1]))
+        return row[-1]
+    words = ["dog", "dot", "dots", "do", "cat", "cart", "card", "care", "scar", "dodge", "a", ""]
+    t = Trie()
+    for w in words + ["dot", "cart", "removed"]:
+        t.add(w)
+    t.remove("removed")
+    assert t.fuzzy_search("dog", 1) == [("dog", 0, 1), ("do", 1, 1), ("dot", 1, 2)]
+    assert t.fuzzy_search("", 1) == [("", 0, 1), ("a", 1, 1)]
+    for query in ["dog", "cars", "scare", "x", "remove", "dodger", ""]:
+        for d in range(5):
+            expected = sorted((w, distance(w, query)) for w in words if distance(w, query) <= d)
+            for useAutomaton in [True, False]:
+                found = t.fuzzy_search(query, d, useAutomaton)
+                assert sorted((w, dist) for (w, dist, _) in found) == expected
+                assert all(count == t.check(w) for (w, _, count) in found)
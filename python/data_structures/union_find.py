@@ -22,14 +22,19 @@
 """
 
 class UnionFind:
-    def __init__(self, nodes):
+    def __init__(self, nodes, stats=None):
         """
         Creates disjoints sets for all the nodes.
         The rank of all the nodes is 0.
+        stats: An optional Stats object that counts the finds and the lengths of their paths.
         """
         self.ancestors = {}
         for node in nodes:
             self.ancestors[node] = (node, 1, 0)
+        if stats != None:
+            # Replace find, so that a UnionFind without stats does no counting.
+            self.stats = stats
+            self.find = self.counted_find
 
     def __str__(self):
         parts = []
@@ -54,6 +59,18 @@ class UnionFind:
                 visited.append( (node, n, rnk) )
                 node = parent
 
+    def counted_find(self, node):
+        length = 0
+        curr = node
+        parent = self.ancestors[curr][0]
+        while parent != curr:
+            length += 1
+            curr = parent
+            parent = self.ancestors[curr][0]
+        self.stats.count("uf_finds")
+        self.stats.count("uf_find_path", length)
+        return UnionFind.find(self, node)
+
     def union(self, node1, node2):
         """
         Joins the two subsets, that node1 and node2 belong to, into a single subset.
@@ -95,3 +112,15 @@ if __name__ == "__main__":
         uf.union(x, y)
     root = uf.find(random.choice(nodes))
     assert uf.nodes_in_set(root) == 26
+    # Count the finds and the lengths of their paths.
+    from stats import Stats
+    stats = Stats()
+    uf = UnionFind([1, 2, 3, 4], stats)
+    uf.union(1, 2)
+    uf.union(3, 4)
+    uf.union(1, 3)
+    assert stats.counters["uf_find_path"] == 0
+    uf.find(4)
+    uf.find(4)
+    assert stats.counters["uf_finds"] == 8
+    assert stats.counters["uf_find_path"] == 3  # The second find follows the compressed path.
@@ -13,6 +13,8 @@
         The graph as an adjacency list.
     Root
         The root vertex.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
 
     Returns:
     Cost
@@ -25,16 +27,35 @@
 
     Complexity
         Θ( |E||V| )
+
+    bellman_ford_vectorized has the same parameters and results, but keeps the edges in
+    NumPy arrays and does each round of relaxations with vectorized operations: it gathers
+    the costs of the tails, adds the weights, and takes the minimum per head. The edges are
+    sorted by head once, so the minimum of each head is a np.minimum.reduceat over a
+    contiguous segment. Every round uses the costs of the previous round, and the rounds
+    stop as soon as one of them changes nothing. A change in round |V| means that there is
+    a negative-weight cycle.
+    Among paths of equal cost, the parents may differ from the ones of bellman_ford.
+
+    bellman_ford_arrays does the same for a graph of vertices 0..n-1, given as the arrays
+    (Tails, Heads, Weights) of its edges, and returns the arrays (Cost, Parent), where
+    Parent is -1 for no parent, or None if there is a negative-weight cycle.
+    Integer weights are added as int64, so costs above 2^53 stay exact, and the cost of an
+    unreachable vertex is then the largest int64. Other weights are added as floats, and
+    the cost of an unreachable vertex is inf.
 """
 
 import collections
 
-def bellman_ford(graph, root):
+def bellman_ford(graph, root, stats=None):
     inf = float("inf")
     cost = collections.defaultdict(lambda: inf)
     cost[root] = 0
     parent = collections.defaultdict(lambda: None)
+    relaxations = 0
 
+    if stats != None:
+        stats.start("relax")
     for _ in range(1, len(graph.keys())):
         for v in graph:
             neighbours = graph[v]
@@ -42,16 +63,111 @@ def bellman_ford(graph, root):
                 if cost[u] > cost[v] + w:
                     cost[u] = cost[v] + w
                     parent[u] = v
+                    relaxations += 1
 
+    if stats != None:
+        stats.stop("relax")
+        stats.count("relaxations", relaxations)
+        m = sum(len(graph[v]) for v in graph)
+        stats.count("edges_scanned", (len(graph) - 1) * m)
+        stats.start("check")
     # Detect if there exists a negative-weight cycle.
     for v in graph:
         neighbours = graph[v]
         for (u, w) in neighbours.items():
             if cost[u] > cost[v] + w:
+                if stats != None:
+                    stats.stop("check")
                 return None, None
 
+    if stats != None:
+        stats.stop("check")
+        stats.count("edges_scanned", m)
+    return cost, parent
+
+
+def bellman_ford_vectorized(graph, root, stats=None):
+    import numpy as np
+    if stats != None:
+        stats.start("init")
+    vertices = list(graph.keys())
+    index = dict((v, i) for (i, v) in enumerate(vertices))
+    tails, heads, weights = [], [], []
+    for u in graph:
+        neighbours = graph[u]
+        tails.extend(len(neighbours) * [index[u]])
+        heads.extend(index[v] for v in neighbours)
+        weights.extend(neighbours.values())
+    isInt = all(isinstance(w, int) for w in weights)
+    weights = np.array(weights, dtype=np.int64 if isInt else float)
+    if stats != None:
+        stats.stop("init")
+
+    result = bellman_ford_arrays(len(vertices), np.array(tails, dtype=np.int64),
+                                 np.array(heads, dtype=np.int64), weights, index[root], stats)
+    if result == None:
+        return None, None
+    (dist, pred) = result
+    inf = float("inf")
+    cost = collections.defaultdict(lambda: inf)
+    parent = collections.defaultdict(lambda: None)
+    unreached = np.iinfo(np.int64).max if isInt else np.inf
+    for i in np.flatnonzero(dist != unreached):
+        cost[vertices[i]] = int(dist[i]) if isInt else float(dist[i])
+    for i in np.flatnonzero(pred >= 0):
+        parent[vertices[i]] = vertices[pred[i]]
     return cost, parent
 
+def bellman_ford_arrays(n, tails, heads, weights, root, stats=None):
+    import numpy as np
+    if stats != None:
+        stats.start("relax")
+    # Sort the edges by head, so that the edges of every head are a segment.
+    order = np.argsort(heads, kind="stable")
+    weights = np.asarray(weights)
+    if weights.dtype.kind in "biu":
+        weights = weights.astype(np.int64)
+        unreached = np.iinfo(np.int64).max
+    else:
+        weights = weights.astype(float)
+        unreached = np.inf
+    tails, heads, weights = tails[order], heads[order], weights[order]
+    starts = np.flatnonzero(np.r_[True, heads[1:] != heads[:-1]]) if len(heads) else np.zeros(0, dtype=np.int64)
+    targets = heads[starts]
+
+    dist = np.full(n, unreached, dtype=weights.dtype)
+    dist[root] = 0
+    pred = np.full(n, -1, dtype=np.int64)
+    relaxations = 0
+    rounds = 0
+    cycle = False
+    while len(heads):
+        rounds += 1
+        # The unreached tails keep their cost, which would wrap around for int64.
+        tailDist = dist[tails]
+        cand = np.where(tailDist == unreached, unreached, tailDist + weights)
+        best = np.minimum.reduceat(cand, starts)
+        improved = best < dist[targets]
+        if not improved.any():
+            break
+        if rounds == n:
+            cycle = True
+            break
+        changed = targets[improved]
+        dist[changed] = best[improved]
+        # Every improved head takes the tail of an edge that gives its new cost.
+        winners = (cand == dist[heads]) & np.repeat(improved, np.diff(np.r_[starts, len(heads)]))
+        pred[heads[winners]] = tails[winners]
+        relaxations += len(changed)
+
+    if stats != None:
+        stats.stop("relax")
+        stats.count("relaxations", relaxations)
+        stats.count("edges_scanned", rounds * len(heads))
+    if cycle:
+        return None
+    return dist, pred
+
 
 if __name__ == "__main__":
     inf = float("inf")
@@ -66,3 +182,42 @@ if __name__ == "__main__":
     cost, parent = bellman_ford(graph, 's')
     assert cost == collections.defaultdict(lambda: inf, {'a': 6, 'b': 0, 'c': 1, 'd': -3, 'e': -1, 'f': 1, 's': 0})
     assert parent == collections.defaultdict(lambda: None, {'a': 's', 'b': 'e', 'c': 'a', 'd': 'c', 'e': 'd', 'f': 'e'})
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    assert bellman_ford(graph, 's', stats) == (cost, parent)
+    assert stats.counters["relaxations"] >= 6
+    assert stats.counters["edges_scanned"] == 7 * 12
+    assert set(stats.timings) == set(["relax", "check"])
+    # The vectorized version.
+    assert bellman_ford_vectorized(graph, 's') == (cost, parent)
+    graph['f'] = {'b': -5}
+    assert bellman_ford_vectorized(graph, 's') == (None, None) == bellman_ford(graph, 's')
+    import random
+    random.seed(42)
+    n = 200
+    graph = dict((v, {}) for v in range(n))
+    # The weights are non-negative plus a potential difference, so no cycle is negative.
+    potential = [random.randint(0, 20) for _ in range(n)]
+    for _ in range(1000):
+        u, v = random.randrange(n), random.randrange(n)
+        graph[u][v] = random.randint(0, 10) + potential[u] - potential[v]
+    stats = Stats()
+    for root in [0, 50]:
+        (cost, parent) = bellman_ford_vectorized(graph, root, stats)
+        expected = bellman_ford(graph, root)[0]
+        assert all(cost[v] == expected[v] for v in graph)
+        for v in parent:
+            assert cost[parent[v]] + graph[parent[v]][v] == cost[v]
+    assert stats.counters["edges_scanned"] < n * 1000
+    graph[5] = {1: 0.5}
+    graph[1][2] = -0.25
+    graph[2][5] = -0.5
+    assert bellman_ford_vectorized(graph, 0) == (None, None)
+    # Integer costs above 2^53 are exact, and an unreached tail relaxes nothing.
+    graph = {'a': {'b': 2**53}, 'b': {'c': 1}, 'c': {}, 'd': {'c': -5, 'a': True}}
+    (cost, parent) = bellman_ford_vectorized(graph, 'a')
+    assert 'd' not in cost and cost['c'] == 2**53 + 1 and type(cost['c']) == int
+    expected = bellman_ford(graph, 'a')[0]
+    assert all(cost[v] == expected[v] for v in graph)
+    assert parent == {'b': 'a', 'c': 'b'}
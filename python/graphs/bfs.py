@@ -13,6 +13,8 @@
         of the edge.
     Root
         The root vertex.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
 
     Returns:
     The tuple (Parent, Cost) where
@@ -31,7 +33,9 @@ NOT_SEEN = 0
 SEEN = 1
 EXPLORED = 2
 
-def dfs(graph, root):
+def bfs(graph, root, stats=None):
+    if stats != None:
+        stats.start("search")
     pending = collections.deque([root])
     parent = {root: None}
     visited = collections.defaultdict(lambda: NOT_SEEN)
@@ -51,8 +55,17 @@ def dfs(graph, root):
                     cost[v] = cost[u] + w
                 pending.appendleft(v)
 
+    if stats != None:
+        stats.stop("search")
+        settled = [u for u in visited if visited[u] == EXPLORED]
+        stats.count("vertices_settled", len(settled))
+        stats.count("edges_scanned", sum(len(graph[u]) for u in settled))
     return parent, cost
 
+# The old name of bfs, kept so that "from bfs import dfs" still works.
+# Deprecated: use bfs (the depth-first search is in dfs.py).
+dfs = bfs
+
 if __name__=="__main__":
     graph = dict()
     graph[0] = {1: 1, 3: 1, 4: 1, 5: 1, 6: 1}
@@ -62,9 +75,17 @@ if __name__=="__main__":
     graph[4] = {6: 1}
     graph[5] = {2: 1}
     graph[6] = {3: 1}
-    parent, cost = dfs(graph, 0)
+    parent, cost = bfs(graph, 0)
     assert cost[2] == 2
     assert parent[2] == 1
     assert parent[5] == 0
     assert parent[3] == 0
     assert parent[6] == 0
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    assert bfs(graph, 0, stats) == (parent, cost)
+    assert stats.counters["vertices_settled"] == 7
+    assert stats.counters["edges_scanned"] == 11
+    assert list(stats.timings) == ["search"]
+    assert dfs(graph, 0) == (parent, cost)
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Contraction Hierarchies
+    -----------------------
+
+    Answers shortest path queries on a fixed graph (e.g. a road network) much faster than
+    dijkstra, after a preprocessing step. It requires non-negative weights.
+
+    Preprocessing
+        The vertices are contracted one by one, in increasing order of importance.
+        Contracting v removes it from the graph, and for every pair of edges (u, v), (v, x)
+        it adds the shortcut (u, x), with the weight of both, unless a witness search
+        (a local dijkstra from u that avoids v) finds a path that is not more expensive.
+        The importance of a vertex is the number of shortcuts that its contraction would
+        add, minus the number of its edges, plus the number of its neighbours that were
+        already contracted, so the vertices that keep the graph small and spread evenly
+        are contracted first. The importance is recomputed lazily: the vertex at the top
+        of the queue is contracted only if its recomputed importance keeps it on top.
+        The rank of a vertex is its position in the order of contraction.
+
+    Result
+        All the edges and shortcuts, split into two upward graphs, kept as compact arrays
+        (offsets, targets, weights and the middle vertex of every shortcut, or -1):
+        - Forward
+            The edges (u, x) with rank[u] < rank[x], at u.
+        - Backward
+            The edges (y, u) with rank[u] < rank[y], at u, i.e. reversed.
+        It can be saved to a file and loaded back.
+
+    Queries
+        A dijkstra from the source over the forward graph and one from the target over the
+        backward graph, which take turns. Every shortest path goes up and then down in
+        rank, so it is found where the searches meet. A search stops when its smallest
+        cost is not below the best path found. The path is unpacked by replacing every
+        shortcut with its two edges, recursively, so it contains only edges of the graph.
+
+    The constructor requires:
+    Graph
+        The graph as an adjacency list.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
+
+    Supports the operations:
+    QUERY S T
+        Returns the tuple (Cost, Path), where Cost is the same as the cost of dijkstra and
+        Path is the list of the vertices of the path, or (inf, None) if T is unreachable.
+    SAVE PATH / LOAD PATH
+        Saves the hierarchy to a file / creates a hierarchy from a file.
+        The file has a header and the arrays, written as they are in memory, and the
+        vertices, encoded as labels (see utils/labels.py), so they must be None, bools,
+        ints, floats, strs, bytes or tuples of them. LOAD raises ValueError if the file
+        is not a saved hierarchy or is truncated.
+
+    The attribute Settled is the number of vertices settled by the last query.
+
+    Complexity
+        The preprocessing and the size of a query depend on the graph. On road networks,
+        a query settles a few hundred vertices, even when the graph has millions.
+"""
+
+import os
+import struct
+from array import array
+from heap import MinHeap
+from labels import encode_labels, decode_labels, check_offsets
+
+# The first bytes of a saved hierarchy.
+CH_MAGIC = b"CHIER02\n"
+# Weight type, number of vertices, of forward and of backward edges, size of the labels.
+CH_HEADER = struct.Struct("<c7xqqqq")
+# The maximum number of vertices that a witness search settles.
+WITNESS_LIMIT = 60
+
+class ContractionHierarchy:
+    def __init__(self, graph=None, stats=None):
+        self.stats = stats
+        self.settled = 0
+        if graph != None:
+            self.build(graph)
+
+    def build(self, graph):
+        if self.stats != None:
+            self.stats.start("contract")
+        self.vertices = list(graph)
+        self.index = dict((v, i) for (i, v) in enumerate(self.vertices))
+        n = len(self.vertices)
+        inf = float("inf")
+        # The remaining graph, as outgoing and incoming edges.
+        self.out = [dict() for _ in range(n)]
+        self.inc = [dict() for _ in range(n)]
+        isInt = True
+        for u in graph:
+            iu = self.index[u]
+            for (v, w) in graph[u].items():
+                iv = self.index[v]
+                isInt = isInt and isinstance(w, int)
+                if iu != iv and w < self.out[iu].get(iv, inf):
+                    self.out[iu][iv] = w
+                    self.inc[iv][iu] = w
+        self.middle = {}  # Maps the shortcuts (u, x) to their middle vertex.
+        self.deleted = n * [0]  # The contracted neighbours of every vertex.
+        upward = n * [None]
+        downward = n * [None]
+        self.rank = array('q', n * [0])
+        shortcuts = 0
+
+        pq = MinHeap([(v, self.importance(v)) for v in range(n)])
+        r = 0
+        while len(pq) > 0:
+            v = pq.min()
+            pq.change_priority(v, self.importance(v))
+            if pq.min() != v:
+                continue
+            pq.take_min()
+            # Keep the edges that go up in rank and add the shortcuts.
+            upward[v] = [(x, w, self.middle.get((v, x), -1)) for (x, w) in self.out[v].items()]
+            downward[v] = [(u, w, self.middle.get((u, v), -1)) for (u, w) in self.inc[v].items()]
+            for (u, x, w) in self.shortcuts(v):
+                if w < self.out[u].get(x, inf):
+                    self.out[u][x] = w
+                    self.inc[x][u] = w
+                    self.middle[(u, x)] = v
+                    shortcuts += 1
+            for u in self.inc[v]:
+                del self.out[u][v]
+                self.deleted[u] += 1
+            for x in self.out[v]:
+                del self.inc[x][v]
+                self.deleted[x] += 1
+            self.out[v] = self.inc[v] = None
+            self.rank[v] = r
+            r += 1
+
+        typecode = 'q' if isInt else 'd'
+        self.forward = to_arrays(upward, typecode)
+        self.backward = to_arrays(downward, typecode)
+        del self.out, self.inc, self.middle, self.deleted
+        if self.stats != None:
+            self.stats.stop("contract")
+            self.stats.count("shortcuts", shortcuts)
+
+    def shortcuts(self, v):
+        """
+        Returns the shortcuts (u, x, Weight) that the contraction of v needs.
+        """
+        needed = []
+        for (u, wu) in self.inc[v].items():
+            targets = dict((x, wu + wx) for (x, wx) in self.out[v].items() if x != u)
+            if not targets:
+                continue
+            dist = self.witness_search(u, v, max(targets.values()))
+            for (x, c) in targets.items():
+                if dist.get(x, float("inf")) > c:
+                    needed.append((u, x, c))
+        return needed
+
+    def witness_search(self, u, v, maxCost):
+        """
+        A dijkstra from u in the remaining graph without v, up to maxCost and WITNESS_LIMIT vertices.
+        """
+        dist = {u: 0}
+        pq = MinHeap([(u, 0)])
+        settled = 0
+        while len(pq) > 0 and settled < WITNESS_LIMIT:
+            x = pq.min()
+            dx = pq.get_priority(x)
+            if dx > maxCost:
+                break
+            pq.take_min()
+            settled += 1
+            for (y, w) in self.out[x].items():
+                if y != v and dx + w < dist.get(y, float("inf")):
+                    if y in dist:
+                        pq.change_priority(y, dx + w)
+                    else:
+                        pq.insert(y, dx + w)
+                    dist[y] = dx + w
+        return dist
+
+    def importance(self, v):
+        return len(self.shortcuts(v)) - len(self.inc[v]) - len(self.out[v]) + self.deleted[v]
+
+    def query(self, source, target):
+        inf = float("inf")
+        s, t = self.index[source], self.index[target]
+        searches = [self.forward, self.backward]
+        dist = [{s: 0}, {t: 0}]
+        parent = [{s: None}, {t: None}]  # Maps vertices to (Previous vertex, Edge index).
+        pqs = [MinHeap([(s, 0)]), MinHeap([(t, 0)])]
+        best = inf if s != t else 0
+        meet = s
+        settled = 0
+        while True:
+            # Continue with the search that has the smallest cost below the best path.
+            side = None
+            for k in (0, 1):
+                pq = pqs[k]
+                if len(pq) > 0 and pq.get_priority(pq.min()) < best:
+                    if side == None or pq.get_priority(pq.min()) < pqs[side].get_priority(pqs[side].min()):
+                        side = k
+            if side == None:
+                break
+            pq, d, other = pqs[side], dist[side], dist[1 - side]
+            (offsets, targets, weights, _) = searches[side]
+            u = pq.take_min()
+            du = d[u]
+            settled += 1
+            for i in range(offsets[u], offsets[u + 1]):
+                x = targets[i]
+                dx = du + weights[i]
+                if dx < d.get(x, inf):
+                    if x in d:
+                        pq.change_priority(x, dx)
+                    else:
+                        pq.insert(x, dx)
+                    d[x] = dx
+                    parent[side][x] = (u, i)
+                    if x in other and dx + other[x] < best:
+                        best = dx + other[x]
+                        meet = x
+        self.settled = settled
+        if self.stats != None:
+            self.stats.count("vertices_settled", settled)
+        if best == inf:
+            return inf, None
+        return best, self.unpack(parent, meet)
+
+    def unpack(self, parent, meet):
+        """
+        Builds the path through meet from the parents of both searches, without shortcuts.
+        """
+        up = []  # The edges from the source to meet, as (From, To, Middle).
+        x = meet
+        while parent[0][x] != None:
+            (u, i) = parent[0][x]
+            up.append((u, x, self.forward[3][i]))
+            x = u
+        up.reverse()
+        path = [self.vertices[x]]
+        down = []
+        x = meet
+        while parent[1][x] != None:
+            (u, i) = parent[1][x]
+            down.append((x, u, self.backward[3][i]))
+            x = u
+        for (u, x, mid) in up + down:
+            path.extend(self.vertices[y] for y in self.unpack_edge(u, x, mid))
+        return path
+
+    def unpack_edge(self, u, x, mid):
+        """
+        Returns the vertices after u on the path of the edge (u, x) in the original graph.
+        """
+        path = []
+        stack = [(u, x, mid)]
+        while stack:
+            (u, x, mid) = stack.pop()
+            if mid == -1:
+                path.append(x)
+            else:
+                # Both halves go down in rank to mid.
+                stack.append((mid, x, self.edge_middle(self.forward, mid, x)))
+                stack.append((u, mid, self.edge_middle(self.backward, mid, u)))
+        return path
+
+    def edge_middle(self, arrays, v, x):
+        """
+        Returns the middle vertex of the upward edge of v to x.
+        """
+        (offsets, targets, _, middle) = arrays
+        for i in range(offsets[v], offsets[v + 1]):
+            if targets[i] == x:
+                return middle[i]
+        raise KeyError((v, x))
+
+    def save(self, path):
+        (labelOffsets, labelData) = encode_labels(self.vertices)
+        typecode = self.forward[2].typecode
+        with open(path, "wb") as f:
+            f.write(CH_MAGIC)
+            f.write(CH_HEADER.pack(typecode.encode(), len(self.vertices), len(self.forward[1]),
+                                   len(self.backward[1]), len(labelData)))
+            self.rank.tofile(f)
+            for arrays in (self.forward, self.backward):
+                for a in arrays:
+                    a.tofile(f)
+            labelOffsets.tofile(f)
+            f.write(labelData)
+
+    @classmethod
+    def load(cls, path, stats=None):
+        with open(path, "rb") as f:
+            if f.read(len(CH_MAGIC)) != CH_MAGIC:
+                raise ValueError("Not a saved contraction hierarchy")
+            header = f.read(CH_HEADER.size)
+            if len(header) != CH_HEADER.size:
+                raise ValueError("The saved contraction hierarchy is truncated")
+            (typecode, n, mf, mb, labelSize) = CH_HEADER.unpack(header)
+            if typecode not in (b"q", b"d") or min(n, mf, mb, labelSize) < 0:
+                raise ValueError("The saved contraction hierarchy has a corrupted header")
+            expected = len(CH_MAGIC) + CH_HEADER.size + 8 * (4 * n + 3 + 3 * mf + 3 * mb) + labelSize
+            if os.fstat(f.fileno()).st_size != expected:
+                raise ValueError("The saved contraction hierarchy is truncated")
+            try:
+                rank = read_array(f, 'q', n)
+                (forward, backward) = [(read_array(f, 'q', n + 1), read_array(f, 'q', m),
+                                        read_array(f, typecode.decode(), m), read_array(f, 'q', m))
+                                       for m in (mf, mb)]
+                labelOffsets = read_array(f, 'q', n + 1)
+            except EOFError:
+                raise ValueError("The saved contraction hierarchy is truncated")
+            labelData = f.read(labelSize)
+        check_offsets(labelOffsets, labelSize)
+        for (arrays, m) in [(forward, mf), (backward, mb)]:
+            if arrays[0][0] != 0 or arrays[0][n] != m:
+                raise ValueError("The saved contraction hierarchy has corrupted edges")
+        ch = cls(None, stats)
+        ch.vertices = decode_labels(labelData, labelOffsets)
+        ch.index = dict((v, i) for (i, v) in enumerate(ch.vertices))
+        if len(ch.index) != n:
+            raise ValueError("The saved contraction hierarchy has duplicate vertices")
+        (ch.rank, ch.forward, ch.backward) = (rank, forward, backward)
+        return ch
+
+def read_array(f, typecode, size):
+    a = array(typecode)
+    a.fromfile(f, size)
+    return a
+
+def to_arrays(edges, typecode):
+    """
+    Turns the lists of edges (To, Weight, Middle) of every vertex into the arrays
+    (Offsets, Targets, Weights, Middle).
+    """
+    offsets = array('q', [0])
+    targets, weights, middle = array('q'), array(typecode), array('q')
+    for adjacent in edges:
+        for (x, w, mid) in adjacent:
+            targets.append(x)
+            weights.append(w)
+            middle.append(mid)
+        offsets.append(len(targets))
+    return (offsets, targets, weights, middle)
+
+
+if __name__ == "__main__":
+    import os
+    import random
+    import tempfile
+    from dijkstra import dijkstra
+    from stats import Stats
+    inf = float("inf")
+    graph = dict()
+    graph[1] = {2: 7, 3: 9, 6: 14}
+    graph[2] = {1: 7, 3: 10, 4: 15}
+    graph[3] = {1: 9, 2: 10, 4: 11, 6: 2}
+    graph[4] = {2: 15, 3: 11, 5: 6}
+    graph[5] = {4: 6, 6: 9}
+    graph[6] = {1: 14, 3: 2, 5: 9}
+    ch = ContractionHierarchy(graph)
+    assert ch.query(1, 5) == (20, [1, 3, 6, 5])
+    assert ch.query(4, 4) == (0, [4])
+    def check(ch, graph, pairs):
+        for (s, t) in pairs:
+            (cost, path) = ch.query(s, t)
+            assert cost == dijkstra(graph, s)[0][t]
+            if cost == inf:
+                assert path == None
+            else:
+                assert path[0] == s and path[-1] == t
+                assert sum(graph[u][v] for (u, v) in zip(path, path[1:])) == cost
+    # A road-like grid, with random weights in both directions.
+    random.seed(42)
+    side = 20
+    graph = dict(((r, c), {}) for r in range(side) for c in range(side))
+    for (r, c) in graph:
+        for (dr, dc) in [(0, 1), (1, 0)]:
+            if (r + dr, c + dc) in graph:
+                graph[(r, c)][(r + dr, c + dc)] = random.randint(1, 10)
+                graph[(r + dr, c + dc)][(r, c)] = random.randint(1, 10)
+    stats = Stats()
+    ch = ContractionHierarchy(graph, stats)
+    vertices = list(graph)
+    pairs = [(random.choice(vertices), random.choice(vertices)) for _ in range(100)]
+    check(ch, graph, pairs)
+    assert stats.counters["vertices_settled"] < 100 * len(graph) // 4
+    assert stats.counters["shortcuts"] > 0 and "contract" in stats.timings
+    # Save and load.
+    (fd, path) = tempfile.mkstemp()
+    os.close(fd)
+    ch.save(path)
+    loaded = ContractionHierarchy.load(path)
+    assert all(loaded.query(s, t) == ch.query(s, t) for (s, t) in pairs)
+    # Bad files are rejected.
+    with open(path, "rb") as f:
+        data = f.read()
+    for (bad, message) in [(b"CHIER01\n" + data[8:], "Not a saved contraction hierarchy"),
+                           (data[:20], "The saved contraction hierarchy is truncated"),
+                           (data[:-1], "The saved contraction hierarchy is truncated"),
+                           (data[:8] + b"x" + data[9:], "The saved contraction hierarchy has a corrupted header")]:
+        with open(path, "wb") as f:
+            f.write(bad)
+        try:
+            ContractionHierarchy.load(path)
+            assert False
+        except ValueError as e:
+            assert str(e) == message
+    os.remove(path)
+    # A directed graph with unreachable vertices and float weights.
+    n = 120
+    graph = dict((v, {}) for v in range(n))
+    for _ in range(300):
+        graph[random.randrange(n)][random.randrange(n)] = random.randint(0, 20) / 4.0
+    ch = ContractionHierarchy(graph)
+    check(ch, graph, [(s, t) for s in range(0, n, 7) for t in range(n)])
+    (fd, path) = tempfile.mkstemp()
+    os.close(fd)
+    ch.save(path)
+    loaded = ContractionHierarchy.load(path)
+    os.remove(path)
+    assert loaded.forward[2].typecode == 'd'
+    assert all(loaded.query(s, t) == ch.query(s, t) for s in range(0, n, 11) for t in range(n))
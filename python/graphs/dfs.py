@@ -13,6 +13,8 @@
         of the edge.
     Root
         The root vertex.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
 
     Returns:
     The tuple (Parent, Cost) where
@@ -27,7 +29,9 @@
 
 import collections
 
-def dfs(graph, root):
+def dfs(graph, root, stats=None):
+    if stats != None:
+        stats.start("search")
     pending = collections.deque([root])
     parent = {root: None}
     visited = set() 
@@ -45,6 +49,11 @@ def dfs(graph, root):
                     cost[v] = cost[u] + w
                     pending.append(v)
 
+    if stats != None:
+        stats.stop("search")
+        settled = list(visited)
+        stats.count("vertices_settled", len(settled))
+        stats.count("edges_scanned", sum(len(graph[u]) for u in settled))
     return parent, cost
 
 if __name__=="__main__":
@@ -62,3 +71,10 @@ if __name__=="__main__":
     assert parent[5] == 3
     assert parent[3] == 6
     assert parent[6] == 0
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    assert dfs(graph, 0, stats) == (parent, cost)
+    assert stats.counters["vertices_settled"] == 7
+    assert stats.counters["edges_scanned"] == 11
+    assert list(stats.timings) == ["search"]
@@ -12,6 +12,8 @@
         The graph as an adjacency list.
     Root
         The root vertex.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
 
     Returns:
     Cost
@@ -27,19 +29,25 @@
 import collections
 from heap import MinHeap
 
-def dijkstra(graph, root):
+def dijkstra(graph, root, stats=None):
+    if stats != None:
+        stats.start("init")
     vertices = graph.keys()
     n = len(vertices)
+    relaxations = 0
 
     # Initialize the priority queue
     inf = float("inf")
-    pq = MinHeap([(v, inf) for v in graph.keys()]) 
+    pq = MinHeap([(v, inf) for v in graph.keys()], stats) 
     pq.change_priority(root, 0)
     # Other initializations
     parent = collections.defaultdict(lambda: None)
     selected = set()
     cost = collections.defaultdict(lambda: inf)
     cost[root] = 0
+    if stats != None:
+        stats.stop("init")
+        stats.start("search")
 
     while len(selected) < n:
         u = pq.min()
@@ -50,7 +58,13 @@ def dijkstra(graph, root):
             if v not in selected and pq.get_priority(v) > du + w:
                 pq.change_priority(v, du + w)
                 parent[v] = u
-    
+                relaxations += 1
+
+    if stats != None:
+        stats.stop("search")
+        stats.count("relaxations", relaxations)
+        stats.count("vertices_settled", n)
+        stats.count("edges_scanned", sum(len(graph[u]) for u in graph))
     return cost, parent
 
 
@@ -66,3 +80,12 @@ if __name__ == "__main__":
     cost, parent = dijkstra(graph, 1)
     assert cost == collections.defaultdict(lambda: inf, {1: 0, 2: 7, 3: 9, 4: 20, 5: 20, 6: 11})
     assert parent == collections.defaultdict(lambda: None, {2: 1, 3: 1, 4: 3, 5: 6, 6: 3})
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    assert dijkstra(graph, 1, stats) == (cost, parent)
+    assert stats.counters["relaxations"] == 7
+    assert stats.counters["vertices_settled"] == 6
+    assert stats.counters["edges_scanned"] == 18
+    assert stats.counters["heap_sift_down"] > 0
+    assert set(stats.timings) == set(["init", "search"])
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Dynamic Single-Source Shortest Paths
+    ------------------------------------
+
+    Keeps the result of dijkstra up to date, while edges are inserted, deleted or reweighted.
+    Based on the algorithm of Ramalingam and Reps, so the work of a change depends only
+    on the vertices below the changed edge in the shortest paths and their edges.
+    It requires non-negative weights, and zero-weight cycles are allowed.
+
+    An edge (u, v) is tight if cost[u] + w(u, v) == cost[v], i.e. it lies on a shortest path.
+
+    - Cheaper edge (insertion or decrease of weight)
+        If the edge makes the path to v cheaper, the cost of v decreases and the decrease
+        is propagated with dijkstra, starting from v only.
+    - More expensive edge (deletion or increase of weight)
+        If the edge was tight, the affected vertices are found first. The candidates are the
+        vertices that tight edges lead to from v, i.e. the part of the shortest path DAG
+        below the edge. A candidate keeps its cost if tight edges lead to it from a vertex
+        that is not a candidate, so these are marked by a search over the tight edges from
+        the outside of the candidates. The rest are affected. Unlike counting the tight
+        incoming edges of every vertex, the marking is also correct when zero-weight cycles
+        make the tight edges cyclic. Then the new costs of the affected vertices are computed
+        with dijkstra, starting from their cheapest edges from vertices that are not affected.
+
+    The constructor requires:
+    Graph
+        The graph as an adjacency list. It is changed in place by the operations.
+    Root
+        The root vertex.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters.
+
+    Supports the operations:
+    SET_EDGE U V W
+        Inserts the edge (U, V) with weight W, or changes its weight to W.
+    REMOVE_EDGE U V
+        Deletes the edge (U, V).
+    ADD_VERTEX V
+        Adds the vertex V, without any edges.
+
+    The attributes Cost and Parent are the same as the result of dijkstra.
+
+    Complexity
+        O( |C| + |E(C)| + |E(A)| log|A| ) per change, where C is the set of candidates,
+        A is the set of affected vertices and E(X) are the edges of the vertices of X.
+"""
+
+import collections
+from heap import MinHeap
+from dijkstra import dijkstra
+
+class DynamicSSSP:
+    def __init__(self, graph, root, stats=None):
+        self.graph = graph
+        self.root = root
+        self.stats = stats
+        self.cost, self.parent = dijkstra(graph, root)
+        # The incoming edges of every vertex.
+        self.incoming = dict((v, dict()) for v in graph)
+        for u in graph:
+            for (v, w) in graph[u].items():
+                self.incoming[v][u] = w
+
+    def add_vertex(self, v):
+        self.graph[v] = dict()
+        self.incoming[v] = dict()
+        self.cost[v] = float("inf")
+
+    def set_edge(self, u, v, w):
+        old = self.graph[u].get(v, float("inf"))
+        self.graph[u][v] = w
+        self.incoming[v][u] = w
+        if w < old:
+            self.decrease(u, v, w)
+        elif w > old:
+            self.increase(u, v, old)
+
+    def remove_edge(self, u, v):
+        old = self.graph[u].pop(v)
+        del self.incoming[v][u]
+        self.increase(u, v, old)
+
+    def decrease(self, u, v, w):
+        """
+        Propagates the new cheaper edge (u, v) of weight w.
+        """
+        if self.cost[u] + w >= self.cost[v]:
+            return
+        cost, parent = self.cost, self.parent
+        cost[v] = cost[u] + w
+        parent[v] = u
+        pq = MinHeap([(v, cost[v])])
+        settled = 0
+        while len(pq) > 0:
+            x = pq.take_min()
+            settled += 1
+            for (y, wxy) in self.graph[x].items():
+                if cost[x] + wxy < cost[y]:
+                    cost[y] = cost[x] + wxy
+                    parent[y] = x
+                    # A vertex that left the queue is final, so it never gets cheaper again.
+                    if y in pq:
+                        pq.change_priority(y, cost[y])
+                    else:
+                        pq.insert(y, cost[y])
+        if self.stats != None:
+            self.stats.count("vertices_settled", settled)
+
+    def increase(self, u, v, old):
+        """
+        Repairs the costs after the edge (u, v) of weight old became more expensive or was deleted.
+        """
+        cost, parent = self.cost, self.parent
+        if cost[u] + old != cost[v] or cost[v] == float("inf") or v == self.root:
+            return  # The edge was not tight, so no cost changes.
+
+        # The candidates are the vertices that tight edges lead to from v.
+        isCandidate = set([v])
+        def candidate(x, y):
+            if y == self.root or y in isCandidate:
+                return False
+            isCandidate.add(y)
+            return True
+        candidates = self.tight_search([v], candidate)
+        # The candidates with a tight edge from the outside keep their cost, and so do the
+        # candidates that tight edges lead to from them. They get a parent that keeps it.
+        entries = []
+        for y in candidates:
+            for (x, w) in self.incoming[y].items():
+                if x not in isCandidate and cost[x] + w == cost[y]:
+                    parent[y] = x
+                    entries.append(y)
+                    break
+        isKept = set(entries)
+        def kept(x, y):
+            if y not in isCandidate or y in isKept:
+                return False
+            isKept.add(y)
+            parent[y] = x
+            return True
+        self.tight_search(entries, kept)
+        affected = [x for x in candidates if x not in isKept]
+        isAffected = set(affected)
+
+        # Compute the new costs of the affected vertices.
+        inf = float("inf")
+        for x in affected:
+            cost[x] = inf
+            parent[x] = None
+            for (y, w) in self.incoming[x].items():
+                if y not in isAffected and cost[y] + w < cost[x]:
+                    cost[x] = cost[y] + w
+                    parent[x] = y
+        pq = MinHeap([(x, cost[x]) for x in affected])
+        while len(pq) > 0:
+            x = pq.take_min()
+            for (y, w) in self.graph[x].items():
+                if y in isAffected and cost[x] + w < cost[y]:
+                    cost[y] = cost[x] + w
+                    parent[y] = x
+                    pq.change_priority(y, cost[y])
+        if self.stats != None:
+            self.stats.count("vertices_settled", len(affected))
+
+    def tight_search(self, starts, enter):
+        """
+        Returns the starts and the vertices that tight edges lead to from them.
+        The search follows a tight edge (x, y) only if enter(x, y) returns True,
+        which must happen at most once for every vertex.
+        """
+        cost = self.cost
+        found = list(starts)
+        i = 0
+        while i < len(found):
+            x = found[i]
+            i += 1
+            for (y, w) in self.graph[x].items():
+                if cost[x] + w == cost[y] and enter(x, y):
+                    found.append(y)
+        return found
+
+
+if __name__ == "__main__":
+    import random
+    inf = float("inf")
+    graph = dict()
+    graph[1] = {2: 7, 3: 9, 6: 14}
+    graph[2] = {1: 7, 3: 10, 4: 15}
+    graph[3] = {1: 9, 2: 10, 4: 11, 6: 2}
+    graph[4] = {2: 15, 3: 11, 5: 6}
+    graph[5] = {4: 6, 6: 9}
+    graph[6] = {1: 14, 3: 2, 5: 9}
+    sssp = DynamicSSSP(graph, 1)
+    assert sssp.cost[5] == 20
+    sssp.set_edge(1, 5, 3)
+    assert sssp.cost[5] == 3 and sssp.cost[4] == 9 and sssp.parent[4] == 5
+    sssp.remove_edge(1, 5)
+    assert sssp.cost[5] == 20 and sssp.cost[4] == 20 and sssp.parent[4] == 3
+    sssp.set_edge(3, 6, 20)
+    assert sssp.cost[6] == 14 and sssp.parent[6] == 1 and sssp.cost[5] == 23
+    # Compare with dijkstra after random changes.
+    from stats import Stats
+    random.seed(42)
+    n = 60
+    graph = dict((v, {}) for v in range(n))
+    for _ in range(240):
+        graph[random.randrange(n)][random.randrange(n)] = random.randint(1, 5)
+    stats = Stats()
+    sssp = DynamicSSSP(graph, 0, stats)
+    for step in range(500):
+        u = random.randrange(n)
+        if graph[u] and random.random() < 0.4:
+            sssp.remove_edge(u, random.choice(list(graph[u])))
+        else:
+            sssp.set_edge(u, random.randrange(n), random.randint(1, 5))
+        if step == 250:
+            sssp.add_vertex(n)
+            sssp.set_edge(0, n, 1)
+            n += 1
+        cost, _ = dijkstra(graph, 0)
+        assert all(sssp.cost[v] == cost[v] for v in graph)
+        for v in graph:
+            p = sssp.parent[v]
+            if v == 0 or sssp.cost[v] == inf:
+                assert p == None
+            else:
+                assert sssp.cost[p] + graph[p][v] == sssp.cost[v]
+    assert 0 < stats.counters["vertices_settled"] < 500 * n
+    # A zero-weight cycle keeps its tight edges after it is cut off from the root.
+    graph = {0: {1: 1}, 1: {2: 0}, 2: {1: 0}}
+    sssp = DynamicSSSP(graph, 0)
+    sssp.remove_edge(0, 1)
+    assert sssp.cost[1] == sssp.cost[2] == inf
+    assert sssp.parent[1] == sssp.parent[2] == None
+    # Compare with dijkstra after random changes, with zero weights and self-loops.
+    for run in range(100):
+        n = 8
+        graph = dict((v, {}) for v in range(n))
+        for _ in range(16):
+            graph[random.randrange(n)][random.randrange(n)] = random.randint(0, 3)
+        sssp = DynamicSSSP(graph, 0)
+        for step in range(10):
+            u = random.randrange(n)
+            if graph[u] and random.random() < 0.5:
+                sssp.remove_edge(u, random.choice(list(graph[u])))
+            else:
+                sssp.set_edge(u, random.randrange(n), random.randint(0, 3))
+            cost, _ = dijkstra(graph, 0)
+            assert all(sssp.cost[v] == cost[v] for v in graph)
+            for v in graph:
+                p = sssp.parent[v]
+                assert (p == None) == (v == 0 or cost[v] == inf)
+                assert p == None or sssp.cost[p] + graph[p][v] == sssp.cost[v]
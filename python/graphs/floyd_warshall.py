@@ -10,6 +10,8 @@
     Parameters:
     Graph
         The graph as an adjacency list.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
 
     Returns:
     Cost
@@ -25,9 +27,12 @@
 
 import collections
 
-def floyd_warshall(graph):
+def floyd_warshall(graph, stats=None):
+    if stats != None:
+        stats.start("init")
     vertices = graph.keys()
     n = len(vertices)
+    relaxations = 0
 
     # Initialize the cost & parent matrices.
     inf = float("inf")
@@ -42,13 +47,20 @@ def floyd_warshall(graph):
         cost[u][u] = 0
 
     # Run the algorithm.
+    if stats != None:
+        stats.stop("init")
+        stats.start("search")
     for k in range(1, n + 1):
         for i in range(1, n + 1):
             for j in range(1, n + 1):
                 if cost[i][j] > cost[i][k] + cost[k][j]:
                     cost[i][j] = cost[i][k] + cost[k][j]
                     parent[i][j] = parent[k][j]
+                    relaxations += 1
 
+    if stats != None:
+        stats.stop("search")
+        stats.count("relaxations", relaxations)
     return cost, parent
 
 
@@ -71,3 +83,9 @@ if __name__ == "__main__":
     assert parent[3] == collections.defaultdict(lambda: None, {1: 5, 2: 1, 4: 3, 5: 4})
     assert parent[4] == collections.defaultdict(lambda: None, {1: 5, 2: 1, 3: 2, 5: 4})
     assert parent[5] == collections.defaultdict(lambda: None, {1: 5, 2: 1, 3: 2, 4: 1})
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    assert floyd_warshall(graph, stats) == (cost, parent)
+    assert stats.counters["relaxations"] > 0
+    assert set(stats.timings) == set(["init", "search"])
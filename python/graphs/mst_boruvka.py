@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Borůvka's MST Algorithm (Parallel)
+    ----------------------------------
+
+    Offers two functions that calculate the Minimum Spanning Tree of an undirected graph,
+    using a pool of worker processes.
+
+    - boruvka
+        Parameters:
+            Edges
+                A list of the graph's edges.
+                Each element is a tuple in the form ((From, To), Weight).
+            Vertices
+                A list of the graph's vertices.
+            Processes
+                The number of worker processes. If it is 1, no processes are started.
+
+    - boruvka_from_graph
+        Parameters:
+            Graph
+                The graph as an adjacency list.
+            Processes
+                The number of worker processes.
+
+    Both return the tuple (Cost, Mst) where
+        Cost
+            The weight of the MST.
+        Mst
+            The edges selected in the MST.
+            Each edge is in the form (From, To).
+
+    Each round finds the cheapest edge that leaves every component and adds all these
+    edges to the MST, so the number of components is at least halved.
+    The edges are split into one slice per worker. The workers receive the edges once,
+    when they start. The component of each vertex is kept in an array of shared memory,
+    which the main process rewrites in every round and the workers read, so a task only
+    carries the range of its slice.
+
+    Edges of equal weight are ordered by their position in the list, which makes the MST
+    unique, so it has the same cost and edges as the one of kruskal.
+    If the graph is not connected, it returns a minimum spanning forest.
+
+    Complexity
+        O( |E| log(|V|) / P ) per worker, with P workers, plus O( |V| ) per round, i.e.
+        O( |V| log(|V|) ) in total, to update the shared components.
+"""
+
+import multiprocessing
+from array import array
+from union_find import UnionFind
+
+# The edges of the worker process, as the arrays (From, To, Weight).
+worker_edges = None
+# The shared components of the vertices, as a memoryview of C longs.
+worker_comp = None
+
+def init_worker(us, vs, ws, comp):
+    global worker_edges, worker_comp
+    worker_edges = (us, vs, ws)
+    worker_comp = as_longs(comp)
+
+def as_longs(shared):
+    return memoryview(shared).cast('B').cast('l')
+
+def cheapest_edges(task):
+    """
+    Finds the cheapest edge that leaves each component, among the edges lo..hi-1.
+    Returns a dict that maps components to the tuple (Weight, Edge index).
+    """
+    (lo, hi) = task
+    (us, vs, ws) = worker_edges
+    comp = worker_comp
+    best = {}
+    for i in range(lo, hi):
+        cu = comp[us[i]]
+        cv = comp[vs[i]]
+        if cu != cv:
+            e = (ws[i], i)
+            if cu not in best or e < best[cu]:
+                best[cu] = e
+            if cv not in best or e < best[cv]:
+                best[cv] = e
+    return best
+
+
+def boruvka_from_graph(graph, processes=None):
+    """
+    Runs the Borůvka algorithm using the graph representation.
+    """
+    # Create the list of edges.
+    edges = dict()
+    for u in graph:
+        neighbours = graph[u]
+        for v in neighbours:
+            edges[( min(u,v), max(u,v) )] = neighbours[v]
+
+    return boruvka(list(edges.items()), list(graph.keys()), processes)
+
+
+def boruvka(edges, vertices, processes=None):
+    """
+    Runs the Borůvka algorithm using the edges and vertices.
+    processes: The number of worker processes (the number of CPUs if None).
+    """
+    cost = 0
+    mst = []
+    n = len(vertices)
+    m = len(edges)
+
+    # Map the vertices to 0..n-1.
+    index = dict((v, i) for (i, v) in enumerate(vertices))
+    us = array('l', (index[u] for ((u, _), _) in edges))
+    vs = array('l', (index[v] for ((_, v), _) in edges))
+    ws = [w for (_, w) in edges]
+
+    if processes == None:
+        processes = multiprocessing.cpu_count()
+    shared = multiprocessing.RawArray('l', n)
+    comp = as_longs(shared)
+    comp[:] = array('l', range(n))
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, init_worker, (us, vs, ws, shared))
+    else:
+        init_worker(us, vs, ws, shared)
+    try:
+        step = max(1, -(-m // processes))
+        uf = UnionFind(range(n))
+        tasks = [(lo, min(lo + step, m)) for lo in range(0, m, step)]
+        while len(mst) < n-1:
+            results = pool.map(cheapest_edges, tasks) if pool != None else map(cheapest_edges, tasks)
+            # Merge the cheapest edges of the slices.
+            best = {}
+            for res in results:
+                for (c, e) in res.items():
+                    if c not in best or e < best[c]:
+                        best[c] = e
+            if not best:
+                break
+            for (w, i) in best.values():
+                # Two components may select the same edge.
+                if uf.find(us[i]) != uf.find(vs[i]):
+                    uf.union(us[i], vs[i])
+                    mst.append(edges[i][0])
+                    cost += w
+            comp[:] = array('l', (uf.find(u) for u in range(n)))
+    finally:
+        if pool != None:
+            pool.close()
+            pool.join()
+
+    return cost, mst
+
+
+if __name__ == "__main__":
+    from mst_kruskal import kruskal
+    # Graph representation
+    graph = dict()
+    graph[1] = {2: 1, 3: 2,}
+    graph[2] = {1: 1, 3: 3, 4: 5}
+    graph[3] = {1: 2, 2: 3, 4: 4}
+    graph[4] = {2: 5, 3: 4}
+    (cost, mst) = boruvka_from_graph(graph, 2)
+    assert cost == 7
+    assert sorted(mst) == [(1,2), (1,3), (3,4)]
+    # Same MST as kruskal, even with many edges of equal weight.
+    import random
+    random.seed(42)
+    vertices = list(range(300))
+    edges = [((u, v), random.randint(1, 10)) for u in vertices for v in vertices if u < v and random.random() < 0.05]
+    (cost1, mst1) = kruskal(edges, vertices)
+    for processes in [1, 3]:
+        (cost2, mst2) = boruvka(edges, vertices, processes)
+        assert cost1 == cost2
+        assert sorted(mst1) == sorted(mst2)
+    # Disconnected graphs give a spanning forest.
+    (cost, mst) = boruvka([((1, 2), 3), ((3, 4), 1)], [1, 2, 3, 4, 5], 1)
+    assert cost == 4
+    assert sorted(mst) == [(1, 2), (3, 4)]
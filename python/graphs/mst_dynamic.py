@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Incremental MST
+    ---------------
+
+    Maintains the Minimum Spanning Tree (or forest) of an undirected graph,
+    while new edges are inserted.
+
+    When the edge (u, v) of weight w is inserted:
+    - If u and v are not connected, the edge joins their trees.
+    - Otherwise, the edge closes a cycle with the tree path from u to v. If the heaviest
+      edge of that path is heavier than w, it is replaced by the new edge.
+
+    The MST is kept in a Link-Cut Tree, where every MST edge is also a node, whose value
+    is the weight of the edge, between the nodes of its two vertices. So the heaviest
+    edge of a path is the node with the maximum value on the path.
+
+    The constructor requires:
+    Vertices
+        A list of the graph's vertices.
+    Edges
+        The edges of an MST (or spanning forest) of the graph.
+        Each element is a tuple in the form ((From, To), Weight).
+
+    DynamicMST.from_graph creates the object from the graph as an adjacency list and
+    the MST, as returned by kruskal_from_graph or prim.
+
+    Supports the operations:
+    ADD_VERTEX V
+        Adds the vertex V, without any edges.
+    INSERT U V W
+        Inserts the edge (U, V) with weight W. Returns the edge that left the MST in the
+        form ((From, To), Weight), or None. If the new edge is not added to the MST, then
+        it is the edge that is returned.
+
+    The attributes Cost and the method mst() give the current MST, in the same form as kruskal.
+
+    Time Complexity
+        Insertions cost O( log(|V|) ) amortized.
+"""
+
+from link_cut_tree import LinkCutTree
+
+class DynamicMST:
+    def __init__(self, vertices, edges):
+        self.lct = LinkCutTree()
+        self.node = {}  # Maps vertices to their nodes.
+        self.edge = {}  # Maps the nodes of the MST edges to ((From, To), Weight).
+        self.cost = 0
+        for v in vertices:
+            self.add_vertex(v)
+        for ((u, v), w) in edges:
+            self.link(u, v, w)
+
+    @classmethod
+    def from_graph(cls, graph, mst):
+        """
+        Creates the object from the graph as an adjacency list and the edges of its MST.
+        """
+        return cls(graph.keys(), [((u, v), graph[u][v]) for (u, v) in mst])
+
+    def add_vertex(self, v):
+        self.node[v] = self.lct.add_node(float("-inf"))
+
+    def insert(self, u, v, w):
+        nu, nv = self.node[u], self.node[v]
+        if not self.lct.connected(nu, nv):
+            self.link(u, v, w)
+            return None
+        heaviest = self.lct.path_max(nu, nv)
+        if self.lct.val[heaviest] <= w:
+            return ((u, v), w)
+        removed = self.edge.pop(heaviest)
+        ((x, y), wxy) = removed
+        self.lct.cut(self.node[x], heaviest)
+        self.lct.cut(heaviest, self.node[y])
+        self.cost -= wxy
+        self.link(u, v, w)
+        return removed
+
+    def link(self, u, v, w):
+        """
+        Adds the edge (u, v) of weight w to the MST.
+        The nodes of the removed edges are not reused.
+        """
+        e = self.lct.add_node(w)
+        self.lct.link(self.node[u], e)
+        self.lct.link(e, self.node[v])
+        self.edge[e] = ((u, v), w)
+        self.cost += w
+
+    def mst(self):
+        """
+        Returns the edges of the MST. Each edge is in the form (From, To).
+        """
+        return [uv for (uv, _) in self.edge.values()]
+
+
+if __name__ == "__main__":
+    from mst_kruskal import kruskal, kruskal_from_graph
+    graph = dict()
+    graph[1] = {2: 1, 3: 2,}
+    graph[2] = {1: 1, 3: 3, 4: 5}
+    graph[3] = {1: 2, 2: 3, 4: 4}
+    graph[4] = {2: 5, 3: 4}
+    (cost, mst) = kruskal_from_graph(graph)
+    dmst = DynamicMST.from_graph(graph, mst)
+    assert dmst.cost == 7
+    assert dmst.insert(2, 4, 6) == ((2, 4), 6)
+    assert dmst.insert(2, 4, 1) == ((3, 4), 4)
+    assert dmst.cost == 4
+    assert sorted(dmst.mst()) == [(1,2), (1,3), (2,4)]
+    dmst.add_vertex(5)
+    assert dmst.insert(5, 3, 2) == None
+    assert dmst.cost == 6
+    # Compare with the minimum spanning forest of the edges inserted so far.
+    import random
+    from union_find import UnionFind
+    random.seed(42)
+    vertices = list(range(60))
+    edges = [((u, v), random.randint(1, 100)) for u in vertices for v in vertices if u < v and random.random() < 0.1]
+    random.shuffle(edges)
+    dmst = DynamicMST(vertices, [])
+    for (i, ((u, v), w)) in enumerate(edges):
+        dmst.insert(u, v, w)
+        uf = UnionFind(vertices)
+        forest = 0
+        for ((a, b), wab) in sorted(edges[:i+1], key=lambda x: x[1]):
+            if uf.find(a) != uf.find(b):
+                uf.union(a, b)
+                forest += wab
+        assert dmst.cost == forest
+    (cost, _) = kruskal(edges, vertices)
+    assert dmst.cost == cost
+    assert len(dmst.mst()) == len(vertices) - 1
@@ -19,8 +19,32 @@
         Parameters:
             Graph
                 The graph as an adjacency list.
-        
-    Both return the tuple (Cost, Mst) where
+
+    Both also take an optional Stats object (see utils/stats.py) that collects
+    phase timings and the counters of the UnionFind.
+
+    - kruskal_external
+        Parameters:
+            Edges
+                An iterable of the graph's edges, in the same form as in kruskal.
+                It is read only once, so it may be a generator over a file.
+            Vertices
+                A list of the graph's vertices.
+            ChunkSize
+                The maximum number of edges that are kept in memory.
+            FanIn
+                The maximum number of runs that are merged together.
+
+        The edges are read in chunks of ChunkSize edges. Each chunk is sorted by weight
+        and written to a temporary file (a run). Whenever FanIn runs have been merged the
+        same number of times, they are merged into one run, so at most FanIn runs per
+        level are open. At the end, the runs are merged, at most FanIn at a time, until
+        FanIn remain, whose merge is a single stream of edges in weight order, which is
+        consumed until the MST is complete. A merge keeps a block of ChunkSize / FanIn
+        edges of each run in memory, so at most ChunkSize edges in total.
+        If the graph is not connected, it returns a minimum spanning forest.
+
+    All return the tuple (Cost, Mst) where
         Cost
             The weight of the MST.
         Mst
@@ -31,9 +55,18 @@
         Θ( |E| log(|E|) )
 """
 
+import heapq
+import itertools
+import pickle
+import tempfile
 from union_find import UnionFind
 
-def kruskal_from_graph(graph):
+# The maximum number of edges that are pickled together in a run file.
+RUN_BLOCK = 1024
+# The default maximum number of runs that are merged together.
+MERGE_FAN_IN = 16
+
+def kruskal_from_graph(graph, stats=None):
     """
     Runs the Kruskal algorithm using the graph representation.
     """
@@ -44,10 +77,10 @@ def kruskal_from_graph(graph):
         for v in neighbours:
             edges[( min(u,v), max(u,v) )] = neighbours[v]
 
-    return kruskal(edges.items(), graph.keys())
+    return kruskal(edges.items(), graph.keys(), stats)
 
 
-def kruskal(edges, vertices):
+def kruskal(edges, vertices, stats=None):
     """
     Runs the Kruskal algorithm using the edges and vertices.
     """
@@ -56,8 +89,13 @@ def kruskal(edges, vertices):
     n = len(vertices)
 
     # Sort the edges by weight.
+    if stats != None:
+        stats.start("sort")
     edges = sorted(edges, key=lambda x: x[1])
-    uf = UnionFind(vertices)
+    uf = UnionFind(vertices, stats)
+    if stats != None:
+        stats.stop("sort")
+        stats.start("union")
 
     for ((u, v), w) in edges:
         # If the edge doesn't create a circle
@@ -68,7 +106,115 @@ def kruskal(edges, vertices):
             cost += w
             # Stop when the MST has |V|-1 edges.
             if len(mst) == n-1:
+                if stats != None:
+                    stats.stop("union")
                 return cost, mst
+
+    # The graph is not connected.
+    if stats != None:
+        stats.stop("union")
+    return None
+
+
+def kruskal_external(edges, vertices, chunk_size=1000000, tmpdir=None, fan_in=MERGE_FAN_IN):
+    """
+    Runs the Kruskal algorithm on edges that do not fit in memory.
+    tmpdir: The directory of the temporary files (the default one if None).
+    """
+    if fan_in < 2:
+        raise ValueError("At least two runs must be merged together")
+    cost = 0
+    mst = []
+    n = len(vertices)
+    uf = UnionFind(vertices)
+    block = max(1, min(RUN_BLOCK, chunk_size // fan_in))
+    levels = []  # The runs that were merged i times are at levels[i].
+    try:
+        # Write the sorted runs.
+        # Each edge is stored as (Weight, Seq, From, To), where Seq is unique,
+        # so that the vertices are never compared.
+        def add_run(chunk):
+            chunk.sort()
+            run = write_run(chunk, block, tmpdir)
+            level = 0
+            while True:
+                if level == len(levels):
+                    levels.append([])
+                levels[level].append(run)
+                if len(levels[level]) < fan_in:
+                    return
+                run = merge_runs(levels[level], block, tmpdir)
+                levels[level] = []
+                level += 1
+        chunk = []
+        for (seq, ((u, v), w)) in enumerate(edges):
+            chunk.append( (w, seq, u, v) )
+            if len(chunk) == chunk_size:
+                add_run(chunk)
+                chunk = []
+        if chunk:
+            add_run(chunk)
+        chunk = None
+        levels = [[run for level in levels for run in level]]
+        while len(levels[0]) > fan_in:
+            runs = levels[0]
+            levels = [[]]
+            for i in range(0, len(runs), fan_in):
+                levels[0].append(merge_runs(runs[i:i+fan_in], block, tmpdir))
+        runs = levels[0]
+        # Merge the last runs.
+        for (w, _, u, v) in heapq.merge(*[read_run(f) for f in runs]):
+            # If the edge doesn't create a circle
+            if uf.find(u) != uf.find(v):
+                # add it to the MST.
+                uf.union(u, v)
+                mst.append( (u,v) )
+                cost += w
+                # Stop when the MST has |V|-1 edges.
+                if len(mst) == n-1:
+                    break
+    finally:
+        for level in levels:
+            for f in level:
+                f.close()
+    return cost, mst
+
+def write_run(edges, block, tmpdir):
+    """
+    Writes sorted edges to a temporary file, which is deleted when closed, in blocks of
+    block edges. The edges may be an iterator, which is read one block at a time.
+    """
+    f = tempfile.TemporaryFile(dir=tmpdir)
+    edges = iter(edges)
+    while True:
+        chunk = list(itertools.islice(edges, block))
+        if not chunk:
+            break
+        pickle.dump(chunk, f, pickle.HIGHEST_PROTOCOL)
+    f.seek(0)
+    return f
+
+def merge_runs(runs, block, tmpdir):
+    """
+    Merges runs into a new run and closes them.
+    """
+    try:
+        return write_run(heapq.merge(*[read_run(f) for f in runs]), block, tmpdir)
+    finally:
+        for f in runs:
+            f.close()
+
+def read_run(f):
+    """
+    Yields the edges of a run file, one block at a time.
+    """
+    while True:
+        try:
+            block = pickle.load(f)
+        except EOFError:
+            return
+        for edge in block:
+            yield edge
     
 
 if __name__ == "__main__":
@@ -87,3 +233,28 @@ if __name__ == "__main__":
     (cost, mst) = kruskal(edges, vertices)
     assert cost == 7
     assert sorted(mst) == [(1,2), (1,3), (3,4)]
+    # Edges that are streamed through sorted runs.
+    (cost, mst) = kruskal_external(iter(edges), vertices, chunk_size=2)
+    assert cost == 7
+    assert sorted(mst) == [(1,2), (1,3), (3,4)]
+    import random
+    random.seed(42)
+    vertices = list(range(200))
+    edges = [((u, v), random.randint(1, 100)) for u in vertices for v in vertices if u < v and random.random() < 0.1]
+    (cost1, mst1) = kruskal(edges, vertices)
+    (cost2, mst2) = kruskal_external((e for e in edges), vertices, chunk_size=100)
+    assert cost1 == cost2
+    assert mst1 == mst2  # Ties are broken by the order of the edges, as in kruskal.
+    # Many more runs than the fan-in, so they are merged in several passes.
+    for fan_in in [2, 3, 7]:
+        assert kruskal_external(iter(edges), vertices, chunk_size=10, fan_in=fan_in) == (cost1, mst1)
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    assert kruskal(edges, vertices, stats) == (cost1, mst1)
+    assert stats.counters["uf_finds"] > 0
+    assert set(stats.timings) == set(["sort", "union"])
+    # A graph that is not connected has no MST, and the phases are still closed.
+    stats = Stats()
+    assert kruskal([((1,2), 1), ((3,4), 2)], [1, 2, 3, 4], stats) == None
+    assert not stats.started and set(stats.timings) == set(["sort", "union"])
@@ -6,52 +6,158 @@
 
     Calculate the Minimum Spanning Tree of an undirected graph.
 
+    Offers three functions:
+
+    - prim_sparse
+        Inserts a vertex in the priority queue only when it is first reached,
+        so the queue never holds unreachable vertices.
+        Θ( |E| log(|V|) ) -- Using a Binary Heap
+
+    - prim_dense
+        Keeps the cheapest edge to the tree of every vertex in a NumPy array and selects
+        the next vertex with an argmin over the array. Each step is vectorized.
+        Θ( |V|^2 ) -- Using an adjacency matrix
+
+    - prim
+        Calls prim_dense if the graph has at least DENSE_THRESHOLD * |V|^2 edges
+        and NumPy is available, otherwise calls prim_sparse.
+
     Parameters:
     Graph
         The graph as an adjacency list.
     Root
         The root vertex.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
 
-    Returns sthe tuple (Cost, Mst) where
+    Returns the tuple (Cost, Mst) where
         Cost
             The weight of the MST.
         Mst
             The edges selected in the MST.
             Each edge is in the form (From, To).
 
-    Complexity
-        Θ( |E| log(|V|) ) -- Using a Binary Heap
+    If the graph is not connected, the MST spans only the vertices that are reachable from the root.
+
+    prim_matrix also calculates the MST of a graph of vertices 0..n-1, given as an n x n
+    matrix of edge weights, where missing edges have an infinite weight.
+    Each edge of its MST is in the form (Parent, Child).
 """
 
 import collections
 from heap import MinHeap
 
-def prim(graph, root):
-    vertices = graph.keys()
-    n = len(vertices)
+# The minimum ratio of |E| / |V|^2 for which prim uses the adjacency matrix.
+DENSE_THRESHOLD = 0.05
+
+def prim(graph, root, stats=None):
+    n = len(graph)
+    m = sum(len(neighbours) for neighbours in graph.values())
+    if m >= DENSE_THRESHOLD * n * n:
+        try:
+            import numpy
+        except ImportError:
+            return prim_sparse(graph, root, stats)
+        return prim_dense(graph, root, stats)
+    return prim_sparse(graph, root, stats)
+
 
+def prim_sparse(graph, root, stats=None):
+    if stats != None:
+        stats.start("search")
+    relaxations = 0
     # Initialize the priority queue
-    inf = float("inf")
-    pq = MinHeap([(v, inf) for v in graph.keys()]) 
-    pq.change_priority(root, 0)
+    pq = MinHeap([(root, 0)], stats)
     # Other initializations
     parent = collections.defaultdict(lambda: None)
     selected = set()
     cost = 0
     mst = []
 
-    while len(selected) < n:
+    while len(pq) > 0:
         u = pq.take_min()
         selected.add(u)
         for (v, w) in graph[u].items():
-            if not v in selected and w < pq.get_priority(v):
+            if v in selected:
+                continue
+            if v not in pq:
+                pq.insert(v, w)
+                parent[v] = u
+                relaxations += 1
+            elif w < pq.get_priority(v):
                 pq.change_priority(v, w)
                 parent[v] = u
+                relaxations += 1
         pu = parent[u]
         if pu != None:
             mst.append( (min(u,pu), max(u,pu)) )
             cost += graph[u][pu]
     
+    if stats != None:
+        stats.stop("search")
+        stats.count("relaxations", relaxations)
+        stats.count("vertices_settled", len(selected))
+        stats.count("edges_scanned", sum(len(graph[u]) for u in selected))
+    return cost, mst
+
+
+def prim_dense(graph, root, stats=None):
+    import numpy as np
+    if stats != None:
+        stats.start("init")
+    vertices = list(graph.keys())
+    index = dict((v, i) for (i, v) in enumerate(vertices))
+    n = len(vertices)
+
+    # Build the adjacency matrix, one row at a time, keeping the cheapest edge between two vertices.
+    weights = np.full((n, n), np.inf)
+    for u in graph:
+        neighbours = graph[u]
+        weights[index[u], [index[v] for v in neighbours]] = list(neighbours.values())
+    weights = np.minimum(weights, weights.T)
+
+    if stats != None:
+        stats.stop("init")
+        stats.start("search")
+    _, tree = prim_matrix(weights, index[root])
+    if stats != None:
+        stats.stop("search")
+        stats.count("vertices_settled", len(tree) + 1)
+        stats.count("edges_scanned", (len(tree) + 1) * n)
+    cost = 0
+    mst = []
+    for (i, j) in tree:
+        pu, u = vertices[i], vertices[j]
+        mst.append( (min(u,pu), max(u,pu)) )
+        cost += graph[u][pu]
+    return cost, mst
+
+
+def prim_matrix(weights, root=0):
+    import numpy as np
+    weights = np.asarray(weights, dtype=float)
+    n = len(weights)
+    # key[v] is the weight of the cheapest edge from the tree to v, or inf if v is in the tree.
+    key = weights[root].copy()
+    parent = np.full(n, root)
+    inTree = np.zeros(n, dtype=bool)
+    inTree[root] = True
+    key[root] = np.inf
+    cost = 0
+    mst = []
+
+    for _ in range(n - 1):
+        u = int(np.argmin(key))
+        if key[u] == np.inf:
+            break
+        cost += weights[u, parent[u]]
+        mst.append( (int(parent[u]), u) )
+        inTree[u] = True
+        key[u] = np.inf
+        closer = (weights[u] < key) & ~inTree
+        key[closer] = weights[u, closer]
+        parent[closer] = u
+
     return cost, mst
 
 
@@ -64,3 +170,36 @@ if __name__ == "__main__":
     (cost, mst) = prim(graph, 1)
     assert cost == 7
     assert sorted(mst) == [(1,2), (1,3), (3,4)]
+    for fn in [prim_sparse, prim_dense]:
+        (cost, mst) = fn(graph, 1)
+        assert cost == 7
+        assert sorted(mst) == [(1,2), (1,3), (3,4)]
+    # Compare with kruskal on random graphs of any density.
+    import random
+    from mst_kruskal import kruskal_from_graph
+    random.seed(42)
+    for p in [0.02, 0.2, 0.9]:
+        graph = dict((v, {}) for v in range(120))
+        for u in range(120):
+            graph[u][(u + 1) % 120] = graph[(u + 1) % 120][u] = random.randint(1, 50)
+            for v in range(u + 2, 120):
+                if random.random() < p:
+                    graph[u][v] = graph[v][u] = random.randint(1, 50)
+        (cost, _) = kruskal_from_graph(graph)
+        for fn in [prim, prim_sparse, prim_dense]:
+            (cost1, mst1) = fn(graph, 0)
+            assert cost1 == cost and len(mst1) == 119
+    # Only the vertices that are reachable from the root are spanned.
+    graph = {1: {2: 3}, 2: {1: 3}, 3: {4: 1}, 4: {3: 1}}
+    assert prim_sparse(graph, 1) == (3, [(1, 2)])
+    assert prim_dense(graph, 3) == (1, [(3, 4)])
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    assert prim_sparse(graph, 1, stats) == (3, [(1, 2)])
+    assert stats.counters["relaxations"] == 1
+    assert stats.counters["vertices_settled"] == 2
+    assert stats.counters["edges_scanned"] == 2
+    stats = Stats()
+    prim_dense(graph, 1, stats)
+    assert set(stats.timings) == set(["init", "search"])
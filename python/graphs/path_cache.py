@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Shortest Path Cache
+    -------------------
+
+    Memoises the results of dijkstra and bfs for the graph of a GraphMapper, by root.
+
+    Every entry is valid only for the version of the GraphMapper it was computed from.
+    When the version changes (after any add_vertex or add_edge), all the entries are
+    stale, so they are dropped on the next lookup.
+
+    The least recently used entries are evicted, so that the cache has at most
+    MaxEntries entries and their approximate size is at most MaxBytes.
+    The size of an entry is the size of its dicts, as reported by sys.getsizeof.
+
+    The constructor requires:
+    Mapper
+        The GraphMapper of the graph.
+    MaxEntries
+        The maximum number of entries.
+    MaxBytes
+        The maximum approximate size of all the entries, or None for no limit.
+
+    Supports the operations:
+    DIJKSTRA ROOT
+        Returns the result of dijkstra for the root vertex (its representing integer).
+    BFS ROOT
+        Returns the result of bfs for the root vertex (its representing integer).
+
+    The results are shared between the calls, so they must not be modified.
+    The attributes Hits and Misses count the lookups.
+"""
+
+import collections
+import sys
+from bfs import bfs
+from dijkstra import dijkstra
+
+class PathCache:
+    def __init__(self, mapper, max_entries=128, max_bytes=None):
+        self.mapper = mapper
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()  # Maps (Algorithm, Root) to (Result, Size).
+        self.size = 0
+        self.version = mapper.version
+        self.hits = 0
+        self.misses = 0
+
+    def dijkstra(self, root):
+        return self.lookup(dijkstra, root)
+
+    def bfs(self, root):
+        return self.lookup(bfs, root)
+
+    def lookup(self, algorithm, root):
+        if self.mapper.version != self.version:
+            self.clear()
+            self.version = self.mapper.version
+        key = (algorithm.__name__, root)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key][0]
+        self.misses += 1
+        result = algorithm(self.mapper.get_graph(), root)
+        size = sum(sys.getsizeof(d) for d in result)
+        self.entries[key] = (result, size)
+        self.size += size
+        self.evict()
+        return result
+
+    def evict(self):
+        """
+        Removes the least recently used entries, until the cache is within its limits.
+        The newest entry is always kept.
+        """
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or
+                                         (self.max_bytes != None and self.size > self.max_bytes)):
+            (_, (_, size)) = self.entries.popitem(last=False)
+            self.size -= size
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+
+if __name__ == "__main__":
+    from mapper import GraphMapper
+    gmp = GraphMapper()
+    for v in "abcdef":
+        gmp.add_vertex(v)
+    for (u, v, w) in [("a", "b", 7), ("a", "c", 9), ("b", "c", 10), ("c", "d", 2), ("d", "e", 6), ("e", "f", 9)]:
+        gmp.add_edge(u, v, w)
+        gmp.add_edge(v, u, w)
+    a, f = gmp.lookup_vertex("a"), gmp.lookup_vertex("f")
+    cache = PathCache(gmp, max_entries=2)
+    (cost, _) = cache.dijkstra(a)
+    assert cost[f] == 26
+    assert cache.dijkstra(a)[0] is cost
+    assert (cache.hits, cache.misses) == (1, 1)
+    # A change of the graph invalidates the cached results.
+    gmp.add_edge("a", "f", 5)
+    (cost, _) = cache.dijkstra(a)
+    assert cost[f] == 5
+    assert (cache.hits, cache.misses) == (1, 2)
+    # The least recently used entry is evicted.
+    (parent, _) = cache.bfs(a)
+    assert parent[f] == a
+    cache.dijkstra(a)
+    cache.bfs(f)
+    assert len(cache) == 2
+    assert list(cache.entries) == [("dijkstra", a), ("bfs", f)]
+    # The size limit is also respected.
+    cache = PathCache(gmp, max_entries=10, max_bytes=1)
+    cache.dijkstra(a)
+    cache.dijkstra(f)
+    assert len(cache) == 1
+    assert cache.size > 1
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Path Index
+    ----------
+
+    Keeps the parent maps of shortest path results (of dijkstra, bellman_ford,
+    floyd_warshall, bfs, ...) in integer arrays, to rebuild the paths quickly.
+
+    The vertices are mapped to the integers 0..n-1 with an IntMapper (see utils/mapper.py).
+    Every tree, i.e. the parent map of one source, is a row of n integers in a single flat
+    array, where -1 means no parent. All the rows of floyd_warshall take n^2 integers,
+    instead of n^2 dict entries.
+
+    The constructor requires:
+    Vertices
+        The vertices of the graph.
+
+    Supports the operations:
+    ADD_TREE SOURCE PARENT
+        Adds the parent map of the shortest paths from Source.
+    FROM_ALL_PAIRS VERTICES PARENT
+        Creates an index with a tree for every row of the result of floyd_warshall.
+    PATH S T / PATHS PAIRS
+        Returns the path from S to T, as a list of vertices, or None if there is no path.
+        PATHS is a convenience wrapper that calls PATH for every (S, T) pair.
+    LENGTH S T / LENGTHS PAIRS
+        Returns the number of edges of the path from S to T, or None if there is no path,
+        without building the path. The depths of a tree are computed once, on first use.
+        LENGTHS is a convenience wrapper that calls LENGTH for every (S, T) pair.
+    NEXT_HOPS
+        Returns a NextHopTable of the trees of the index.
+
+    NextHopTable
+        Keeps, for every source u and target v, the vertex after u on the path to v.
+        A source has at most deg(u) distinct next hops, so each row is stored as the list
+        of its distinct hops and one small code per target (an index into the list, in an
+        array of bytes when there are fewer than 256 distinct hops). A path is followed
+        hop by hop, which needs the rows of the intermediate vertices too.
+
+    Time Complexity
+        Add Tree    : O( n )
+        Path        : O( length of the path )
+        Paths       : O( total length of the paths )
+        Length      : O( 1 ), after O( n ) for the first query of a tree
+        Next Hops   : O( n ) per tree
+"""
+
+from array import array
+from mapper import IntMapper
+
+NONE = -1
+
+class PathIndex:
+    def __init__(self, vertices):
+        self.mapper = IntMapper(True)
+        self.mapper.intern(vertices)
+        self.n = self.mapper.index
+        self.pred = array('q')
+        self.rows = {}  # Maps source indexes to the offsets of their rows.
+        self.depths = {}  # Maps source indexes to their computed depths.
+
+    @classmethod
+    def from_all_pairs(cls, vertices, parent):
+        index = cls(vertices)
+        for u in vertices:
+            index.add_tree(u, parent[u])
+        return index
+
+    def add_tree(self, source, parent):
+        s = self.mapper.lookup_item(source)
+        table = self.mapper.table
+        row = array('q', self.n * [NONE])
+        for (v, p) in parent.items():
+            if p != None:
+                row[table[v]] = table[p]
+        if s in self.rows:
+            offset = self.rows[s]
+            self.pred[offset:offset + self.n] = row
+            self.depths.pop(s, None)
+        else:
+            self.rows[s] = len(self.pred)
+            self.pred.extend(row)
+
+    def path(self, source, target):
+        table = self.mapper.table
+        return self.path_of_indexes(table[source], table[target])
+
+    def path_of_indexes(self, s, t):
+        pred, offset, n = self.pred, self.rows[s], self.n
+        path = [t]
+        while t != s:
+            t = pred[offset + t]
+            if t == NONE:
+                return None
+            path.append(t)
+            if len(path) > n:
+                raise ValueError("The tree has a cycle")
+        path.reverse()
+        lookup = self.mapper.revTable
+        return [lookup[v] for v in path]
+
+    def paths(self, pairs):
+        """
+        Returns the list of the paths of the (source, target) pairs, one by one.
+        """
+        return [self.path(s, t) for (s, t) in pairs]
+
+    def depth(self, s):
+        """
+        Returns the depths of all the vertices in the tree of s, where -1 means unreachable.
+        Raises ValueError if the parents have a cycle.
+        """
+        if s in self.depths:
+            return self.depths[s]
+        pred, offset, n = self.pred, self.rows[s], self.n
+        depth = array('q', n * [-2])  # -2 is not computed yet, -3 is on the current climb.
+        depth[s] = 0
+        for v in range(n):
+            # Climb up to a vertex of known depth, then set the depths on the way back.
+            stack = []
+            while depth[v] == -2:
+                depth[v] = -3
+                stack.append(v)
+                v = pred[offset + v]
+                if v == NONE:
+                    break
+            if v != NONE and depth[v] == -3:
+                raise ValueError("The tree has a cycle")
+            d = depth[v] if v != NONE else -1
+            while stack:
+                v = stack.pop()
+                d = d + 1 if d != -1 else -1
+                depth[v] = d
+        self.depths[s] = depth
+        return depth
+
+    def length(self, source, target):
+        table = self.mapper.table
+        d = self.depth(table[source])[table[target]]
+        return d if d != -1 else None
+
+    def lengths(self, pairs):
+        """
+        Returns the list of the lengths of the (source, target) pairs, one by one.
+        """
+        return [self.length(s, t) for (s, t) in pairs]
+
+    def next_hops(self):
+        return NextHopTable(self)
+
+
+class NextHopTable:
+    def __init__(self, index):
+        self.mapper = index.mapper
+        self.rows = {}  # Maps source indexes to (Distinct hops, Codes).
+        n = index.n
+        pred = index.pred
+        for (s, offset) in index.rows.items():
+            depth = index.depth(s)
+            hop = n * [NONE]
+            # The parents come before their children in the order of depth.
+            for v in sorted((v for v in range(n) if depth[v] > 0), key=depth.__getitem__):
+                p = pred[offset + v]
+                hop[v] = v if p == s else hop[p]
+            distinct = sorted(set(hop) - set([NONE]))
+            code = dict((h, i + 1) for (i, h) in enumerate(distinct))
+            code[NONE] = 0
+            typecode = 'B' if len(distinct) < 2**8 else ('H' if len(distinct) < 2**16 else 'q')
+            self.rows[s] = (array('q', distinct), array(typecode, [code[h] for h in hop]))
+
+    def next_hop_of_indexes(self, s, t):
+        (distinct, codes) = self.rows[s]
+        c = codes[t]
+        return distinct[c - 1] if c != 0 else None
+
+    def next_hop(self, source, target):
+        table = self.mapper.table
+        h = self.next_hop_of_indexes(table[source], table[target])
+        return self.mapper.revTable[h] if h != None else None
+
+    def path(self, source, target):
+        table = self.mapper.table
+        (s, t) = (table[source], table[target])
+        path = [s]
+        while s != t:
+            s = self.next_hop_of_indexes(s, t)
+            if s == None:
+                return None
+            path.append(s)
+        lookup = self.mapper.revTable
+        return [lookup[v] for v in path]
+
+    def nbytes(self):
+        return sum(d.itemsize * len(d) + c.itemsize * len(c) for (d, c) in self.rows.values())
+
+
+if __name__ == "__main__":
+    import random
+    from dijkstra import dijkstra
+    from bellman_ford import bellman_ford
+    from floyd_warshall import floyd_warshall
+    graph = dict()
+    graph['s'] = {'a': 6, 'b': 8}
+    graph['a'] = {'c': -5, 'd': 4}
+    graph['b'] = {'a': 7, 'c': 2}
+    graph['c'] = {'d': -4, 'e': 3}
+    graph['d'] = {'e': 2, 'f': 5}
+    graph['e'] = {'b': 1, 'f': 2}
+    graph['f'] = {}
+    graph['g'] = {'s': 1}
+    index = PathIndex(graph)
+    index.add_tree('s', bellman_ford(graph, 's')[1])
+    assert index.path('s', 'f') == ['s', 'a', 'c', 'd', 'e', 'f']
+    assert index.paths([('s', 's'), ('s', 'b'), ('s', 'g')]) == [['s'], ['s', 'a', 'c', 'd', 'e', 'b'], None]
+    assert index.lengths([('s', 'f'), ('s', 's'), ('s', 'g')]) == [5, 0, None]
+    # All pairs, compared with the parent maps.
+    random.seed(42)
+    n = 60
+    graph = dict((v, {}) for v in range(1, n + 1))
+    for _ in range(200):
+        graph[random.randint(1, n)][random.randint(1, n)] = random.randint(1, 9)
+    (cost, parent) = floyd_warshall(graph)
+    index = PathIndex.from_all_pairs(list(graph), parent)
+    hops = index.next_hops()
+    assert hops.nbytes() < 2 * n * n
+    def walk(parent, s, t):
+        path = [t]
+        while t != s:
+            t = parent[t]
+            if t == None:
+                return None
+            path.append(t)
+        return path[::-1]
+    for s in graph:
+        dcost = dijkstra(graph, s)[0]
+        for t in graph:
+            path = index.path(s, t)
+            assert path == walk(parent[s], s, t) == hops.path(s, t)
+            if path == None:
+                assert index.length(s, t) == None and cost[s][t] == float("inf")
+            else:
+                assert index.length(s, t) == len(path) - 1
+                assert sum(graph[u][v] for (u, v) in zip(path, path[1:])) == cost[s][t] == dcost[t]
+                assert hops.next_hop(s, t) == (path[1] if s != t else None)
+    # A tree can be replaced.
+    index.add_tree(1, dijkstra(graph, 1)[1])
+    assert index.length(1, 1) == 0
+    # Parents with a cycle that does not pass through the source.
+    index = PathIndex([1, 2, 3, 4])
+    index.add_tree(1, {1: None, 2: 3, 3: 4, 4: 2})
+    for query in [lambda: index.length(1, 2), lambda: index.path(1, 3)]:
+        try:
+            query()
+            assert False
+        except ValueError as e:
+            assert str(e) == "The tree has a cycle"
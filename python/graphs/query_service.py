@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Shortest Path Query Service
+    ---------------------------
+
+    An asyncio front end that answers dijkstra and bfs queries for a fixed graph.
+
+    - Coalescing
+        The requests for the same algorithm and root that arrive while it is being
+        computed wait for the same computation.
+    - Batching
+        The distinct roots are queued and grouped into batches of at most BatchSize,
+        waiting at most BatchDelay seconds for a batch to fill. Every batch is one job
+        of a pool of worker processes, which receive the graph once, when they start.
+    - Backpressure
+        At most MaxPending distinct computations are queued or running. Further requests
+        wait until one finishes.
+    - Latency
+        The time from every request to its answer is recorded in a Histogram (see
+        utils/stats.py) per algorithm. The Stats counters requests, coalesced and
+        batches count the requests, the requests that waited for another one and the jobs.
+
+    The constructor requires:
+    Graph
+        The graph as an adjacency list. It must not change while the service runs.
+    Processes
+        The number of worker processes (None for one per CPU). If it is 0, the batches
+        run in a thread of the service's process instead.
+    BatchSize, BatchDelay, MaxPending
+        As above.
+
+    Supports the operations (coroutines):
+    START / CLOSE
+        Start the batching and the workers / stop accepting requests, run the requests
+        that are queued or being batched, wait for all the jobs and stop the workers.
+        The requests after CLOSE raise RuntimeError.
+    DIJKSTRA ROOT
+        Returns the result of dijkstra, as the plain dicts (Cost, Parent).
+    BFS ROOT
+        Returns the result of bfs, as the plain dicts (Parent, Cost).
+
+    The results are shared between the coalesced requests, so they must not be modified.
+
+    QueryClient runs a service in an event loop of a background thread, so that it can be
+    called from ordinary code and tests, in the same process.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+from bfs import bfs
+from dijkstra import dijkstra
+from stats import Stats, Histogram
+
+ALGORITHMS = {"dijkstra": dijkstra, "bfs": bfs}
+
+# The graph of the worker process.
+worker_graph = None
+
+def init_worker(graph):
+    global worker_graph
+    worker_graph = graph
+
+def compute_batch(graph, keys):
+    """
+    Runs the algorithm of every key (Algorithm, Root) and returns the results as plain dicts,
+    which, unlike the defaultdicts of the algorithms, can be sent between processes.
+    """
+    return [tuple(dict(d) for d in ALGORITHMS[algorithm](graph, root)) for (algorithm, root) in keys]
+
+def run_batch(keys):
+    return compute_batch(worker_graph, keys)
+
+
+class QueryService:
+    def __init__(self, graph, processes=None, batch_size=16, batch_delay=0.001, max_pending=1024):
+        self.graph = graph
+        self.processes = processes
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.inflight = {}  # Maps (Algorithm, Root) to the future of its result.
+        self.held = []  # The keys that the batcher took from the queue and has not sent.
+        self.jobs = set()
+        self.closed = False
+        self.stats = Stats()
+        self.latency = collections.defaultdict(Histogram)
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.pending = asyncio.Semaphore(self.max_pending)
+        self.executor = None
+        if self.processes != 0:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                self.processes, initializer=init_worker, initargs=(self.graph,))
+        self.batcher = asyncio.ensure_future(self.make_batches())
+
+    async def close(self):
+        self.closed = True
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+        # Send the keys that the batcher held and the ones still in the queue.
+        keys = self.held
+        self.held = []
+        while not self.queue.empty():
+            keys.append(self.queue.get_nowait())
+        for i in range(0, len(keys), self.batch_size):
+            self.send(keys[i:i + self.batch_size])
+        if self.jobs:
+            await asyncio.wait(self.jobs)
+        if self.executor != None:
+            self.executor.shutdown()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def dijkstra(self, root):
+        return await self.query("dijkstra", root)
+
+    async def bfs(self, root):
+        return await self.query("bfs", root)
+
+    async def query(self, algorithm, root):
+        if algorithm not in ALGORITHMS:
+            raise ValueError("Unknown algorithm %r" % (algorithm,))
+        if self.closed:
+            raise RuntimeError("The service is closed")
+        start = time.perf_counter()
+        key = (algorithm, root)
+        self.stats.count("requests")
+        future = self.inflight.get(key)
+        if future == None:
+            await self.pending.acquire()
+            if self.closed:
+                self.pending.release()
+                raise RuntimeError("The service is closed")
+            # Another request for the same key may have arrived while waiting.
+            future = self.inflight.get(key)
+            if future == None:
+                future = asyncio.get_running_loop().create_future()
+                self.inflight[key] = future
+                self.queue.put_nowait(key)
+            else:
+                self.pending.release()
+                self.stats.count("coalesced")
+        else:
+            self.stats.count("coalesced")
+        # A cancelled request must not cancel the computation for the others.
+        result = await asyncio.shield(future)
+        self.latency[algorithm].record(time.perf_counter() - start)
+        return result
+
+    async def make_batches(self):
+        while True:
+            # The keys are kept in self.held while waiting, so that close can send them.
+            self.held = [await self.queue.get()]
+            if self.batch_delay > 0 and self.queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.batch_delay)
+            while len(self.held) < self.batch_size and not self.queue.empty():
+                self.held.append(self.queue.get_nowait())
+            keys = self.held
+            self.held = []
+            self.send(keys)
+
+    def send(self, keys):
+        self.stats.count("batches")
+        job = asyncio.ensure_future(self.run_job(keys))
+        self.jobs.add(job)
+        job.add_done_callback(self.jobs.discard)
+
+    async def run_job(self, keys):
+        loop = asyncio.get_running_loop()
+        try:
+            if self.executor != None:
+                results = await loop.run_in_executor(self.executor, run_batch, keys)
+            else:
+                results = await loop.run_in_executor(None, compute_batch, self.graph, keys)
+        except Exception as e:
+            for key in keys:
+                self.inflight[key].set_exception(e)
+        else:
+            for (key, result) in zip(keys, results):
+                self.inflight[key].set_result(result)
+        finally:
+            for key in keys:
+                del self.inflight[key]
+                self.pending.release()
+
+
+class QueryClient:
+    """
+    A blocking client of a QueryService that runs in a background thread of the same process.
+    The options are passed to the service.
+    """
+    def __init__(self, graph, **options):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.service = QueryService(graph, **options)
+        self.call(self.service.start())
+
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def submit(self, algorithm, root):
+        """
+        Sends a request without waiting and returns a concurrent.futures.Future of its result.
+        """
+        return asyncio.run_coroutine_threadsafe(self.service.query(algorithm, root), self.loop)
+
+    def dijkstra(self, root):
+        return self.submit("dijkstra", root).result()
+
+    def bfs(self, root):
+        return self.submit("bfs", root).result()
+
+    def close(self):
+        self.call(self.service.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import random
+    graph = dict()
+    graph[1] = {2: 7, 3: 9, 6: 14}
+    graph[2] = {1: 7, 3: 10, 4: 15}
+    graph[3] = {1: 9, 2: 10, 4: 11, 6: 2}
+    graph[4] = {2: 15, 3: 11, 5: 6}
+    graph[5] = {4: 6, 6: 9}
+    graph[6] = {1: 14, 3: 2, 5: 9}
+
+    # Concurrent requests for the same roots are coalesced and the rest are batched.
+    async def burst(service, roots):
+        return await asyncio.gather(*[service.dijkstra(r) for r in roots] + [service.bfs(1)])
+    async def run(roots, **options):
+        async with QueryService(graph, **options) as service:
+            return (await burst(service, roots)), service
+    roots = [1, 2, 1, 3, 1, 2, 6, 6]
+    for processes in [0, 2]:
+        (results, service) = asyncio.run(run(roots, processes=processes, batch_size=2))
+        for (r, (cost, parent)) in zip(roots, results):
+            assert (cost, parent) == dijkstra(graph, r)
+        assert results[-1] == bfs(graph, 1)
+        assert results[0] is results[2] is results[4]
+        assert service.stats.counters["requests"] == 9
+        assert service.stats.counters["coalesced"] == 4
+        assert service.stats.counters["batches"] == 3
+        assert service.latency["dijkstra"].n == 8 and service.latency["bfs"].n == 1
+        assert not service.inflight
+    # Backpressure: with one pending computation, the roots run one after the other, and
+    # only the requests that arrive while their root is computed are coalesced.
+    (results, service) = asyncio.run(run(roots, processes=0, max_pending=1))
+    assert [r[0][5] for r in results[:-1]] == [dijkstra(graph, r)[0][5] for r in roots]
+    assert service.stats.counters["batches"] == 7
+    # Closing during the batch delay still answers the queued requests.
+    async def close_early():
+        service = QueryService(graph, processes=0, batch_size=8, batch_delay=0.5)
+        await service.start()
+        queries = [asyncio.ensure_future(service.dijkstra(r)) for r in [1, 2, 3]]
+        await asyncio.sleep(0.01)
+        await service.close()
+        results = await asyncio.wait_for(asyncio.gather(*queries), 5)
+        assert [r[0][5] for r in results] == [dijkstra(graph, r)[0][5] for r in [1, 2, 3]]
+        assert not service.inflight and not service.jobs
+        for (algorithm, error) in [("dijkstra", RuntimeError), ("floyd", ValueError)]:
+            try:
+                await service.query(algorithm, 1)
+                assert False
+            except error:
+                pass
+    asyncio.run(close_early())
+    # The in-process client, on a random graph.
+    random.seed(42)
+    n = 200
+    graph = dict((v, {}) for v in range(n))
+    for _ in range(800):
+        graph[random.randrange(n)][random.randrange(n)] = random.randint(1, 20)
+    with QueryClient(graph, processes=2, max_pending=8) as client:
+        roots = [random.randrange(20) for _ in range(100)]
+        futures = [client.submit("dijkstra", r) for r in roots]
+        for (r, f) in zip(roots, futures):
+            assert f.result()[0] == dijkstra(graph, r)[0]
+        assert client.bfs(7) == bfs(graph, 7)
+        assert client.service.latency["dijkstra"].n == 100
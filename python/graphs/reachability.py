@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Reachability Index
+    ------------------
+
+    Answers queries of the form "is there a path from u to v" in a directed graph.
+
+    The strongly connected components of the graph (found by tarjan_ssc) are collapsed
+    into single vertices, which gives a DAG (the condensation). tarjan_ssc returns the
+    components in reverse topological order, i.e. every component comes after all the
+    components that it reaches, so each component is processed after its successors.
+
+    Two methods are offered:
+
+    - closure
+        Keeps the set of the components that each component reaches, as a bitset, where
+        bit i is set if component i is reachable. The set of a component is the union of
+        the sets of its successors, which is computed with Python ints. Then the bitsets
+        are copied, as rows of ceil(C / 8) bytes, into one bytearray, so that a query tests
+        a single bit of a single byte, instead of shifting a C-bit int. The int of a
+        component is dropped once all the components that reach it are done.
+        Space: O( C^2 ) bits, where C is the number of components.
+
+    - intervals
+        Keeps K interval labels per component (as in GRAIL). Each label comes from a
+        randomized DFS over the DAG: a component with post-order rank r gets the interval
+        [low, r], where low is the minimum rank that it reaches. If u reaches v, then every
+        label of v is contained in the matching label of u, so most negative queries are
+        answered at once. The rest are answered by a DFS that only follows components
+        whose labels contain the labels of v.
+        Space: O( K C + E ).
+
+    The constructor requires:
+    Graph
+        The graph as an adjacency list.
+    Method
+        "closure", "intervals" or "auto", which uses closure if its bitsets take at most
+        MaxBytes bytes.
+
+    Supports the operations:
+    REACHES U V
+        Finds whether V is reachable from U. Every vertex reaches itself.
+
+    Time Complexity
+        Build (closure)   : O( |V| + |E| + C E_c / w ), where E_c are the edges of the DAG
+                            and w the bits of a machine word
+        Build (intervals) : O( K (|V| + |E|) )
+        Query (closure)   : O( 1 ) bit test
+        Query (intervals) : O( K ) if the labels rule the path out, O( C + E_c ) otherwise
+"""
+
+import random
+from tarjan_ssc import tarjan_ssc
+
+class ReachabilityIndex:
+    def __init__(self, graph, method="auto", traversals=3, max_bytes=2**30, seed=None):
+        ssc = tarjan_ssc(graph)
+        n = len(ssc)
+        # Map the vertices to their components and find the successors of the components.
+        self.comp = {}
+        for (c, component) in enumerate(ssc):
+            for u in component:
+                self.comp[u] = c
+        succ = [set() for _ in range(n)]
+        for u in graph:
+            cu = self.comp[u]
+            for v in graph[u]:
+                cv = self.comp[v]
+                if cu != cv:
+                    succ[cu].add(cv)
+        self.succ = [list(s) for s in succ]
+        if method == "auto":
+            method = "closure" if n * n // 8 <= max_bytes else "intervals"
+        self.method = method
+        if method == "closure":
+            self.build_closure()
+        else:
+            self.build_intervals(traversals, random.Random(seed))
+
+    def build_closure(self):
+        n = len(self.succ)
+        self.rowBytes = (n + 7) // 8
+        self.bits = bytearray(n * self.rowBytes)
+        # The number of the components that reach each component and are not done yet.
+        pending = n * [0]
+        for succ in self.succ:
+            for d in succ:
+                pending[d] += 1
+        masks = n * [None]
+        for (c, succ) in enumerate(self.succ):
+            # The successors come earlier in the order of tarjan_ssc.
+            mask = 1 << c
+            for d in succ:
+                mask |= masks[d]
+                pending[d] -= 1
+                if pending[d] == 0:
+                    masks[d] = None
+            start = c * self.rowBytes
+            self.bits[start:start + self.rowBytes] = mask.to_bytes(self.rowBytes, "little")
+            if pending[c] > 0:
+                masks[c] = mask
+
+    def build_intervals(self, traversals, rnd):
+        n = len(self.succ)
+        self.labels = []  # One (Low, Rank) list per traversal.
+        for _ in range(traversals):
+            low = n * [None]
+            rank = n * [None]
+            r = 0
+            roots = list(range(n))
+            rnd.shuffle(roots)
+            for root in roots:
+                if rank[root] != None or low[root] != None:
+                    continue
+                low[root] = n  # Marks the component as visited.
+                children = list(self.succ[root])
+                rnd.shuffle(children)
+                stack = [(root, children)]
+                while stack:
+                    (c, children) = stack[-1]
+                    if children:
+                        d = children.pop()
+                        if low[d] == None:
+                            low[d] = n
+                            grandchildren = list(self.succ[d])
+                            rnd.shuffle(grandchildren)
+                            stack.append((d, grandchildren))
+                        continue
+                    stack.pop()
+                    rank[c] = r
+                    r += 1
+                    low[c] = min([r - 1] + [low[d] for d in self.succ[c]])
+            self.labels.append((low, rank))
+
+    def contains(self, cu, cv):
+        """
+        Checks whether every label of cv is contained in the matching label of cu.
+        """
+        for (low, rank) in self.labels:
+            if low[cv] < low[cu] or rank[cv] > rank[cu]:
+                return False
+        return True
+
+    def reaches(self, u, v):
+        cu = self.comp[u]
+        cv = self.comp[v]
+        if cu == cv:
+            return True
+        if self.method == "closure":
+            return (self.bits[cu * self.rowBytes + (cv >> 3)] >> (cv & 7)) & 1 == 1
+        if not self.contains(cu, cv):
+            return False
+        # Search, following only the components whose labels contain the labels of cv.
+        visited = set([cu])
+        stack = [cu]
+        while stack:
+            c = stack.pop()
+            for d in self.succ[c]:
+                if d == cv:
+                    return True
+                if d not in visited and self.contains(d, cv):
+                    visited.add(d)
+                    stack.append(d)
+        return False
+
+
+if __name__ == "__main__":
+    import sys
+    sys.setrecursionlimit(999999999)
+    graph = dict()
+    graph[1] = {5: 1}
+    graph[2] = {1: 1}
+    graph[3] = {2: 1, 4: 1}
+    graph[4] = {3: 1}
+    graph[5] = {2: 1}
+    graph[6] = {2: 1, 5: 1, 7: 1}
+    graph[7] = {3: 1, 6: 1}
+    graph[8] = {4: 1, 7: 1}
+    for method in ["closure", "intervals"]:
+        index = ReachabilityIndex(graph, method)
+        assert index.reaches(8, 1) and index.reaches(7, 4) and index.reaches(5, 1)
+        assert not index.reaches(1, 3) and not index.reaches(4, 6) and not index.reaches(7, 8)
+    assert ReachabilityIndex(graph).method == "closure"
+    assert ReachabilityIndex(graph, max_bytes=1).method == "intervals"
+    # Compare with a search from every vertex.
+    random.seed(42)
+    n = 150
+    graph = dict((v, {}) for v in range(n))
+    for _ in range(180):
+        graph[random.randrange(n)][random.randrange(n)] = 1
+    reachable = {}
+    for u in graph:
+        seen = set([u])
+        stack = [u]
+        while stack:
+            x = stack.pop()
+            for y in graph[x]:
+                if y not in seen:
+                    seen.add(y)
+                    stack.append(y)
+        reachable[u] = seen
+    for index in [ReachabilityIndex(graph, "closure"), ReachabilityIndex(graph, "intervals", seed=1)]:
+        assert all(index.reaches(u, v) == (v in reachable[u]) for u in graph for v in graph)
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Sharded Graph
+    -------------
+
+    Splits a graph into shards with a VertexPartition (see utils/mapper.py) and keeps every
+    shard in its own worker process, which owns the adjacency lists, costs and parents of
+    its vertices. A coordinator drives the workers in rounds: in every round each worker
+    works on its own vertices and returns the messages for the vertices of other shards,
+    grouped by shard, and the coordinator passes them on with the next request.
+
+    The workers only talk to the coordinator over Connection objects, with send and recv.
+    By default they are local processes connected with pipes, but they can also be
+    processes on other machines that run shard_worker over a connection of
+    multiprocessing.connection (Listener / Client), passed as Connections.
+
+    The constructor requires:
+    Graph
+        The graph as an adjacency list. It is sent to the workers and not kept.
+    Partition
+        A VertexPartition of the vertices.
+    Connections
+        Optional connections to running shard_worker loops, one per shard.
+
+    Supports the operations:
+    BFS ROOT
+        A level-synchronous BFS. In every level, the workers expand the vertices of the
+        frontier that they own, and every vertex takes as parent its first discoverer in
+        the order of the sequential bfs, so the result is the same as the one of bfs.
+    DIJKSTRA ROOT [DELTA]
+        Delta-stepping shortest paths. The vertices are kept in buckets of width Delta,
+        by their tentative cost. The lowest bucket is emptied by relaxing its light edges
+        (weight <= Delta) until no vertex enters it again, then the heavy edges of its
+        vertices are relaxed. Delta defaults to the mean weight of the edges.
+        It requires non-negative weights and the costs are the same as the ones of dijkstra.
+        Among paths of equal cost, the parents may differ.
+    CLOSE
+        Stops the workers.
+
+    Complexity
+        O( L ) rounds for bfs, where L is the number of levels, and O( (C / Delta) R )
+        rounds for dijkstra, where C is the largest cost and R the number of light rounds
+        per bucket. The work of each round is split between the workers.
+"""
+
+import collections
+import multiprocessing
+
+class Shard:
+    """
+    The state of a worker. Every public method is a request of the coordinator.
+    """
+    def load(self, graph, partition):
+        self.graph = graph
+        self.partition = partition
+
+    def route(self, messages):
+        """
+        Groups messages, whose first element is a vertex, by the shard that owns the vertex.
+        """
+        out = [[] for _ in range(self.partition.shards)]
+        owner = self.partition.owner
+        for m in messages:
+            out[owner(m[0])].append(m)
+        return out
+
+    def weights(self):
+        return (sum(sum(adj.values()) for adj in self.graph.values()),
+                sum(len(adj) for adj in self.graph.values()))
+
+    def bfs_start(self, root):
+        self.parent = {}
+        self.cost = {}
+        if root in self.graph:
+            self.parent[root] = None
+            self.cost[root] = 0
+
+    def bfs_expand(self, frontier):
+        """
+        Expands the frontier, a list of (Vertex, Rank) where Rank is the order of the vertex
+        in the sequential bfs. Returns the candidates (Vertex, Key, Parent, Cost) by shard,
+        where Key is the order in which the sequential bfs would find the vertex.
+        """
+        candidates = []
+        for (u, rank) in frontier:
+            cu = self.cost[u]
+            for (pos, (v, w)) in enumerate(self.graph[u].items()):
+                candidates.append((v, (rank, pos), u, cu + w))
+        return self.route(candidates)
+
+    def bfs_visit(self, candidates):
+        """
+        Visits the new vertices and returns them as (Key, Vertex).
+        """
+        best = {}
+        for (v, key, u, c) in candidates:
+            if v not in self.parent and (v not in best or key < best[v][0]):
+                best[v] = (key, u, c)
+        for (v, (_, u, c)) in best.items():
+            self.parent[v] = u
+            self.cost[v] = c
+        return [(key, v) for (v, (key, _, _)) in best.items()]
+
+    def bfs_result(self):
+        return self.parent, self.cost
+
+    def sssp_start(self, root, delta):
+        inf = float("inf")
+        self.delta = delta
+        self.cost = dict((v, inf) for v in self.graph)
+        self.parent = {}
+        self.buckets = {}
+        self.removed = set()  # The vertices removed from the current bucket.
+        if root in self.graph:
+            self.cost[root] = 0
+            self.buckets[0] = set([root])
+        return self.min_bucket()
+
+    def min_bucket(self):
+        return min(self.buckets) if self.buckets else None
+
+    def sssp_light(self, i):
+        """
+        Empties bucket i and returns the relaxations (Vertex, Cost, Parent) of its light edges by shard.
+        """
+        bucket = self.buckets.pop(i, ())
+        self.removed.update(bucket)
+        requests = []
+        for u in bucket:
+            cu = self.cost[u]
+            for (v, w) in self.graph[u].items():
+                if w <= self.delta:
+                    requests.append((v, cu + w, u))
+        return self.route(requests)
+
+    def sssp_heavy(self):
+        """
+        Returns the relaxations of the heavy edges of the vertices removed from the current bucket.
+        """
+        requests = []
+        for u in self.removed:
+            cu = self.cost[u]
+            for (v, w) in self.graph[u].items():
+                if w > self.delta:
+                    requests.append((v, cu + w, u))
+        self.removed = set()
+        return self.route(requests)
+
+    def sssp_relax(self, requests):
+        """
+        Applies the relaxations and returns the index of the lowest non-empty bucket.
+        """
+        cost, buckets, delta = self.cost, self.buckets, self.delta
+        for (v, c, u) in requests:
+            if c < cost[v]:
+                # The vertex may have left its bucket already, if it is in the current one.
+                b = int(cost[v] // delta) if cost[v] != float("inf") else None
+                if b in buckets:
+                    buckets[b].discard(v)
+                    if not buckets[b]:
+                        del buckets[b]
+                cost[v] = c
+                self.parent[v] = u
+                buckets.setdefault(int(c // delta), set()).add(v)
+        return self.min_bucket()
+
+    def sssp_result(self):
+        return self.cost, self.parent
+
+def shard_worker(conn):
+    """
+    Serves the requests (Operation, Arguments) of the coordinator, until it sends "stop".
+    """
+    shard = Shard()
+    while True:
+        (op, args) = conn.recv()
+        if op == "stop":
+            break
+        conn.send(getattr(shard, op)(*args))
+    conn.close()
+
+
+class ShardedGraph:
+    def __init__(self, graph, partition, connections=None):
+        self.partition = partition
+        self.processes = []
+        if connections == None:
+            connections = []
+            for _ in range(partition.shards):
+                (conn, child) = multiprocessing.Pipe()
+                p = multiprocessing.Process(target=shard_worker, args=(child,))
+                p.daemon = True
+                p.start()
+                child.close()
+                self.processes.append(p)
+                connections.append(conn)
+        self.connections = connections
+        self.call("load", [(sub, partition) for sub in partition.split(graph)])
+
+    def call(self, op, args):
+        """
+        Sends a request to every worker, with its own arguments, and returns their replies.
+        The workers serve the requests in parallel.
+        """
+        for (conn, a) in zip(self.connections, args):
+            conn.send((op, a))
+        return [conn.recv() for conn in self.connections]
+
+    def broadcast(self, op, *args):
+        return self.call(op, [args] * len(self.connections))
+
+    def exchange(self, outgoing):
+        """
+        Turns the messages of every worker by shard into the incoming messages of every shard.
+        """
+        return [([m for out in outgoing for m in out[i]],) for i in range(len(self.connections))]
+
+    def bfs(self, root):
+        self.broadcast("bfs_start", root)
+        frontier = [[] for _ in self.connections]
+        frontier[self.partition.owner(root)].append((root, 0))
+        while any(frontier):
+            outgoing = self.call("bfs_expand", [(f,) for f in frontier])
+            visited = self.call("bfs_visit", self.exchange(outgoing))
+            frontier = [[] for _ in self.connections]
+            found = sorted(x for vs in visited for x in vs)
+            for (rank, (_, v)) in enumerate(found):
+                frontier[self.partition.owner(v)].append((v, rank))
+        parent = {}
+        inf = float("inf")
+        cost = collections.defaultdict(lambda: inf)
+        for (p, c) in self.broadcast("bfs_result"):
+            parent.update(p)
+            cost.update(c)
+        return parent, cost
+
+    def dijkstra(self, root, delta=None):
+        if delta == None:
+            totals = self.broadcast("weights")
+            (weight, edges) = (sum(t[0] for t in totals), sum(t[1] for t in totals))
+            delta = weight / edges if weight > 0 else 1
+        mins = self.broadcast("sssp_start", root, delta)
+        while any(m != None for m in mins):
+            i = min(m for m in mins if m != None)
+            while i in mins:
+                outgoing = self.broadcast("sssp_light", i)
+                mins = self.call("sssp_relax", self.exchange(outgoing))
+            outgoing = self.broadcast("sssp_heavy")
+            mins = self.call("sssp_relax", self.exchange(outgoing))
+        inf = float("inf")
+        cost = collections.defaultdict(lambda: inf)
+        parent = collections.defaultdict(lambda: None)
+        for (c, p) in self.broadcast("sssp_result"):
+            cost.update(c)
+            parent.update(p)
+        return cost, parent
+
+    def close(self):
+        for conn in self.connections:
+            conn.send(("stop", ()))
+            conn.close()
+        for p in self.processes:
+            p.join()
+        self.connections = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import random
+    from bfs import bfs
+    from dijkstra import dijkstra
+    from mapper import GraphMapper, VertexPartition
+    gmp = GraphMapper()
+    for v in "abcdef":
+        gmp.add_vertex(v)
+    for (u, v, w) in [("a", "b", 7), ("a", "c", 9), ("a", "f", 14), ("b", "c", 10), ("b", "d", 15),
+                      ("c", "d", 11), ("c", "f", 2), ("d", "e", 6), ("e", "f", 9)]:
+        gmp.add_edge(u, v, w)
+        gmp.add_edge(v, u, w)
+    graph = gmp.get_graph()
+    with ShardedGraph(graph, gmp.partition(2)) as sharded:
+        (cost, parent) = sharded.dijkstra(gmp.lookup_vertex("a"))
+        assert cost == dijkstra(graph, gmp.lookup_vertex("a"))[0]
+        assert cost[gmp.lookup_vertex("e")] == 20
+        assert sharded.bfs(0) == bfs(graph, 0)
+    # Compare with bfs and dijkstra on random graphs.
+    random.seed(42)
+    n = 300
+    graph = dict((v, {}) for v in range(n))
+    for _ in range(900):
+        graph[random.randrange(n)][random.randrange(n)] = random.randint(0, 20)
+    for (by, shards) in [("hash", 3), ("range", 4)]:
+        with ShardedGraph(graph, VertexPartition(graph, shards, by)) as sharded:
+            for root in [0, 17, 123]:
+                assert sharded.bfs(root) == bfs(graph, root)
+                (cost, parent) = sharded.dijkstra(root)
+                assert cost == dijkstra(graph, root)[0]
+                for v in graph:
+                    if v != root and cost[v] != float("inf"):
+                        assert cost[parent[v]] + graph[parent[v]][v] == cost[v]
+            assert sharded.dijkstra(0, 3)[0] == dijkstra(graph, 0)[0]
@@ -9,6 +9,8 @@
     Parameters:
     Graph
         The graph as an adjacency list.
+    Stats
+        An optional Stats object (see utils/stats.py) that collects counters and phase timings.
 
     Returns:
         SSC
@@ -21,7 +23,9 @@
 
 import collections
 
-def tarjan_ssc(graph):
+def tarjan_ssc(graph, stats=None):
+    if stats != None:
+        stats.start("search")
     idx = {"n" : 0}
     index = collections.defaultdict(lambda: None)
     lowlink = dict()
@@ -33,6 +37,10 @@ def tarjan_ssc(graph):
         if index[u] == None:
             strong_connect(u, graph, idx, index, lowlink, onStack, stack, ssc)
     
+    if stats != None:
+        stats.stop("search")
+        stats.count("vertices_settled", len(graph))
+        stats.count("edges_scanned", sum(len(graph[u]) for u in graph))
     return ssc
 
 def strong_connect(u, graph, idx, index, lowlink, onStack, stack, ssc):
@@ -78,3 +86,9 @@ if __name__ == "__main__":
     ssc = tarjan_ssc(graph)
     sol = [[1, 2, 5], [3, 4], [6, 7,], [8]]
     assert sorted(sorted(x) for x in ssc) == sorted(sorted(x) for x in sol)
+    # Collect statistics.
+    from stats import Stats
+    stats = Stats()
+    tarjan_ssc(graph, stats)
+    assert stats.counters["vertices_settled"] == 8
+    assert stats.counters["edges_scanned"] == 13
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+    A compact encoding of labels (e.g. the vertices of a graph) that, unlike pickle,
+    never runs code when it is decoded, so files from untrusted sources can be read.
+
+    A label is None, a bool, an int, a float, a str, bytes or a tuple of labels.
+    Each label is encoded as a tag byte and a payload:
+        n / t / f   None / True / False, no payload
+        i           int, as signed little endian bytes
+        d           float, as a little endian double
+        s / b       str as UTF-8 / bytes
+        T           tuple, as the uint32 length and the encoding of every item
+
+    A list of labels is kept as two sections: N + 1 int64 offsets, where label i is at
+    Offsets[i]..Offsets[i+1]-1 of the data, and the data, the concatenated labels.
+    So any label can be decoded on its own, straight from a memory-mapped file.
+
+    encode_labels(labels)
+        Returns the sections (Offsets, Data), as an array and bytes.
+    decode_label(data, offsets, i) / decode_labels(data, offsets)
+        Decode label i / all the labels. They raise ValueError for malformed data.
+    check_offsets(offsets, size)
+        Raises ValueError unless the offsets are increasing from 0 to size.
+"""
+
+import struct
+from array import array
+
+DOUBLE = struct.Struct("<d")
+LENGTH = struct.Struct("<I")
+
+def encode_label(label, out):
+    if label is None:
+        out += b"n"
+    elif label is True:
+        out += b"t"
+    elif label is False:
+        out += b"f"
+    elif isinstance(label, int):
+        out += b"i"
+        out += label.to_bytes(label.bit_length() // 8 + 1, "little", signed=True)
+    elif isinstance(label, float):
+        out += b"d"
+        out += DOUBLE.pack(label)
+    elif isinstance(label, str):
+        out += b"s"
+        out += label.encode("utf-8")
+    elif isinstance(label, bytes):
+        out += b"b"
+        out += label
+    elif isinstance(label, tuple):
+        out += b"T"
+        out += LENGTH.pack(len(label))
+        for item in label:
+            # Every item is prefixed with its length, so that the tuple can be split.
+            pos = len(out)
+            out += bytes(LENGTH.size)
+            encode_label(item, out)
+            LENGTH.pack_into(out, pos, len(out) - pos - LENGTH.size)
+    else:
+        raise TypeError("Cannot encode a label of type %s" % type(label).__name__)
+
+def encode_labels(labels):
+    offsets = array('q', [0])
+    data = bytearray()
+    for label in labels:
+        encode_label(label, data)
+        offsets.append(len(data))
+    return offsets, bytes(data)
+
+def decode(data):
+    """
+    Decodes a single label from the bytes (or memoryview) data, which it must fill exactly.
+    """
+    if len(data) == 0:
+        raise ValueError("An empty label")
+    tag = data[0]
+    payload = data[1:]
+    if tag in b"ntf":
+        if len(payload) != 0:
+            raise ValueError("Malformed label")
+        return {ord("n"): None, ord("t"): True, ord("f"): False}[tag]
+    if tag == ord("i"):
+        return int.from_bytes(payload, "little", signed=True)
+    if tag == ord("d"):
+        if len(payload) != DOUBLE.size:
+            raise ValueError("Malformed label")
+        return DOUBLE.unpack(payload)[0]
+    if tag == ord("s"):
+        try:
+            return bytes(payload).decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValueError("Malformed label")
+    if tag == ord("b"):
+        return bytes(payload)
+    if tag == ord("T"):
+        if len(payload) < LENGTH.size:
+            raise ValueError("Malformed label")
+        (count,) = LENGTH.unpack_from(payload)
+        items = []
+        pos = LENGTH.size
+        for _ in range(count):
+            if pos + LENGTH.size > len(payload):
+                raise ValueError("Malformed label")
+            (size,) = LENGTH.unpack_from(payload, pos)
+            pos += LENGTH.size
+            if pos + size > len(payload):
+                raise ValueError("Malformed label")
+            items.append(decode(payload[pos:pos + size]))
+            pos += size
+        if pos != len(payload):
+            raise ValueError("Malformed label")
+        return tuple(items)
+    raise ValueError("Unknown label tag %r" % chr(tag))
+
+def decode_label(data, offsets, i):
+    return decode(data[offsets[i]:offsets[i + 1]])
+
+def decode_labels(data, offsets):
+    return [decode(data[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+
+def check_offsets(offsets, size):
+    if len(offsets) == 0 or offsets[0] != 0 or offsets[-1] != size:
+        raise ValueError("Malformed label offsets")
+    for i in range(len(offsets) - 1):
+        if offsets[i] >= offsets[i + 1]:
+            raise ValueError("Malformed label offsets")
+
+
+if __name__ == "__main__":
+    labels = [None, True, False, 0, -1, 255, -2**70, 2.5, float("inf"), "", "vertex é",
+              b"\x00\xff", (), (1, "a", (None, 2.0)), ((),)]
+    (offsets, data) = encode_labels(labels)
+    check_offsets(offsets, len(data))
+    decoded = decode_labels(memoryview(data), offsets)
+    assert decoded == labels
+    assert [type(x) for x in decoded] == [type(x) for x in labels]
+    assert decode_label(data, offsets, 13) == (1, "a", (None, 2.0))
+    try:
+        encode_labels([frozenset()])
+        assert False
+    except TypeError:
+        pass
+    # Malformed data is rejected.
+    for bad in [b"", b"x", b"n1", b"d123", b"s\xff", b"T\x01\x00\x00\x00", b"T\x00\x00\x00\x00n",
+                b"T\x01\x00\x00\x00\x09\x00\x00\x00n"]:
+        try:
+            decode(bad)
+            assert False
+        except ValueError:
+            pass
+    for bad in [array('q'), array('q', [1, 2]), array('q', [0, 2, 2]), array('q', [0, 3])]:
+        try:
+            check_offsets(bad, 2)
+            assert False
+        except ValueError:
+            pass
@@ -5,11 +5,34 @@
 
     IntMapper
         Helps to map a range of hashable objects to integers.
+        The mapping can be saved to a file and loaded back, so that the same integers
+        can be reused between runs.
 
     GraphMapper
         Helps to create a graph of hashable objects to a graph of integers.
+        Its version increases with every change of the graph, so that results that were
+        computed from an older version of the graph can be recognised.
+        It can be saved as a binary snapshot and memory-mapped back (see snapshot.py),
+        and its vertices can be renumbered for locality (see reorder.py).
+
+    VertexPartition
+        Assigns the vertices of a graph to shards, by hash or by ranges of vertices,
+        and splits the graph into one subgraph per shard.
 """
 
+import bisect
+import os
+import struct
+from array import array
+from labels import encode_labels, decode_labels, check_offsets
+from snapshot import save_snapshot, load_snapshot
+from reorder import ORDERS, relabel
+
+# The first bytes of a saved IntMapper.
+INTMAPPER_MAGIC = b"INTMAP2\n"
+# The first integer, the number of items and the size of their encoding.
+INTMAPPER_HEADER = struct.Struct("<qqq")
+
 class IntMapper:
     """
     The default behaviour is to add an item and get back an integer to represent it.
@@ -23,26 +46,60 @@ class IntMapper:
         n: The first integer to map an item to.
         """
         self.table = dict() 
+        self.start = n
         self.index = n
-        self.revTable = dict() if with_lookup else None
+        self.revTable = [] if with_lookup else None  # Item idx is at position idx - start.
 
     def add(self, item):
         """
-        Adds an item and returns its representing integer.
+        Adds a new item and returns its representing integer.
         """
+        if item in self.table:
+            raise ValueError("The item is already mapped")
         idx = self.index
         self.table[item] = idx
         if self.revTable != None:
-            self.revTable[idx] = item
+            self.revTable.append(item)
         self.index += 1
         return idx
 
+    def get_or_add(self, item):
+        """
+        Returns the representing integer of an item, adding the item if it is new.
+        """
+        idx = self.table.get(item)
+        return idx if idx != None else self.add(item)
+
+    def intern(self, items):
+        """
+        Maps all the items, adding the new ones, and returns an array of their integers.
+        """
+        table = self.table
+        revTable = self.revTable
+        ids = array('q')
+        idx = self.index
+        for item in items:
+            i = table.get(item)
+            if i == None:
+                i = table[item] = idx
+                if revTable != None:
+                    revTable.append(item)
+                idx += 1
+            ids.append(i)
+        self.index = idx
+        return ids
+
     def lookup_index(self, idx):
         """
-        Looks up an item by its representing integer.
+        Looks up an item by its representing integer, or raises KeyError if it is not mapped.
         If you need this behaviour, set with_lookup to True when creating the mapper.
         """
-        return self.revTable[idx] if self.revTable != None else None
+        if self.revTable == None:
+            return None
+        i = idx - self.start
+        if not 0 <= i < len(self.revTable):
+            raise KeyError(idx)
+        return self.revTable[i]
 
     def lookup_item(self, item):
         """
@@ -50,6 +107,64 @@ class IntMapper:
         """
         return self.table[item]
 
+    def remap(self, newIds):
+        """
+        Renumbers the items, where newIds maps every old integer to a new one.
+        The new integers must be a permutation of the old ones.
+        """
+        self.table = dict((item, newIds[idx]) for (item, idx) in self.table.items())
+        if self.revTable != None:
+            revTable = len(self.revTable) * [None]
+            for (item, idx) in self.table.items():
+                revTable[idx - self.start] = item
+            self.revTable = revTable
+
+    def save(self, path):
+        """
+        Saves the mapping to a file: a header, with the first integer, and the items in order,
+        encoded as labels (see labels.py), so they must be None, bools, ints, floats, strs,
+        bytes or tuples of them.
+        """
+        (offsets, data) = encode_labels(self.items())
+        with open(path, "wb") as f:
+            f.write(INTMAPPER_MAGIC)
+            f.write(INTMAPPER_HEADER.pack(self.start, len(offsets) - 1, len(data)))
+            offsets.tofile(f)
+            f.write(data)
+
+    @classmethod
+    def load(cls, path, with_lookup=False):
+        """
+        Loads a mapping that was saved with save. Raises ValueError if the file is not valid.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(INTMAPPER_MAGIC)) != INTMAPPER_MAGIC:
+                raise ValueError("Not a saved IntMapper")
+            header = f.read(INTMAPPER_HEADER.size)
+            if len(header) != INTMAPPER_HEADER.size:
+                raise ValueError("The saved IntMapper is truncated")
+            (start, n, size) = INTMAPPER_HEADER.unpack(header)
+            expected = len(INTMAPPER_MAGIC) + INTMAPPER_HEADER.size + 8 * (n + 1) + size
+            if n < 0 or size < 0 or os.fstat(f.fileno()).st_size != expected:
+                raise ValueError("The size of the saved IntMapper does not match its header")
+            offsets = array('q')
+            offsets.fromfile(f, n + 1)
+            data = f.read(size)
+        check_offsets(offsets, size)
+        mapper = cls(with_lookup, start)
+        mapper.intern(decode_labels(data, offsets))
+        if mapper.index - start != n:
+            raise ValueError("The saved IntMapper has duplicate items")
+        return mapper
+
+    def items(self):
+        """
+        Returns the items in the order of their integers.
+        """
+        if self.revTable != None:
+            return self.revTable
+        return sorted(self.table, key=self.table.get)
+
 
 
 class GraphMapper:
@@ -64,22 +179,32 @@ class GraphMapper:
         """
         self.graph = dict()
         self.mapper = IntMapper(with_lookup)
+        self.version = 0
+        self.readOnly = False  # Whether the graph is a CSRGraph of a loaded snapshot.
+
+    def check_writable(self):
+        if self.readOnly:
+            raise TypeError("The graph of a loaded snapshot is read-only")
 
     def add_vertex(self, vertex):
         """
         Adds a vertex to the graph and returns its representing integer.
         """
+        self.check_writable()
         idx = self.mapper.add(vertex)
         self.graph[idx] = dict()
+        self.version += 1
         return idx
     
     def add_edge(self, vertex1, vertex2, w):
         """
         Adds an edge to the graph.
         """
+        self.check_writable()
         u = self.mapper.lookup_item(vertex1)
         v = self.mapper.lookup_item(vertex2)
         self.graph[u][v] = w
+        self.version += 1
         
     def get_graph(self):
         """
@@ -100,6 +225,82 @@ class GraphMapper:
         """
         return self.mapper.lookup_index(idx)
 
+    def save_snapshot(self, path):
+        """
+        Saves the graph and the mapping of the vertices as a binary snapshot.
+        """
+        save_snapshot(self, path)
+
+    @classmethod
+    def load_snapshot(cls, path, with_lookup=False, verify=True):
+        """
+        Loads a snapshot. The graph is a read-only CSRGraph over the memory-mapped file,
+        and the mapper a SnapshotLabels, so no edges can be added to the loaded GraphMapper.
+        verify: Whether to check the checksum, which reads the whole file.
+        """
+        gmp = cls(with_lookup)
+        (gmp.graph, gmp.mapper, gmp.version) = load_snapshot(path, with_lookup, verify)
+        gmp.readOnly = True
+        return gmp
+
+    def reorder(self, method="rcm"):
+        """
+        Renumbers the vertices in a locality-improving order ("bfs", "rcm" or "degree",
+        see reorder.py) and rebuilds the graph in that order.
+        Returns the dict that maps the old integers of the vertices to the new ones.
+        """
+        order = ORDERS[method](self.graph)
+        if self.readOnly:
+            self.mapper = self.mapper.to_int_mapper()
+        (self.graph, newIds) = relabel(self.graph, order, self.mapper.start)
+        self.mapper.remap(newIds)
+        self.readOnly = False  # The new graph is a dict.
+        self.version += 1
+        return newIds
+
+    def partition(self, shards, by="hash"):
+        """
+        Partitions the vertices into shards (see VertexPartition).
+        """
+        return VertexPartition(self.graph, shards, by)
+
+
+class VertexPartition:
+    """
+    Every vertex is owned by one shard.
+    With by="hash", the owner of vertex v is hash(v) % shards. The hash of a str differs
+    between interpreters, so the vertices should be integers, as those of a GraphMapper,
+    if the partition is used by more than one process.
+    With by="range", every shard owns a contiguous range of vertices and the shards have
+    about the same number of vertices.
+    """
+    def __init__(self, vertices, shards, by="hash"):
+        if by not in ("hash", "range"):
+            raise ValueError("Unknown partitioning %r" % (by,))
+        self.shards = shards
+        self.bounds = None  # The first vertex of every shard but the first.
+        if by == "range":
+            vs = sorted(vertices)
+            size = -(-len(vs) // shards)
+            self.bounds = [vs[i * size] for i in range(1, shards) if i * size < len(vs)]
+
+    def owner(self, v):
+        """
+        Returns the shard (0..shards-1) that owns the vertex.
+        """
+        if self.bounds == None:
+            return hash(v) % self.shards
+        return bisect.bisect_right(self.bounds, v)
+
+    def split(self, graph):
+        """
+        Returns a list with the subgraph of every shard, i.e. the adjacency lists of its vertices.
+        """
+        subgraphs = [dict() for _ in range(self.shards)]
+        for u in graph:
+            subgraphs[self.owner(u)][u] = graph[u]
+        return subgraphs
+
 
 if __name__ == "__main__":
     items = ["a", "b", "c"]
@@ -112,6 +313,56 @@ if __name__ == "__main__":
         item = items[idx]
         assert item == imp.lookup_index(idx)
         assert idx == imp.lookup_item(item)
+    # Adding an item twice is an error, but get_or_add returns the same integer.
+    try:
+        imp.add("a")
+        assert False
+    except ValueError as e:
+        assert str(e) == "The item is already mapped"
+    assert imp.get_or_add("a") == 0
+    assert imp.get_or_add("d") == 3
+    # Bulk interning.
+    imp = IntMapper(True, 10)
+    ids = imp.intern(["x", "y", "x", "z", "y"])
+    assert list(ids) == [10, 11, 10, 12, 11]
+    assert imp.lookup_index(12) == "z"
+    for idx in [9, 13, -1]:
+        try:
+            imp.lookup_index(idx)
+            assert False
+        except KeyError:
+            pass
+    # Save & load.
+    import os
+    import tempfile
+    (fd, path) = tempfile.mkstemp()
+    os.close(fd)
+    for lookup in [True, False]:
+        imp = IntMapper(lookup, 5)
+        imp.intern(["x", (1, 2), 7])
+        imp.save(path)
+        imp2 = IntMapper.load(path, True)
+        assert imp2.table == imp.table
+        assert [imp2.lookup_index(i) for i in range(5, 8)] == ["x", (1, 2), 7]
+        assert imp2.add("w") == 8
+    # Bad files are rejected.
+    imp.save(path)
+    with open(path, "rb") as f:
+        saved = f.read()
+    for (bad, error) in [(b"INTMAP1\n" + saved[8:], "Not a saved IntMapper"),
+                         (saved[:-1], "The size of the saved IntMapper does not match its header"),
+                         (saved[:20], "The saved IntMapper is truncated"),
+                         (saved[:-2] + b"x" + saved[-1:], "Unknown label tag 'x'")]:
+        with open(path, "wb") as f:
+            f.write(bad)
+        try:
+            IntMapper.load(path)
+            assert False
+        except ValueError as e:
+            assert str(e) == error, str(e)
+    IntMapper(False, 0).save(path)
+    assert IntMapper.load(path).index == 0
+    os.remove(path)
     # Test GraphMapper.
     gmp = GraphMapper()
     indexes = []
@@ -120,3 +371,98 @@ if __name__ == "__main__":
     gmp.add_edge(items[0], items[1], 1)
     graph = gmp.get_graph()
     assert graph[indexes[0]][indexes[1]] == 1
+    assert gmp.version == 4
+    # Partition the vertices.
+    for by in ["hash", "range"]:
+        partition = gmp.partition(2, by)
+        subgraphs = partition.split(graph)
+        assert sorted(v for sub in subgraphs for v in sub) == indexes
+        assert all(partition.owner(v) == i for (i, sub) in enumerate(subgraphs) for v in sub)
+    assert gmp.partition(2, "range").split(graph)[1] == {2: {}}
+    try:
+        gmp.partition(2, "modulo")
+        assert False
+    except ValueError:
+        pass
+    partition = VertexPartition(range(10), 3, "range")
+    assert [partition.owner(v) for v in range(10)] == [0, 0, 0, 0, 1, 1, 1, 1, 2, 2]
+    # Reorder the vertices of a path that was added out of order.
+    gmp = GraphMapper(True)
+    path = ["e", "a", "d", "b", "c"]
+    for v in path:
+        gmp.add_vertex(v)
+    for (u, v) in zip("abcd", "bcde"):
+        gmp.add_edge(u, v, 1)
+    for method in ["bfs", "rcm", "degree"]:
+        newIds = gmp.reorder(method)
+        assert sorted(newIds.values()) == list(range(5))
+        for v in path:
+            assert gmp.lookup_index(gmp.lookup_vertex(v)) == v
+        assert all(gmp.get_graph()[gmp.lookup_vertex(u)] == {gmp.lookup_vertex(v): 1} for (u, v) in zip("abcd", "bcde"))
+        if method != "degree":
+            # The neighbours along the path get consecutive integers.
+            assert all(abs(gmp.lookup_vertex(u) - gmp.lookup_vertex(v)) == 1 for (u, v) in zip("abcd", "bcde"))
+    assert gmp.version == 12
+    # Snapshots.
+    from bfs import bfs
+    from dijkstra import dijkstra
+    gmp = GraphMapper(True)
+    for v in ["a", "b", "c", "d", (1, 2)]:
+        gmp.add_vertex(v)
+    for (u, v, w) in [("a", "b", 7), ("a", "c", 9), ("b", "c", 10), ("c", "d", 2), ("d", (1, 2), 6),
+                      ("b", (1, 2), 20), ("d", "a", 1)]:
+        gmp.add_edge(u, v, w)
+    (fd, path) = tempfile.mkstemp()
+    os.close(fd)
+    gmp.save_snapshot(path)
+    loaded = GraphMapper.load_snapshot(path, True)
+    graph = loaded.get_graph()
+    # The vertices are decoded one by one, and the dict of the vertices is built when needed.
+    assert loaded.lookup_index(2) == "c" and loaded.mapper.lookup == None
+    assert loaded.version == gmp.version and loaded.lookup_vertex((1, 2)) == 4
+    assert loaded.mapper.items() == gmp.mapper.items()
+    # A loaded graph is read-only, and a failed change leaves the mapper as it was.
+    for change in [lambda: loaded.add_vertex("e"), lambda: loaded.add_edge("a", "d", 1)]:
+        try:
+            change()
+            assert False
+        except TypeError:
+            pass
+    assert loaded.version == gmp.version and "e" not in loaded.mapper.table
+    assert dict((u, dict(graph[u].items())) for u in graph) == gmp.get_graph()
+    for root in range(5):
+        assert dijkstra(graph, root) == dijkstra(gmp.get_graph(), root)
+        assert bfs(graph, root) == bfs(gmp.get_graph(), root)
+    graph.close()
+    # A loaded graph can be reordered, which copies it into a dict.
+    loaded = GraphMapper.load_snapshot(path, True)
+    newIds = loaded.reorder("bfs")
+    assert loaded.mapper.revTable != None and not loaded.readOnly
+    assert all(loaded.lookup_vertex(v) == newIds[gmp.lookup_vertex(v)] for v in gmp.mapper.items())
+    loaded.add_vertex("e")
+    # Float weights, and a corrupted snapshot.
+    gmp.add_edge("c", "a", 0.5)
+    gmp.save_snapshot(path)
+    loaded = GraphMapper.load_snapshot(path)
+    assert loaded.get_graph()[2][0] == 0.5 and loaded.lookup_index(0) == None
+    loaded.get_graph().close()
+    with open(path, "r+b") as f:
+        f.seek(100)
+        byte = f.read(1)
+        f.seek(100)
+        f.write(bytes([byte[0] ^ 1]))
+    try:
+        GraphMapper.load_snapshot(path)
+        assert False
+    except ValueError as e:
+        assert str(e) == "The snapshot checksum does not match"
+    loaded = GraphMapper.load_snapshot(path, verify=False)
+    loaded.get_graph().close()
+    with open(path, "r+b") as f:
+        f.truncate(120)
+    try:
+        GraphMapper.load_snapshot(path, verify=False)
+        assert False
+    except ValueError as e:
+        assert str(e) == "The snapshot size does not match its header"
+    os.remove(path)
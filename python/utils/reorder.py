@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Vertex orders that improve the locality of a graph.
+
+    When the vertices are renumbered in one of the orders below and the adjacency
+    lists are rebuilt in that order, the vertices that are visited together by a
+    traversal are close in memory. The edges are treated as undirected.
+
+    bfs_order
+        The order in which a BFS visits the vertices, starting from Root (by default the
+        first vertex) and then from the first vertex of every other component.
+    rcm_order
+        Reverse Cuthill-McKee: a BFS from a vertex of minimum degree of every component,
+        which visits the neighbours of every vertex in increasing degree, reversed.
+        It keeps the neighbours close, i.e. the bandwidth max|u - v| small.
+    degree_order
+        The vertices by decreasing degree, so that the hubs, which most traversals
+        visit, are together.
+
+    relabel(graph, order, first)
+        Returns the graph with the vertex order[i] renamed to first + i, and its adjacency
+        lists sorted, together with a dict that maps the old names to the new ones.
+    bandwidth(graph)
+        Returns max|u - v| over the edges (u, v) of a graph of integers.
+
+    Time Complexity
+        O( |V| + |E| ), plus O( |E| log|V| ) to sort the neighbours for rcm_order and relabel.
+"""
+
+import collections
+
+def undirected_neighbours(graph):
+    neighbours = dict((u, list(graph[u])) for u in graph)
+    for u in graph:
+        for v in graph[u]:
+            if u not in graph[v]:
+                neighbours[v].append(u)
+    return neighbours
+
+def bfs_order(graph, root=None):
+    neighbours = undirected_neighbours(graph)
+    starts = list(graph)
+    if root != None:
+        starts.insert(0, root)
+    return traverse(neighbours, starts)
+
+def rcm_order(graph):
+    neighbours = undirected_neighbours(graph)
+    degree = dict((u, len(vs)) for (u, vs) in neighbours.items())
+    for u in neighbours:
+        neighbours[u].sort(key=degree.__getitem__)
+    order = traverse(neighbours, sorted(graph, key=degree.__getitem__))
+    order.reverse()
+    return order
+
+def degree_order(graph):
+    neighbours = undirected_neighbours(graph)
+    return sorted(graph, key=lambda u: -len(neighbours[u]))
+
+def traverse(neighbours, starts):
+    """
+    Returns the vertices in the order of BFS traversals from every unvisited start.
+    """
+    visited = set()
+    order = []
+    for s in starts:
+        if s in visited:
+            continue
+        visited.add(s)
+        pending = collections.deque([s])
+        while pending:
+            u = pending.popleft()
+            order.append(u)
+            for v in neighbours[u]:
+                if v not in visited:
+                    visited.add(v)
+                    pending.append(v)
+    return order
+
+ORDERS = {"bfs": bfs_order, "rcm": rcm_order, "degree": degree_order}
+
+def relabel(graph, order, first=0):
+    newIds = dict((u, first + i) for (i, u) in enumerate(order))
+    assert len(newIds) == len(graph), "The order must contain every vertex once"
+    newGraph = dict()
+    for u in order:
+        newGraph[newIds[u]] = dict(sorted((newIds[v], w) for (v, w) in graph[u].items()))
+    return newGraph, newIds
+
+def bandwidth(graph):
+    return max([abs(u - v) for u in graph for v in graph[u]] + [0])
+
+
+if __name__ == "__main__":
+    import random
+    # A 20 x 20 grid with shuffled names.
+    random.seed(42)
+    side = 20
+    names = list(range(side * side))
+    random.shuffle(names)
+    graph = dict((names[i], {}) for i in range(side * side))
+    for r in range(side):
+        for c in range(side):
+            u = names[r * side + c]
+            if c + 1 < side:
+                graph[u][names[r * side + c + 1]] = 1
+            if r + 1 < side:
+                graph[u][names[(r + 1) * side + c]] = 1
+    assert bandwidth(graph) > side * side // 2
+    for (method, limit) in [("rcm", 2 * side), ("bfs", 2 * side), ("degree", side * side)]:
+        order = ORDERS[method](graph)
+        assert sorted(order) == sorted(graph)
+        (newGraph, newIds) = relabel(graph, order)
+        assert sorted(newGraph) == list(range(side * side))
+        assert all(newGraph[newIds[u]][newIds[v]] == w for u in graph for (v, w) in graph[u].items())
+        assert bandwidth(newGraph) <= limit
+    # Every component is ordered, and isolated vertices too.
+    graph = {1: {2: 1}, 2: {}, 3: {}, 4: {3: 5}, 5: {}}
+    assert bfs_order(graph) == [1, 2, 3, 4, 5]
+    assert bfs_order(graph, 4) == [4, 3, 1, 2, 5]
+    assert rcm_order(graph) == [4, 3, 2, 1, 5]
+    assert degree_order(graph)[-1] == 5
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Binary graph snapshots.
+
+    A GraphMapper can be saved to a single binary file and loaded back with mmap, so that
+    the adjacency lists are read straight from the page cache, which all the processes
+    that load the same file share, instead of being rebuilt as dicts in every process.
+
+    Layout (little endian, all the sections start at multiples of 8 bytes)
+        Header    Magic, format version, weight type ('q' for int, 'd' for float),
+                  CRC-32 of everything after the header, number of vertices N,
+                  number of edges M, first vertex, version of the GraphMapper and
+                  size of the label data, padded to 64 bytes.
+        Offsets   N + 1 int64: the edges of vertex First + i are Offsets[i]..Offsets[i+1]-1.
+        Targets   M int64: the heads of the edges.
+        Weights   M int64 or float64: the weights of the edges.
+        Labels    N + 1 int64 offsets and the data of the original vertices, in the order
+                  of their integers, encoded as labels (see labels.py).
+
+    CSRGraph
+        A read-only adjacency list over the arrays, that can be passed to the graph
+        algorithms in place of the dict of dicts. The neighbours of a vertex keep the
+        order of the original graph, so bfs and dfs give the same results.
+        Looking up the weight of a single edge takes O( degree ).
+        The arrays are memoryviews, so numpy.frombuffer can also use them without a copy.
+
+    SnapshotLabels
+        A read-only IntMapper over the labels of the file. A vertex is decoded only when
+        it is looked up by its integer, and the dict from the vertices to their integers
+        is built on the first lookup of a vertex, so processes that only need the graph
+        never decode the labels.
+
+    save_snapshot(mapper, path) / load_snapshot(path, with_lookup, verify)
+        Used by GraphMapper.save_snapshot and GraphMapper.load_snapshot.
+"""
+
+import mmap
+import struct
+import zlib
+from array import array
+from collections.abc import Mapping
+from labels import encode_labels, decode_label, decode_labels
+
+SNAPSHOT_MAGIC = b"GRAPHSNP"
+SNAPSHOT_VERSION = 2
+# Magic, Format version, Weight type, CRC-32, N, M, First vertex, Graph version, Label data size.
+HEADER = struct.Struct("<8sHcxIqqqqq")
+HEADER_SIZE = 64
+
+class CSRRow(Mapping):
+    """
+    The neighbours of a vertex, as a read-only dict from neighbours to weights.
+    """
+    def __init__(self, targets, weights, lo, hi):
+        self.targets = targets
+        self.weights = weights
+        self.lo = lo
+        self.hi = hi
+
+    def __getitem__(self, v):
+        targets = self.targets
+        for i in range(self.lo, self.hi):
+            if targets[i] == v:
+                return self.weights[i]
+        raise KeyError(v)
+
+    def __iter__(self):
+        return iter(self.targets[self.lo:self.hi])
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def items(self):
+        return zip(self.targets[self.lo:self.hi], self.weights[self.lo:self.hi])
+
+    def values(self):
+        return iter(self.weights[self.lo:self.hi])
+
+
+class CSRGraph(Mapping):
+    def __init__(self, offsets, targets, weights, first=0, buf=None):
+        """
+        buf: The mmap (or other buffer) that the arrays are views of, if any.
+        """
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.first = first
+        self.n = len(offsets) - 1
+        self.buf = buf
+        self.views = [offsets, targets, weights]  # The views to release on close.
+
+    def __getitem__(self, u):
+        i = u - self.first if isinstance(u, int) else -1
+        if not 0 <= i < self.n:
+            raise KeyError(u)
+        return CSRRow(self.targets, self.weights, self.offsets[i], self.offsets[i + 1])
+
+    def __contains__(self, u):
+        return isinstance(u, int) and 0 <= u - self.first < self.n
+
+    def __iter__(self):
+        return iter(range(self.first, self.first + self.n))
+
+    def __len__(self):
+        return self.n
+
+    def keys(self):
+        return range(self.first, self.first + self.n)
+
+    def close(self):
+        """
+        Releases the arrays and unmaps the file. The graph cannot be used afterwards.
+        """
+        for view in self.views:
+            if isinstance(view, memoryview):
+                view.release()
+        if self.buf != None:
+            self.buf.close()
+            self.buf = None
+
+
+class SnapshotLabels:
+    """
+    The vertices of a snapshot, with the interface of an IntMapper that cannot be changed.
+    """
+    def __init__(self, offsets, data, with_lookup=False, n=0):
+        """
+        offsets, data: The sections of the labels (see labels.py).
+        with_lookup: Whether lookup_index returns the vertices, as for an IntMapper.
+        n: The integer of the first vertex.
+        """
+        self.offsets = offsets
+        self.data = data
+        self.with_lookup = with_lookup
+        self.start = n
+        self.index = n + len(offsets) - 1
+        self.lookup = None  # The dict from the vertices to their integers, once it is needed.
+
+    @property
+    def table(self):
+        if self.lookup == None:
+            self.lookup = dict((item, self.start + i) for (i, item) in enumerate(self.items()))
+            if len(self.lookup) != self.index - self.start:
+                self.lookup = None
+                raise ValueError("The snapshot has duplicate vertices")
+        return self.lookup
+
+    def lookup_index(self, idx):
+        """
+        Decodes the vertex of an integer, or raises KeyError if it is not mapped.
+        """
+        if not self.with_lookup:
+            return None
+        if not self.start <= idx < self.index:
+            raise KeyError(idx)
+        return decode_label(self.data, self.offsets, idx - self.start)
+
+    def lookup_item(self, item):
+        return self.table[item]
+
+    def items(self):
+        return decode_labels(self.data, self.offsets)
+
+    def to_int_mapper(self):
+        """
+        Returns a new IntMapper with the same mapping, that can be changed.
+        """
+        from mapper import IntMapper
+        mapper = IntMapper(self.with_lookup, self.start)
+        mapper.intern(self.items())
+        return mapper
+
+
+def pad(size):
+    return -size % 8
+
+def save_snapshot(mapper, path):
+    """
+    Saves the graph and the vertex mapping of a GraphMapper.
+    """
+    intMapper = mapper.mapper
+    graph = mapper.graph
+    first = intMapper.start
+    n = intMapper.index - first
+    offsets = array('q', [0])
+    targets = array('q')
+    weightList = []
+    for u in range(first, first + n):
+        for (v, w) in graph[u].items():
+            targets.append(v)
+            weightList.append(w)
+        offsets.append(len(targets))
+    isInt = all(isinstance(w, int) for w in weightList)
+    typecode = 'q' if isInt else 'd'
+    weights = array(typecode, weightList)
+    (labelOffsets, labelData) = encode_labels(intMapper.items())
+
+    sections = [offsets.tobytes(), targets.tobytes(), weights.tobytes(), labelOffsets.tobytes(), labelData]
+    crc = 0
+    for data in sections:
+        crc = zlib.crc32(data, crc)
+        crc = zlib.crc32(bytes(pad(len(data))), crc)
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, typecode.encode(), crc,
+                         n, len(targets), first, mapper.version, len(labelData))
+    with open(path, "wb") as f:
+        f.write(header + bytes(HEADER_SIZE - len(header)))
+        for data in sections:
+            f.write(data)
+            f.write(bytes(pad(len(data))))
+
+def check_snapshot(buf, verify):
+    """
+    Raises ValueError if the header, the size or, with verify, the checksum is wrong.
+    """
+    if len(buf) < HEADER_SIZE or buf[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("Not a graph snapshot")
+    (_, fmt, typecode, crc, n, m, _, _, labelSize) = HEADER.unpack_from(buf)
+    if fmt != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot version %d" % fmt)
+    if typecode not in (b"q", b"d") or min(n, m, labelSize) < 0:
+        raise ValueError("The snapshot header is corrupted")
+    size = HEADER_SIZE + 16 * (n + 1) + 16 * m + labelSize + pad(labelSize)
+    if len(buf) != size:
+        raise ValueError("The snapshot size does not match its header")
+    if verify:
+        with memoryview(buf) as view:
+            if zlib.crc32(view[HEADER_SIZE:]) != crc:
+                raise ValueError("The snapshot checksum does not match")
+
+def load_snapshot(path, with_lookup=False, verify=True):
+    """
+    Maps a snapshot into memory and returns (CSRGraph, SnapshotLabels, Graph version).
+    With verify, the checksum is checked, which reads the whole file.
+    Raises ValueError if the file is not a snapshot of this version or is corrupted.
+    Without verify, corrupted labels may only raise ValueError when they are decoded.
+    """
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        check_snapshot(buf, verify)
+    except ValueError:
+        buf.close()
+        raise
+    (_, fmt, typecode, crc, n, m, first, version, labelSize) = HEADER.unpack_from(buf)
+    view = memoryview(buf)
+    pos = HEADER_SIZE
+    sections = []
+    for (size, code) in [(8 * (n + 1), 'q'), (8 * m, 'q'), (8 * m, typecode.decode()),
+                         (8 * (n + 1), 'q'), (labelSize, 'B')]:
+        sections.append(view[pos:pos + size].cast(code))
+        pos += size + pad(size)
+    view.release()
+    graph = CSRGraph(sections[0], sections[1], sections[2], first, buf)
+    graph.views += sections[3:]
+    labels = SnapshotLabels(sections[3], sections[4], with_lookup, first)
+    if labels.offsets[0] != 0 or labels.offsets[n] != labelSize:
+        graph.close()
+        raise ValueError("The snapshot labels are corrupted")
+    return graph, labels, version
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    graph = CSRGraph(array('q', [0, 2, 3, 3]), array('q', [2, 3, 1]), array('d', [0.5, 1, 2]), 1)
+    assert list(graph) == [1, 2, 3] and 3 in graph and 4 not in graph and "a" not in graph
+    assert dict(graph[1].items()) == {2: 0.5, 3: 1} and graph[1][3] == 1 and len(graph[3]) == 0
+    assert list(graph[1]) == [2, 3] and list(graph[2].values()) == [2]
+    try:
+        graph[1][1]
+        assert False
+    except KeyError:
+        pass
+    (offsets, data) = encode_labels(["a", (1, 2), "a"])
+    labels = SnapshotLabels(offsets, data, True, 5)
+    assert labels.lookup_index(6) == (1, 2) and labels.index == 8
+    try:
+        labels.lookup_item("a")
+        assert False
+    except ValueError as e:
+        assert str(e) == "The snapshot has duplicate vertices"
+    # Snapshots of a GraphMapper are tested in mapper.py. Reject bad files.
+    (fd, path) = tempfile.mkstemp()
+    os.write(fd, b"GRAPHSNQ" + bytes(100))
+    os.close(fd)
+    try:
+        load_snapshot(path)
+        assert False
+    except ValueError as e:
+        assert str(e) == "Not a graph snapshot"
+    os.remove(path)
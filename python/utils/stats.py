@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+    Statistics of algorithm runs.
+
+    Stats
+        Collects named counters and phase timings.
+
+    Histogram
+        Counts values (e.g. latencies in seconds) in buckets whose bounds grow
+        geometrically, and estimates percentiles from them.
+
+    The graph algorithms, Heap, UnionFind and Trie take an optional Stats object.
+    When it is missing, nothing is timed and the data structures do no counting, since
+    they replace their methods with counting ones only when they get a Stats object.
+    The algorithms keep a single copy of their loops, which only bump a local integer in
+    branches that already do work (e.g. a successful relaxation), and report the totals
+    to the Stats object once, after the loop.
+
+    Counters
+        relaxations       Successful edge relaxations (cost or key decreases).
+        edges_scanned     Edges looked at.
+        vertices_settled  Vertices removed from the queue or visited.
+        heap_sift_up      Swaps while moving heap items up.
+        heap_sift_down    Levels visited while moving heap items down.
+        uf_finds          Calls of UnionFind.find.
+        uf_find_path      Total length of the paths to the representatives.
+        trie_nodes        Trie nodes allocated.
+        trie_letters      Letters of the words added to a trie.
+"""
+
+import bisect
+import collections
+import time
+
+class Stats:
+    def __init__(self):
+        self.counters = collections.Counter()
+        self.timings = collections.defaultdict(float)  # Seconds per phase.
+        self.started = {}
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def start(self, phase):
+        """
+        Starts timing a phase. The time of a phase that runs many times is accumulated.
+        """
+        self.started[phase] = time.perf_counter()
+
+    def stop(self, phase):
+        self.timings[phase] += time.perf_counter() - self.started.pop(phase)
+
+    def __str__(self):
+        parts = ["%s: %d" % (name, n) for (name, n) in sorted(self.counters.items())]
+        parts.extend("%s: %.6fs" % (phase, t) for (phase, t) in sorted(self.timings.items()))
+        return "\n".join(parts)
+
+class Histogram:
+    """
+    Bucket i counts the values in (Smallest * Factor^(i-1), Smallest * Factor^i].
+    The first bucket also counts the smaller values and the last the larger ones.
+    """
+    def __init__(self, smallest=1e-6, factor=2, buckets=32):
+        self.bounds = [smallest * factor ** i for i in range(buckets)]
+        self.counts = buckets * [0]
+        self.n = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, x):
+        self.counts[min(bisect.bisect_left(self.bounds, x), len(self.counts) - 1)] += 1
+        self.n += 1
+        self.total += x
+        self.max = max(self.max, x)
+
+    def percentile(self, p):
+        """
+        Returns the upper bound of the bucket of the p-th percentile (0 < p <= 100),
+        which is at most Factor times the real value, or None if there are no values.
+        """
+        if self.n == 0:
+            return None
+        rank = p * self.n / 100.0
+        seen = 0
+        for (i, c) in enumerate(self.counts):
+            seen += c
+            if seen >= rank and i < len(self.counts) - 1:
+                return min(self.bounds[i], self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.n if self.n else None
+
+    def __str__(self):
+        if self.n == 0:
+            return "n: 0"
+        return "n: %d mean: %.6f p50: %.6f p99: %.6f max: %.6f" % (
+            self.n, self.mean(), self.percentile(50), self.percentile(99), self.max)
+
+
+if __name__ == "__main__":
+    stats = Stats()
+    stats.count("relaxations")
+    stats.count("relaxations", 2)
+    stats.start("init")
+    stats.stop("init")
+    stats.start("init")
+    stats.stop("init")
+    assert stats.counters["relaxations"] == 3
+    assert stats.counters["edges_scanned"] == 0
+    assert stats.timings["init"] >= 0 and not stats.started
+    assert str(stats).startswith("relaxations: 3\ninit: ")
+    # Histogram.
+    hist = Histogram(1, 2, 8)
+    assert hist.percentile(50) == None
+    for x in [0.5, 1, 3, 3, 4, 100, 1000]:
+        hist.record(x)
+    assert hist.counts == [2, 0, 3, 0, 0, 0, 0, 2]
+    assert hist.percentile(50) == 4 and hist.percentile(100) == 1000
+    assert hist.percentile(10) == 1 and hist.max == 1000
+    assert str(hist).startswith("n: 7 mean: 158.785714 p50: 4.000000")